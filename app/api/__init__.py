@@ -1,2 +1,5 @@
 from .estat_api import *
-from .serp_api import *
\ No newline at end of file
+from .serp_api import *
+from .serp_cache import *
+from .estat_cache import *
+from .estat_client import *
\ No newline at end of file
@@ -1,58 +1,166 @@
 import logging
 import requests
 import json
+import math
 import os
+from concurrent.futures import as_completed
 
+from constants import (
+    ESTAT_PAGE_SIZE,
+    ESTAT_FETCH_MAX_WORKERS,
+    ESTAT_META_INFO_MAX_WORKERS,
+    ESTAT_ESTIMATED_BYTES_PER_CELL,
+    DEFAULT_ESTAT_MEMORY_BUDGET_MB,
+    DEFAULT_ESTAT_API_BASE_URL,
+    EstatFetchStrategy,
+)
 from session import get_estat_data_limit
+from utils import create_thread_pool, build_narrowing_params, get_class_objs, traced, set_span_attributes, cache_requests_total
+from .estat_cache import get_estat_cache, make_estat_cache_key
+from .estat_client import get_estat_client
 
-def fetch_estat_data(statsDataId: str):
+def plan_estat_fetch(statsDataId: str, filters: dict = None):
+    """
+    統計データを取得する前に、メタ情報からデータ件数を確認して取得方法を決定します。
+    
+    Args:
+        statsDataId: 統計データID
+        filters: CLASS_OBJの@idをキー、絞り込むコードの配列を値とする辞書
+    
+    Returns:
+        取得計画の辞書
+            strategy: 取得方法（EstatFetchStrategyの値）
+            total_number: 統計表全体のデータ件数
+            estimated_number: 取得するデータ件数の推定値（絞り込み条件がある場合は各分類が均等に分布するとして推定）
+            estimated_bytes: 取得したデータのメモリ使用量の推定値
+            page_count: 取得するページ数
+            reason: 取得方法の説明
+    """
+    max_number = get_estat_data_limit()
+    memory_budget_mb = get_estat_memory_budget_mb()
+    
+    meta_info = get_estat_meta_info(statsDataId)
+    total_number = meta_info.get("TABLE_INF", {}).get("OVERALL_TOTAL_NUMBER") or 0
+    
+    # 絞り込み条件がある場合は、分類ごとの選択割合から件数を推定する
+    estimated_number = total_number
+    if filters:
+        for class_obj in get_class_objs(meta_info.get("CLASS_INF", {})):
+            selected_codes = filters.get(class_obj["@id"])
+            if selected_codes and len(class_obj["CLASS"]) > 0:
+                estimated_number *= min(len(selected_codes) / len(class_obj["CLASS"]), 1.0)
+        estimated_number = math.ceil(estimated_number)
+    estimated_bytes = estimated_number * ESTAT_ESTIMATED_BYTES_PER_CELL
+    
+    if estimated_number > max_number:
+        strategy = EstatFetchStrategy.REFUSED
+        reason = f"データが**{max_number:,}**件以上({estimated_number:,}件)あるため、この機能では扱えません。"
+    elif estimated_bytes > memory_budget_mb * 1024 * 1024:
+        strategy = EstatFetchStrategy.REFUSED
+        reason = (
+            f"データ({estimated_number:,}件)の推定メモリ使用量が約{estimated_bytes / (1024 * 1024):,.0f}MBとなり、"
+            f"上限の{memory_budget_mb:,}MBを超えるため、絞り込んで取得してください。"
+        )
+    elif filters:
+        strategy = EstatFetchStrategy.FILTERED
+        reason = f"e-Stat側で絞り込んで取得します（全{total_number:,}件のうち約{estimated_number:,}件）。"
+    elif estimated_number <= ESTAT_PAGE_SIZE:
+        strategy = EstatFetchStrategy.SINGLE
+        reason = f"{estimated_number:,}件のデータを一括で取得します。"
+    else:
+        strategy = EstatFetchStrategy.PAGINATED
+        reason = f"{estimated_number:,}件のデータを{ESTAT_PAGE_SIZE:,}件ずつ{math.ceil(estimated_number / ESTAT_PAGE_SIZE)}ページに分割して取得します。"
+    
+    plan = {
+        "strategy": strategy.value,
+        "total_number": total_number,
+        "estimated_number": estimated_number,
+        "estimated_bytes": estimated_bytes,
+        "page_count": max(math.ceil(estimated_number / ESTAT_PAGE_SIZE), 1),
+        "reason": reason,
+    }
+    logging.csv_info(f"Fetch plan for statsDataId: {statsDataId}: {plan}")
+    return plan
+
+def get_estat_memory_budget_mb() -> int:
+    """
+    e-Statのデータ取得時に許容するメモリ使用量の上限（MB）を返します。
+    環境変数ESTAT_MEMORY_BUDGET_MBで変更できます。
+    """
+    return int(os.getenv("ESTAT_MEMORY_BUDGET_MB", DEFAULT_ESTAT_MEMORY_BUDGET_MB))
+
+def _build_refused_message(reason: str) -> str:
+    return (
+        f"{reason}  \n"
+        "e-Statのデータ取得上限を上げるか、絞り込んで取得するか、ExcelやCSVなどでのデータの取得をご検討ください。  \n"
+        "※取得するデータ量が多い場合、通信に時間がかかったり、ブラウザの動作が重くなることがあるため、ご注意ください。"
+    )
+
+@traced("estat.fetch_estat_data")
+def fetch_estat_data(statsDataId: str, filters: dict = None, progress_callback=None, plan: dict = None):
     """
     e-Statの統計データを取得します。
+    取得前にメタ情報から取得計画を立て、取得できない件数の場合はデータをダウンロードせずにメッセージを返します。
+    データ件数がESTAT_PAGE_SIZEを超える場合は、NEXT_KEYをもとにページ分割して並列に取得し、結合して返します。
+    絞り込み条件を指定した場合は、e-Stat側で絞り込んだデータのみを取得します。
     
     Args:
         statsDataId: 統計データID
+        filters: CLASS_OBJの@idをキー、絞り込むコードの配列を値とする辞書
+        progress_callback: ページ分割して取得する場合に、取得済み件数と総件数を受け取るコールバック
+        plan: plan_estat_fetchで作成済みの取得計画（省略した場合はこの関数内で作成する）
     
     Returns:
         統計データのJSON
+        str: 取得できない場合のメッセージ
     """
     
-    endpoint = "https://api.e-stat.go.jp/rest/3.0/app/json/getStatsData"
+    endpoint = f"{_get_estat_api_base_url()}/getStatsData"
     # appIdを取得して利用する
     app_id = os.getenv("APP_ID")
     
     max_number = get_estat_data_limit()
+    set_span_attributes(statsDataId=statsDataId, filters=json.dumps(filters or {}, ensure_ascii=False))
+    
+    if plan is None:
+        try:
+            plan = plan_estat_fetch(statsDataId, filters)
+        except Exception as e:
+            # メタ情報が取得できない場合は、取得後の件数チェックのみで判断する
+            logging.csv_error(f"取得計画の作成に失敗しました: {str(e)}")
+    if plan is not None:
+        set_span_attributes(strategy=plan["strategy"])
+    if plan is not None and plan["strategy"] == EstatFetchStrategy.REFUSED.value:
+        return _build_refused_message(plan["reason"])
     
     params = {
         "appId": app_id,
         "statsDataId": statsDataId,
         "startPosition": 1,
-        "limit": max_number,
-        "lang": "J"
+        "limit": min(max_number, ESTAT_PAGE_SIZE),
+        "lang": "J",
+        **build_narrowing_params(filters),
     }
     try:
-        logging.csv_info(f"Fetching data for statsDataId: {statsDataId}")
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
+        logging.csv_info(f"Fetching data for statsDataId: {statsDataId}, filters: {filters}")
+        data = _fetch_stats_data_page(endpoint, params)
         #logging.csv_info(f"Fetched data: {data}")
         
-        # ステータスチェックを行う
-        # estatの統計データ取得APIではデータが見つからなかった場合でもHTTP Statusは200で返却される。
-        # 返却データ　内のSTATUSが0であることで取得成功となっている。
-        if data.get("GET_STATS_DATA", {}).get("RESULT", {}).get("STATUS") == 0:
-            total_data_count = data.get("GET_STATS_DATA", {}).get("STATISTICAL_DATA", {}).get("RESULT_INF", {}).get("TOTAL_NUMBER")
-            logging.csv_info(f"Total data count: {total_data_count}")
-            if total_data_count > max_number:
-                return (
-                    f"データが**{max_number:,}**件以上({total_data_count:,}件)あるため、この機能では扱えません。  \n"
-                    "e-Statのデータ取得上限を上げるか、ExcelやCSVなどでのデータの取得をご検討ください。  \n"
-                    "※取得するデータ量が多い場合、通信に時間がかかったり、ブラウザの動作が重くなることがあるため、ご注意ください。"
-                )
-            
-            return data
-        else:
-            error_msg = data.get("GET_STATS_DATA", {}).get("RESULT", {}).get("ERROR_MSG")
-            raise Exception(error_msg)
+        result_inf = data.get("GET_STATS_DATA", {}).get("STATISTICAL_DATA", {}).get("RESULT_INF", {})
+        total_data_count = result_inf.get("TOTAL_NUMBER")
+        logging.csv_info(f"Total data count: {total_data_count}")
+        set_span_attributes(total_number=total_data_count)
+        # 絞り込み条件がある場合は推定件数と実際の件数が異なるため、取得後にも件数を確認する
+        if total_data_count > max_number:
+            return _build_refused_message(f"データが**{max_number:,}**件以上({total_data_count:,}件)あるため、この機能では扱えません。")
+        
+        # 続きのデータがある場合はNEXT_KEYから残りのページを取得する
+        next_key = result_inf.get("NEXT_KEY")
+        if next_key is not None:
+            _fetch_remaining_pages(endpoint, params, data, next_key, total_data_count, progress_callback)
+        
+        set_span_attributes(rows=len(_get_values(data)))
+        return data
     except requests.exceptions.RequestException as e:
         logging.csv_error(f"APIリクエストでエラーが発生しました: {str(e)}")
         raise Exception(f"APIリクエストエラー: {str(e)}")
@@ -63,12 +171,120 @@ def fetch_estat_data(statsDataId: str):
         logging.csv_error(f"予期せぬエラーが発生しました: {str(e)}")
         raise Exception(f"その他のエラー: {str(e)}")
 
-def get_estat_data_count(statsDataId: str):
+def _get_estat_api_base_url() -> str:
     """
-    e-Statの統計データの数を取得します。
+    e-Stat APIのベースURLを返します。
+    検証環境などでAPIの代わりのサーバーを使用する場合は、環境変数ESTAT_API_BASE_URLで変更できます。
+    """
+    return os.getenv("ESTAT_API_BASE_URL", DEFAULT_ESTAT_API_BASE_URL).rstrip("/")
+
+def _fetch_stats_data_page(endpoint: str, params: dict):
+    """
+    e-Statの統計データを1ページ分取得します。
+    """
+    return _request_estat_api(endpoint, params, "GET_STATS_DATA")
+
+def _request_estat_api(endpoint: str, params: dict, result_key: str):
+    """
+    e-Stat APIを呼び出し、レスポンスのJSONを返します。
+    同じエンドポイント・パラメータで取得済みのレスポンスがキャッシュにある場合は、APIを呼び出さずにキャッシュから返します。
+    
+    Args:
+        endpoint: APIのエンドポイント
+        params: リクエストパラメータ
+        result_key: レスポンスのルートのキー（GET_STATS_DATA, GET_META_INFO）
+    """
+    cache = get_estat_cache()
+    cache_key = make_estat_cache_key(endpoint, params)
+    cached_data = cache.get(cache_key)
+    if cached_data is not None:
+        set_span_attributes(cache_hit=True)
+        cache_requests_total.inc(cache="estat", result="hit")
+        return cached_data
+    cache_requests_total.inc(cache="estat", result="miss")
+    
+    data = get_estat_client().get_json(endpoint, params)
+    
+    # ステータスチェックを行う
+    # estatの統計データ取得APIではデータが見つからなかった場合でもHTTP Statusは200で返却される。
+    # 返却データ　内のSTATUSが0であることで取得成功となっている。
+    if data.get(result_key, {}).get("RESULT", {}).get("STATUS") != 0:
+        error_msg = data.get(result_key, {}).get("RESULT", {}).get("ERROR_MSG")
+        raise Exception(error_msg)
+    
+    # 取得に成功したレスポンスのみキャッシュする
+    cache.set(cache_key, data)
+    return data
+
+def _get_values(data: dict) -> list:
+    """
+    統計データのVALUEを配列で返します。
+    データが1件の場合、e-Statは配列ではなくオブジェクトで返却するため配列に変換します。
     """
+    values = data["GET_STATS_DATA"]["STATISTICAL_DATA"].get("DATA_INF", {}).get("VALUE", [])
+    if isinstance(values, dict):
+        return [values]
+    return values
+
+def _fetch_remaining_pages(endpoint: str, params: dict, data: dict, next_key: int, total_data_count: int, progress_callback=None):
+    """
+    2ページ目以降の統計データを並列に取得し、1ページ目のデータに結合します。
+    ページは到着した順に受け取り、取得位置の順番を保ったまま結合します。
+    """
+    page_size = params["limit"]
+    start_positions = list(range(next_key, total_data_count + 1, page_size))
+    logging.csv_info(f"Fetching {len(start_positions)} more pages (page size: {page_size})")
+    
+    values = _get_values(data)
+    fetched_count = len(values)
+    if progress_callback is not None:
+        progress_callback(fetched_count, total_data_count)
     
-    endpoint = "https://api.e-stat.go.jp/rest/3.0/app/json/getMetaInfo"
+    pending_pages = {}  # 順番待ちのページ（開始位置 -> VALUE）
+    merge_index = 0  # 次に結合するページのインデックス
+    with create_thread_pool(ESTAT_FETCH_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(_fetch_stats_data_page, endpoint, {**params, "startPosition": start_position}): start_position
+            for start_position in start_positions
+        }
+        try:
+            for future in as_completed(futures):
+                page_values = _get_values(future.result())
+                pending_pages[futures[future]] = page_values
+                fetched_count += len(page_values)
+                
+                # 順番が揃ったページから結合する
+                while merge_index < len(start_positions) and start_positions[merge_index] in pending_pages:
+                    values.extend(pending_pages.pop(start_positions[merge_index]))
+                    merge_index += 1
+                
+                if progress_callback is not None:
+                    progress_callback(fetched_count, total_data_count)
+        except Exception:
+            # 1ページでも失敗した場合は、未実行のページの取得を取り消す
+            for future in futures:
+                future.cancel()
+            raise
+    
+    statistical_data = data["GET_STATS_DATA"]["STATISTICAL_DATA"]
+    statistical_data.setdefault("DATA_INF", {})["VALUE"] = values
+    result_inf = statistical_data["RESULT_INF"]
+    result_inf["FROM_NUMBER"] = 1
+    result_inf["TO_NUMBER"] = len(values)
+    result_inf.pop("NEXT_KEY", None)
+
+def get_estat_meta_info(statsDataId: str):
+    """
+    e-Statの統計データのメタ情報（TABLE_INF, CLASS_INF）を取得します。
+    
+    Args:
+        statsDataId: 統計データID
+    
+    Returns:
+        メタ情報のJSON（METADATA_INF）
+    """
+    
+    endpoint = f"{_get_estat_api_base_url()}/getMetaInfo"
     # appIdを取得して利用する
     app_id = os.getenv("APP_ID")
     
@@ -81,18 +297,8 @@ def get_estat_data_count(statsDataId: str):
     
     try:
         logging.csv_info(f"Fetching meta info for statsDataId: {statsDataId}")
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
-    
-        # ステータスチェックを行う
-        # estatの統計データ取得APIではデータが見つからなかった場合でもHTTP Statusは200で返却される。
-        # 返却データ　内のSTATUSが0であることで取得成功となっている。
-        if data.get("GET_META_INFO", {}).get("RESULT", {}).get("STATUS") == 0:
-            return data.get("GET_META_INFO", {}).get("METADATA_INF", {}).get("TABLE_INF", {}).get("OVERALL_TOTAL_NUMBER")
-        else:
-            error_msg = data.get("GET_META_INFO", {}).get("RESULT", {}).get("ERROR_MSG")
-            raise Exception(error_msg)
+        data = _request_estat_api(endpoint, params, "GET_META_INFO")
+        return data.get("GET_META_INFO", {}).get("METADATA_INF", {})
     except requests.exceptions.RequestException as e:
         logging.csv_error(f"APIリクエストでエラーが発生しました: {str(e)}")
         raise Exception(f"APIリクエストエラー: {str(e)}")
@@ -102,3 +308,38 @@ def get_estat_data_count(statsDataId: str):
     except Exception as e:
         logging.csv_error(f"予期せぬエラーが発生しました: {str(e)}")
         raise Exception(f"その他のエラー: {str(e)}")
+
+@traced("estat.get_estat_data_count")
+def get_estat_data_count(statsDataId: str):
+    """
+    e-Statの統計データの数を取得します。
+    """
+    set_span_attributes(statsDataId=statsDataId)
+    meta_info = get_estat_meta_info(statsDataId)
+    total_number = meta_info.get("TABLE_INF", {}).get("OVERALL_TOTAL_NUMBER")
+    set_span_attributes(total_number=total_number)
+    return total_number
+
+def get_estat_data_counts(stats_data_ids: list) -> list:
+    """
+    複数の統計データの数を並列に取得します。
+    同時に取得する数はESTAT_META_INFO_MAX_WORKERSまでとします。
+    
+    Args:
+        stats_data_ids: 統計データIDの配列
+    
+    Returns:
+        統計データIDと同じ順番の配列。取得に失敗した要素はその例外を格納します。
+    """
+    if len(stats_data_ids) == 0:
+        return []
+    
+    with create_thread_pool(min(ESTAT_META_INFO_MAX_WORKERS, len(stats_data_ids))) as executor:
+        futures = [executor.submit(get_estat_data_count, stats_data_id) for stats_data_id in stats_data_ids]
+    
+    results = []
+    for future in futures:
+        # 1件の失敗が他の結果に影響しないよう、例外は結果として返す
+        exception = future.exception()
+        results.append(exception if exception is not None else future.result())
+    return results
@@ -0,0 +1,36 @@
+import os
+import threading
+
+from constants import ESTAT_CACHE_PATH, DEFAULT_ESTAT_CACHE_TTL_SECONDS, DEFAULT_ESTAT_CACHE_MAX_MB
+from utils import DiskCache
+
+_estat_cache = None
+_estat_cache_lock = threading.Lock()
+
+def get_estat_cache() -> DiskCache:
+    """
+    e-Stat APIのレスポンスのキャッシュを返します。
+    TTLと容量の上限は環境変数（ESTAT_CACHE_TTL_SECONDS, ESTAT_CACHE_MAX_MB）で変更できます。
+    """
+    global _estat_cache
+    with _estat_cache_lock:
+        if _estat_cache is None:
+            _estat_cache = DiskCache(
+                path=ESTAT_CACHE_PATH,
+                ttl_seconds=int(os.getenv("ESTAT_CACHE_TTL_SECONDS", DEFAULT_ESTAT_CACHE_TTL_SECONDS)),
+                max_bytes=int(os.getenv("ESTAT_CACHE_MAX_MB", DEFAULT_ESTAT_CACHE_MAX_MB)) * 1024 * 1024,
+            )
+    return _estat_cache
+
+def make_estat_cache_key(endpoint: str, params: dict) -> str:
+    """
+    エンドポイントとパラメータからキャッシュキーを生成します。
+    appIdはユーザーや環境によって変わるが結果には影響しないため、キーに含めません。
+    """
+    return DiskCache.make_key(endpoint, {key: value for key, value in params.items() if key != "appId"})
+
+def get_estat_cache_stats() -> dict:
+    """
+    e-Stat APIのキャッシュのヒット数・ミス数などを返します。
+    """
+    return get_estat_cache().get_stats()
@@ -0,0 +1,158 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import start_span, observe_external_request
+from constants import (
+    ESTAT_API_TIMEOUTS,
+    DEFAULT_ESTAT_API_TIMEOUT,
+    ESTAT_HTTP_POOL_MAXSIZE,
+    ESTAT_HTTP_MAX_RETRIES,
+    ESTAT_HTTP_BACKOFF_BASE_SECONDS,
+    ESTAT_HTTP_BACKOFF_MAX_SECONDS,
+)
+
+# 一時的なエラーとしてリトライするHTTPステータス
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+class EstatHttpClient:
+    """
+    e-Stat API用のHTTPクライアント
+    セッションを共有してコネクションを再利用し、タイムアウトとリトライ（ジッター付き指数バックオフ）を行う
+    """
+
+    def __init__(self, pool_maxsize: int, max_retries: int, backoff_base_seconds: float, backoff_max_seconds: float):
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self._session = requests.Session()
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+        self._session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "bytes_received": 0,
+            "status_codes": {},
+        }
+
+    def get_json(self, endpoint: str, params: dict) -> dict:
+        """
+        GETリクエストを送信し、レスポンスのJSONを返します。
+        5xxエラー・接続エラー・タイムアウトの場合は、リトライ回数の上限までリトライします。
+        """
+        endpoint_name = endpoint.rstrip("/").rsplit("/", 1)[-1]
+        timeout = ESTAT_API_TIMEOUTS.get(endpoint_name, DEFAULT_ESTAT_API_TIMEOUT)
+
+        with start_span("estat.http", endpoint=endpoint_name) as span:
+            return self._get_json_with_retry(endpoint, endpoint_name, params, timeout, span)
+
+    def _get_json_with_retry(self, endpoint: str, endpoint_name: str, params: dict, timeout, span) -> dict:
+        attempt = 0
+        while True:
+            span.set_attribute("attempts", attempt + 1)
+            started_at = time.perf_counter()
+            try:
+                response = self._session.get(endpoint, params=params, timeout=timeout)
+                observe_external_request(
+                    "estat", endpoint_name, response.status_code, time.perf_counter() - started_at, len(response.content)
+                )
+                self._record_response(response)
+                span.set_attributes({"status_code": response.status_code, "bytes": len(response.content)})
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    logging.csv_info(f"e-Stat API returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+                    self._wait_before_retry(attempt)
+                    attempt += 1
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                observe_external_request("estat", endpoint_name, e.__class__.__name__, time.perf_counter() - started_at)
+                if attempt >= self.max_retries:
+                    self._increment("failures")
+                    raise
+                logging.csv_info(f"e-Stat API request failed ({e.__class__.__name__}), retrying ({attempt + 1}/{self.max_retries})")
+                self._wait_before_retry(attempt)
+                attempt += 1
+            except requests.exceptions.RequestException:
+                self._increment("failures")
+                raise
+
+    def _wait_before_retry(self, attempt: int):
+        # 複数のリクエストが同時にリトライしないよう、待ち時間をランダムにずらす（フルジッター）
+        backoff = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        self._increment("retries")
+        time.sleep(random.uniform(0, backoff))
+
+    def _record_response(self, response):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["bytes_received"] += len(response.content)
+            status_codes = self._stats["status_codes"]
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    def _increment(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get_stats(self) -> dict:
+        """
+        リクエスト数・リトライ数などの統計情報と、コネクションプールの状態を返します。
+        """
+        with self._lock:
+            stats = {**self._stats, "status_codes": dict(self._stats["status_codes"])}
+        stats["pools"] = self._get_pool_stats()
+        return stats
+
+    def _get_pool_stats(self) -> list:
+        pools = []
+        pool_manager = self._adapter.poolmanager
+        for pool_key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(pool_key)
+            if pool is None:
+                continue
+            # コネクションプールのキューには未作成の枠としてNoneが入っているため、それ以外を待機中のコネクションとして数える
+            idle_connections = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+            pools.append({
+                "host": pool.host,
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": idle_connections,
+            })
+        return pools
+
+_estat_client = None
+_estat_client_lock = threading.Lock()
+
+def get_estat_client() -> EstatHttpClient:
+    """
+    プロセス内で共有するe-Stat API用のHTTPクライアントを返します。
+    """
+    global _estat_client
+    with _estat_client_lock:
+        if _estat_client is None:
+            _estat_client = EstatHttpClient(
+                pool_maxsize=ESTAT_HTTP_POOL_MAXSIZE,
+                max_retries=ESTAT_HTTP_MAX_RETRIES,
+                backoff_base_seconds=ESTAT_HTTP_BACKOFF_BASE_SECONDS,
+                backoff_max_seconds=ESTAT_HTTP_BACKOFF_MAX_SECONDS,
+            )
+    return _estat_client
+
+def get_estat_client_stats() -> dict:
+    """
+    e-Stat API用のHTTPクライアントの統計情報を返します。
+    """
+    return get_estat_client().get_stats()
@@ -1,12 +1,25 @@
 from typing import List
+import json
 import os
 import logging
+import time
 
 from serpapi.google_search import GoogleSearch
 
+from utils import traced, set_span_attributes, observe_external_request, cache_requests_total
+from .serp_cache import (
+    get_serp_api_cache,
+    make_serp_api_cache_key,
+    record_serp_api_cache_result,
+    serp_api_single_flight,
+)
+
+@traced("serpapi.fetch_estat_urls")
 def fetch_estat_urls(serp_api_query: str) -> List:
     """
     e-Statのサイト内検索を行い、検索結果上位のサイト20件を返します。
+    同じクエリ（正規化したもの）の検索結果がキャッシュにある場合は、SerpAPIを呼び出さずにキャッシュから返します。
+    同じクエリの検索が他のセッションで実行中の場合は、完了を待ってその結果を返します。
   
     Args:
       search_query: 検索キーワード
@@ -15,7 +28,28 @@ def fetch_estat_urls(serp_api_query: str) -> List:
         List[dict]: 検索結果の配列
         str: エラーメッセージ
     """
+    # 正規化したクエリはキャッシュキーにのみ使用し、SerpAPIには元のクエリを送る（演算子の値は大文字・小文字を区別するため）
+    cache = get_serp_api_cache()
+    cache_key = make_serp_api_cache_key(serp_api_query)
+    cached_results = cache.get(cache_key)
+    if cached_results is not None:
+        set_span_attributes(cache_hit=True, rows=len(cached_results))
+        cache_requests_total.inc(cache="serpapi", result="hit")
+        record_serp_api_cache_result("hits")
+        return cached_results
+
+    search_results, coalesced = serp_api_single_flight.do(
+        cache_key, lambda: _search_estat_urls(serp_api_query, cache_key)
+    )
+    set_span_attributes(cache_hit=False, coalesced=coalesced)
+    cache_requests_total.inc(cache="serpapi", result="coalesced" if coalesced else "miss")
+    record_serp_api_cache_result("coalesced" if coalesced else "misses")
+    return search_results
 
+def _search_estat_urls(serp_api_query: str, cache_key: str) -> List:
+    """
+    SerpAPIを呼び出して検索結果を返します。エラーのレスポンス以外はキャッシュに保存します。
+    """
     params = {
         "engine": "google",
         "q": serp_api_query,
@@ -23,14 +57,28 @@ def fetch_estat_urls(serp_api_query: str) -> List:
         "num": 20  # 上位20件の結果を取得
     }
   
+    started_at = time.perf_counter()
+    results = None
     try:
         logging.csv_info(f"Fetching URLs for query: {serp_api_query}")
         search = GoogleSearch(params)
+        # 検証環境などでSerpAPIの代わりのサーバーを使用する場合は、環境変数SERPAPI_BASE_URLで変更できる
+        if os.getenv("SERPAPI_BASE_URL"):
+            search.BACKEND = os.getenv("SERPAPI_BASE_URL").rstrip("/")
         results = search.get_dict()
+        # SerpAPIはエラーの場合もレスポンスのerrorに内容を入れて返す
+        observe_external_request(
+            "serpapi",
+            "search",
+            "error" if "error" in results else "ok",
+            time.perf_counter() - started_at,
+            len(json.dumps(results, ensure_ascii=False).encode("utf-8")),
+        )
         #logging.csv_info(f"Results: {results}")
         
         if "organic_results" not in results:
             logging.csv_info("No organic results found")
+            # 検索結果が0件の場合もSerpAPIはerrorを返すため、キャッシュせずに次回も検索する
             return [] # 検索結果が見つからなかった場合
 
         search_results = []
@@ -47,8 +95,13 @@ def fetch_estat_urls(serp_api_query: str) -> List:
                 }
             )
 
+        set_span_attributes(rows=len(search_results))
+        get_serp_api_cache().set(cache_key, search_results)
         return search_results
   
     except Exception as e:
+        # 検索結果の取得前のエラー（接続エラーなど）のみ記録する
+        if results is None:
+            observe_external_request("serpapi", "search", e.__class__.__name__, time.perf_counter() - started_at)
         logging.csv_error(e)
         raise Exception(f"検索中にエラーが発生しました: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import re
+import threading
+import unicodedata
+
+from constants import SERPAPI_CACHE_PATH, DEFAULT_SERPAPI_CACHE_TTL_SECONDS, DEFAULT_SERPAPI_CACHE_MAX_MB
+from utils import DiskCache, SingleFlight
+
+_serp_api_cache = None
+_serp_api_cache_lock = threading.Lock()
+
+# 同じクエリの検索が実行中の場合は、完了を待って同じ結果を返す
+serp_api_single_flight = SingleFlight()
+
+# キャッシュから返した回数、SerpAPIを呼び出した回数、実行中の検索の結果を共有した回数
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+
+def get_serp_api_cache() -> DiskCache:
+    """
+    SerpAPIの検索結果のキャッシュを返します。
+    TTLと容量の上限は環境変数（SERPAPI_CACHE_TTL_SECONDS, SERPAPI_CACHE_MAX_MB）で変更できます。
+    """
+    global _serp_api_cache
+    with _serp_api_cache_lock:
+        if _serp_api_cache is None:
+            _serp_api_cache = DiskCache(
+                path=SERPAPI_CACHE_PATH,
+                ttl_seconds=int(os.getenv("SERPAPI_CACHE_TTL_SECONDS", DEFAULT_SERPAPI_CACHE_TTL_SECONDS)),
+                max_bytes=int(os.getenv("SERPAPI_CACHE_MAX_MB", DEFAULT_SERPAPI_CACHE_MAX_MB)) * 1024 * 1024,
+            )
+    return _serp_api_cache
+
+def normalize_serp_api_query(serp_api_query: str) -> str:
+    """
+    検索結果が変わらない表記ゆれ（全角・半角、空白の数）を統一します。
+    SerpApiQueryの演算子の値（inurl:fileKind=0など）は大文字・小文字を区別するため、大文字・小文字は統一しません。
+    """
+    query = unicodedata.normalize("NFKC", serp_api_query)
+    return re.sub(r"\s+", " ", query).strip()
+
+def make_serp_api_cache_key(serp_api_query: str) -> str:
+    """
+    正規化したクエリ（サイトの指定と検索キーワード）からキャッシュキーを生成します。
+    """
+    return DiskCache.make_key("serpapi.search", {"q": normalize_serp_api_query(serp_api_query)})
+
+def record_serp_api_cache_result(result: str):
+    """
+    キャッシュの参照結果（hits, misses, coalesced）を集計します。
+    """
+    with _stats_lock:
+        _stats[result] += 1
+
+def get_serp_api_cache_stats() -> dict:
+    """
+    SerpAPIのキャッシュのヒット率と、キャッシュ・リクエストの集約によって呼び出さずに済んだ回数などを返します。
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    saved_calls = stats["hits"] + stats["coalesced"]
+    requests_count = saved_calls + stats["misses"]
+    disk_stats = get_serp_api_cache().get_stats()
+    return {
+        **stats,
+        "saved_calls": saved_calls,
+        "hit_ratio": saved_calls / requests_count if requests_count > 0 else 0.0,
+        "evictions": disk_stats["evictions"],
+        "entries": disk_stats["entries"],
+        "bytes": disk_stats["bytes"],
+    }
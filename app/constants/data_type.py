@@ -10,4 +10,10 @@ FETCH_DATA_TYPE = [
     FetchDataType.EXCEL.value,
     FetchDataType.CSV.value,
     FetchDataType.PDF.value
-]
\ No newline at end of file
+]
+
+class EstatFetchStrategy(Enum):
+    SINGLE = "一括取得"
+    PAGINATED = "ページ分割取得"
+    FILTERED = "絞り込み取得"
+    REFUSED = "取得不可"
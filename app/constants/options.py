@@ -10,5 +10,118 @@ SAVE_DATA_OPTIONS = ["保存する", "保存しない"]
 # e-Statのデータ取得上限
 DEFAULT_ESTAT_DATA_LIMIT = 100000
 
+# e-Statのデータ取得上限として設定できる最大値（ページ分割して取得するため、APIの1回あたりの上限を超えて設定できる）
+MAX_ESTAT_DATA_LIMIT = 1000000
+
+# e-Statのデータをページ分割して取得する際の1ページあたりの件数（APIの1回あたりの上限は100,000件）
+ESTAT_PAGE_SIZE = 50000
+
+# e-Statのデータをページ分割して取得する際の同時取得数
+ESTAT_FETCH_MAX_WORKERS = 4
+
 # USD/JPYのレート
 DEFAULT_USD_JPY_RATE = 150.0
+
+# e-Stat APIのレスポンスをキャッシュする期間（秒）
+DEFAULT_ESTAT_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# e-Stat APIのレスポンスのキャッシュの容量上限（MB）
+DEFAULT_ESTAT_CACHE_MAX_MB = 500
+
+# e-Stat APIのベースURL（環境変数ESTAT_API_BASE_URLで変更できる）
+DEFAULT_ESTAT_API_BASE_URL = "https://api.e-stat.go.jp/rest/3.0/app/json"
+
+# e-Stat APIのタイムアウト（接続タイムアウト秒, 読み込みタイムアウト秒）
+ESTAT_API_TIMEOUTS = {
+    "getStatsData": (5, 60),
+    "getMetaInfo": (5, 15),
+}
+DEFAULT_ESTAT_API_TIMEOUT = (5, 30)
+
+# e-Stat APIのコネクションプールの最大接続数
+ESTAT_HTTP_POOL_MAXSIZE = 10
+
+# e-Stat APIのリトライ回数と待ち時間（秒）
+ESTAT_HTTP_MAX_RETRIES = 3
+ESTAT_HTTP_BACKOFF_BASE_SECONDS = 0.5
+ESTAT_HTTP_BACKOFF_MAX_SECONDS = 8
+
+# e-Statのメタ情報（データ件数）を同時に取得する数
+ESTAT_META_INFO_MAX_WORKERS = 5
+
+# 検索結果の概要をLLMで生成する際の同時実行数
+LLM_SUMMARY_MAX_CONCURRENCY = 5
+
+# SerpAPIの検索結果をキャッシュする期間（秒）と容量の上限（MB）
+DEFAULT_SERPAPI_CACHE_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_SERPAPI_CACHE_MAX_MB = 20
+
+# LLMの応答（検索キーワード・検索結果の概要）をキャッシュする期間（秒）と容量の上限（MB）
+DEFAULT_LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_LLM_CACHE_MAX_MB = 50
+
+# LLMの応答のキャッシュで、正規化した入力（全角・半角や空白、末尾の句読点の違いを無視）での一致も使用するか
+DEFAULT_LLM_CACHE_NORMALIZED_MATCH = True
+
+# 統計表IDやe-StatのURLと一緒に入力されても、データの表示の依頼とみなす文言（空白・句読点を除いた残りの文字列に完全一致する場合）
+# これ以外の文言（整形の指示など）を含む場合は、エージェントで処理する
+INTENT_FAST_PATH_FILLER_PATTERN = r"(統計表ID|統計表|統計データ|ID|URL)?(の|は|:|：)?(統計)?(データ|統計表|表)?(を)?(表示|取得|見せ|教え|出)?(して|し|て)?(ください|下さい|ほしい|欲しい)?"
+
+# 生成AIのAPIのプロバイダーごとの設定（プロセス内で共有する）
+# max_connections: HTTPの最大接続数（キープアライブで再利用する）
+# max_concurrency: APIの同時呼び出し数の上限（超えた場合は空くまで待つ）
+# timeout: タイムアウト（秒）
+# 環境変数 LLM_<プロバイダー>_<設定名>（例: LLM_OPENAI_MAX_CONNECTIONS）で変更できる
+LLM_PROVIDER_SETTINGS = {
+    "openai": {"max_connections": 20, "max_concurrency": 10, "timeout": 60},
+    "google": {"max_connections": 20, "max_concurrency": 10, "timeout": 60},
+    "anthropic": {"max_connections": 20, "max_concurrency": 10, "timeout": 60},
+}
+
+# e-Statのデータ取得時に1セッションで許容するメモリ使用量の上限（MB、環境変数ESTAT_MEMORY_BUDGET_MBで変更できる）
+# 取得上限の1,000,000件（約570MB）より先に効くよう、上限より小さい値とする
+DEFAULT_ESTAT_MEMORY_BUDGET_MB = 512
+
+# e-Statのデータ1件あたりのメモリ使用量の推定値（バイト、JSONを辞書として保持した場合）
+ESTAT_ESTIMATED_BYTES_PER_CELL = 600
+
+# 表示用に変換した統計データをメモリに保持する件数（プロセス内で共有）
+PROCESSED_DATA_CACHE_MAX_ENTRIES = 20
+
+# 表示用に変換した統計データをメモリに保持する容量の上限（MB、DataFrameのメモリ使用量の合計。プロセス内で共有）
+PROCESSED_DATA_CACHE_MAX_MB = 512
+
+# ログをCSVファイルにまとめて書き込む件数と間隔（秒）
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+
+# 書き込み待ちのログの書き込みを待つ時間の上限（秒、ZIPでのダウンロード前などに使用する）
+LOG_FLUSH_TIMEOUT_SECONDS = 10
+
+# ログディレクトリのファイル一覧・サイズをディスクと突き合わせる間隔（秒）
+LOG_STORAGE_RECONCILE_INTERVAL_SECONDS = 300
+
+# エージェント・ツールの入出力をログに記録する際の内容の上限（バイト）と、内容を記録する割合
+DEFAULT_LOG_PAYLOAD_MAX_BYTES = 2000
+DEFAULT_LOG_PAYLOAD_SAMPLE_RATE = 1.0
+
+# ログをZIPでダウンロードする際に一度に読み込むサイズ（バイト）
+LOG_EXPORT_CHUNK_SIZE = 1024 * 1024
+
+# ダウンロード用に一時ファイルとして作成したログのZIPを、ダウンロードされなかった場合に削除するまでの時間（秒）
+LOG_EXPORT_FILE_TTL_SECONDS = 60 * 60
+
+# ログ検索で1ページに表示する件数
+LOG_SEARCH_PAGE_SIZE = 50
+
+# 描画時間を集計する直近の再実行の回数と、保存するプロファイルのスナップショットの数
+RENDER_PROFILE_WINDOW_SIZE = 100
+RENDER_PROFILE_MAX_SNAPSHOTS = 20
+
+# メトリクスのヒストグラムのバケット（レイテンシは秒、レスポンスのサイズはバイト）
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRICS_BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+# メトリクスでアクティブとみなすセッションの最終アクセスからの時間（秒）と、st.session_stateのサイズを計算する間隔（秒）
+METRICS_SESSION_TTL_SECONDS = 1800
+METRICS_SESSION_STATE_INTERVAL_SECONDS = 30
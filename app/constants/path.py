@@ -1,4 +1,9 @@
 PANDAS_AI_IMG_OUTPUT_PATH = "/app/exports/charts/temp_chart.png"
 LOG_DIR = "logs"
-LOGS_ZIP_PATH = "logs/logs.zip"
-MAX_LOGS_DIR_SIZE_MB = 300
\ No newline at end of file
+MAX_LOGS_DIR_SIZE_MB = 300
+MAX_LOG_FILE_SIZE_MB = 10
+ESTAT_CACHE_PATH = "cache/estat_cache.sqlite3"
+LLM_CACHE_PATH = "cache/llm_cache.sqlite3"
+SERPAPI_CACHE_PATH = "cache/serpapi_cache.sqlite3"
+LOG_INDEX_PATH = "cache/log_index.sqlite3"
+RENDER_PROFILE_DIR = "logs/profiles"
@@ -5,7 +5,8 @@ from pathlib import Path
 
 import streamlit as st
 
-from session import initialize_session_state
+from session import initialize_session_state, get_session_id
+from utils import start_metrics_server, record_session_state
 from views import (
     init_sidebar,
     display_messages,
@@ -21,6 +22,9 @@ from services import (
     move_to_main,
     check_is_authenticated,
     setup_agent,
+    start_render_profile,
+    end_render_profile,
+    measure_render,
 )
 
 # .envファイルのパスを構築
@@ -32,38 +36,55 @@ load_dotenv(env_path)
 # セッション状態の初期化
 initialize_session_state()
 
+# メトリクスのHTTPサーバーの起動（環境変数METRICS_PORTが設定されている場合のみ）
+start_metrics_server()
 
-# ページの表示を分岐
-if st.session_state["page"] == "login":
-    # ログインページのタイトルを表示
-    display_login_page_title()
-    login()  # ログイン処理
 
-    # ログインが成功したらメインページへ移動
-    if check_is_authenticated():
-        move_to_main()
+# 描画時間の計測（有効な場合のみ）
+start_render_profile()
 
+try:
+    # ページの表示を分岐
+    if st.session_state["page"] == "login":
+        # ログインページのタイトルを表示
+        display_login_page_title()
+        login()  # ログイン処理
 
-elif st.session_state["page"] == "main":
-    # ログインしていない場合はログインページへ移動
-    if not check_is_authenticated():
-        move_to_login()
+        # ログインが成功したらメインページへ移動
+        if check_is_authenticated():
+            move_to_main()
 
-    # タイトル
-    display_main_page_title()
 
-    # Langエージェントの初期化
-    agent = setup_agent()
+    elif st.session_state["page"] == "main":
+        # ログインしていない場合はログインページへ移動
+        if not check_is_authenticated():
+            move_to_login()
 
-    # ファイルのアップロード
-    file, header = FileUploader().upload_file()
+        # タイトル
+        display_main_page_title()
 
-    # サイドバーの初期化と表示
-    init_sidebar(file)
+        # Langエージェントの初期化
+        with measure_render("setup_agent"):
+            agent = setup_agent()
 
-    # 過去のメッセージを表示
-    display_messages()
+        # ファイルのアップロード
+        with measure_render("file_uploader"):
+            file, header = FileUploader().upload_file()
 
-    # プロンプトの入力と応答生成
-    prompt = PromptInput(file).handle_prompt_input()
-    AgentOutput(agent, prompt, file, header).handle_agent_output()
+        # サイドバーの初期化と表示
+        with measure_render("init_sidebar"):
+            init_sidebar(file)
+
+        # 過去のメッセージを表示
+        with measure_render("display_messages"):
+            display_messages()
+
+        # プロンプトの入力と応答生成
+        with measure_render("prompt_input"):
+            prompt = PromptInput(file).handle_prompt_input()
+        with measure_render("agent_output"):
+            AgentOutput(agent, prompt, file, header).handle_agent_output()
+finally:
+    end_render_profile()
+    # st.session_stateのサイズをメトリクスに記録
+    record_session_state(get_session_id(), st.session_state)
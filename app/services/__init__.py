@@ -1,4 +1,6 @@
 from .streaming_text import *
 from .authentication import *
+from .render_profiling import *
 from .agent import *
-from .calc_costs import *
\ No newline at end of file
+from .intent_router import *
+from .calc_costs import *
@@ -1,13 +1,41 @@
+import threading
+
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import AgentExecutor, create_tool_calling_agent, Tool
 
 from constants import INITIAL_PROMPT
 from session import get_model_name
-from utils import set_llm
+from utils import set_llm, get_llm_factory_version
 from tools import get_estat_data_by_id, get_estat_data_by_url, search_estat_url, format_estat_data
 
+# モデル名 -> エージェント（プロセス内で共有する）
+_agents = {}
+_agents_lock = threading.Lock()
+# エージェントを作成したときのチャットモデルの設定のバージョン（get_llm_factory_version）
+_agents_llm_factory_version = None
+
 def setup_agent():
-    llm = set_llm(get_model_name())
+    """
+    選択中のモデルのエージェントを返します。
+    エージェントはStreamlitの再実行のたびに作り直さず、モデルごとに1回だけ作成してプロセス内で共有します。
+    ツールはセッションの状態を実行時に参照するため、複数のセッションで共有できます。
+    チャットモデルの設定（set_llm_factory）が変更された場合は、共有しているエージェントを作り直します。
+    """
+    global _agents_llm_factory_version
+    model_name = get_model_name()
+    llm_factory_version = get_llm_factory_version()
+    with _agents_lock:
+        if _agents_llm_factory_version != llm_factory_version:
+            _agents.clear()
+            _agents_llm_factory_version = llm_factory_version
+        agent = _agents.get(model_name)
+        if agent is None:
+            agent = _create_agent(model_name)
+            _agents[model_name] = agent
+    return agent
+
+def _create_agent(model_name: str):
+    llm = set_llm(model_name)
 
     tools = [
         Tool(
@@ -1,10 +1,8 @@
 import json
 import logging
 import tiktoken
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
 
-from utils import GenerativeAIModel
+from utils import GenerativeAIModel, set_llm, llm_tokens_total, llm_cost_yen_total
 from constants import MODEL_PRICES
 
 def calc_input_cost(tokens: int, model_name: str):
@@ -14,6 +12,8 @@ def calc_input_cost(tokens: int, model_name: str):
         input_price *= 2
     input_cost = _convert_usd_to_jpy(tokens * input_price)
     logging.csv_info(f"input_cost: {input_cost:.5f}円")
+    llm_tokens_total.inc(tokens, model=model_name, type="input")
+    llm_cost_yen_total.inc(input_cost, model=model_name, type="input")
     return input_cost
 
 def calc_output_cost(tokens: int, model_name: str):
@@ -23,6 +23,8 @@ def calc_output_cost(tokens: int, model_name: str):
         output_price *= 2
     output_cost = _convert_usd_to_jpy(tokens * output_price)
     logging.csv_info(f"output_cost: {output_cost:.5f}円")
+    llm_tokens_total.inc(tokens, model=model_name, type="output")
+    llm_cost_yen_total.inc(output_cost, model=model_name, type="output")
     return output_cost
 
 def calc_input_cost_from_prompt(query: str, model_name: str):
@@ -42,7 +44,8 @@ def _get_token_counts(text: str, model_name: str) -> int:
     if model_name == GenerativeAIModel.GEMINI_PRO.value:  # GEMINI_PRO
         if isinstance(text, dict):
             text = json.dumps(text, ensure_ascii=False)
-        llm = ChatGoogleGenerativeAI(model=model_name)
+        # トークン数の計算にも、共有しているチャットモデル（接続）を使用する
+        llm = set_llm(model_name)
         return llm.get_num_tokens(text)
     elif model_name == GenerativeAIModel.GPT_4O.value:  # GPT_4O
         encoding = tiktoken.encoding_for_model(model_name)
@@ -52,5 +55,10 @@ def _get_token_counts(text: str, model_name: str) -> int:
     elif model_name == GenerativeAIModel.CLAUDE_SONNET.value:  # CLAUDE_SONNET        
         if isinstance(text, dict):
             text = json.dumps(text, ensure_ascii=False)
-        llm = ChatAnthropic(model=GenerativeAIModel.CLAUDE_SONNET.value)
-        return llm.get_num_tokens(text)
\ No newline at end of file
+        llm = set_llm(model_name)
+        return llm.get_num_tokens(text)
+    else:
+        # 料金の設定がないモデル（検証用のモデルなど）は、文字数をトークン数の目安とする
+        if isinstance(text, dict):
+            text = json.dumps(text, ensure_ascii=False)
+        return len(text)
\ No newline at end of file
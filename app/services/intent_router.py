@@ -0,0 +1,84 @@
+import re
+import logging
+from urllib.parse import urlparse
+
+from constants import INTENT_FAST_PATH_FILLER_PATTERN
+from utils import extract_statdisp_id, intent_routes_total
+from tools import get_estat_data_by_id, get_estat_data_by_url
+
+# 入力中のURL、統計表ID（10桁の数字）
+_URL_PATTERN = re.compile(r"https?://[^\s　<>\"'「」]+")
+_STATS_DATA_ID_PATTERN = re.compile(r"(?<!\d)\d{10}(?!\d)")
+# 統計表ID・URLを除いた残りの文字列から取り除く空白・句読点
+_IGNORED_CHARS_PATTERN = re.compile(r"[\s、。,.!！?？「」『』]")
+
+ROUTE_AGENT = "agent"
+ROUTE_STATS_DATA_ID = "get_estat_data_by_id"
+ROUTE_ESTAT_URL = "get_estat_data_by_url"
+
+class IntentRoute:
+    """
+    ユーザーの入力の振り分け結果
+    routeがagent以外の場合は、エージェント（LLMによるツールの選択）を経由せずにツールを直接実行する
+    """
+    def __init__(self, route: str, reason: str, tool=None, tool_input: str = None):
+        self.route = route
+        self.reason = reason
+        self.tool = tool
+        self.tool_input = tool_input
+
+    @property
+    def is_fast_path(self) -> bool:
+        return self.route != ROUTE_AGENT
+
+    def invoke(self, prompt, callbacks: list = None) -> dict:
+        """
+        ツールを直接実行し、AgentExecutor.invokeと同じ形式の結果を返します。
+        """
+        output = self.tool.invoke(self.tool_input, config={"callbacks": callbacks or []})
+        return {"user_input": [prompt], "output": output}
+
+def route_intent(prompt: str) -> IntentRoute:
+    """
+    ユーザーの入力が統計表IDまたはe-StatのURL（statdisp_id=を含む）だけの場合は、対応するツールを直接実行する経路を返します。
+    対象が複数ある、e-Stat以外のURLを含む、データの表示以外の指示を含むなど、判断できない場合はエージェントで処理します。
+    """
+    route = _route_intent(prompt if isinstance(prompt, str) else "")
+    logging.csv_info(f"intent_route: {route.route} ({route.reason})")
+    intent_routes_total.inc(route=route.route, reason=route.reason)
+    return route
+
+def _route_intent(prompt: str) -> IntentRoute:
+    urls = _URL_PATTERN.findall(prompt)
+    remainder = _URL_PATTERN.sub(" ", prompt)
+    stats_data_ids = _STATS_DATA_ID_PATTERN.findall(remainder)
+    remainder = _STATS_DATA_ID_PATTERN.sub(" ", remainder)
+
+    if not urls and not stats_data_ids:
+        return IntentRoute(ROUTE_AGENT, "no_match")
+
+    # 統計表ID -> (ツール, ツールの入力)
+    targets = {}
+    for url in urls:
+        statdisp_id = extract_statdisp_id(url)
+        if statdisp_id is None or not _is_estat_host(url):
+            return IntentRoute(ROUTE_AGENT, "other_url")
+        if not _STATS_DATA_ID_PATTERN.fullmatch(statdisp_id):
+            return IntentRoute(ROUTE_AGENT, "invalid_statdisp_id")
+        targets.setdefault(statdisp_id, (ROUTE_ESTAT_URL, url))
+    for stats_data_id in stats_data_ids:
+        targets.setdefault(stats_data_id, (ROUTE_STATS_DATA_ID, stats_data_id))
+
+    if len(targets) > 1:
+        return IntentRoute(ROUTE_AGENT, "multiple_targets")
+
+    if not re.fullmatch(INTENT_FAST_PATH_FILLER_PATTERN, _IGNORED_CHARS_PATTERN.sub("", remainder)):
+        return IntentRoute(ROUTE_AGENT, "extra_text")
+
+    route, tool_input = next(iter(targets.values()))
+    tool = get_estat_data_by_url if route == ROUTE_ESTAT_URL else get_estat_data_by_id
+    return IntentRoute(route, "matched", tool, tool_input)
+
+def _is_estat_host(url: str) -> bool:
+    hostname = urlparse(url).hostname or ""
+    return hostname == "e-stat.go.jp" or hostname.endswith(".e-stat.go.jp")
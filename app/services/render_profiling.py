@@ -0,0 +1,44 @@
+import os
+from contextlib import contextmanager
+
+import streamlit as st
+
+from session import get_render_profiler, get_render_profiling_settings
+
+def is_render_profiling_enabled() -> bool:
+    """
+    描画時間の計測が有効かどうかを返します。
+    環境変数RENDER_PROFILEがtrueの場合、または管理者がサイドバーで有効にした場合に計測します。
+    """
+    return os.getenv("RENDER_PROFILE", "false").lower() == "true" or get_render_profiling_settings()["enabled"]
+
+def _is_snapshot_enabled() -> bool:
+    return os.getenv("RENDER_PROFILE_SNAPSHOT", "false").lower() == "true" or get_render_profiling_settings()["with_snapshot"]
+
+def start_render_profile():
+    """
+    再実行の描画時間の計測を開始します。main.pyの先頭で呼び出します。
+    """
+    if is_render_profiling_enabled():
+        get_render_profiler().start_rerun(with_snapshot=_is_snapshot_enabled())
+
+def end_render_profile():
+    """
+    再実行の描画時間の計測を終了します。st.rerun()などで中断された場合も呼び出されるよう、finallyで呼び出します。
+    """
+    # 再実行中に計測を無効にした場合も、開始済みの計測（スナップショット）を終了する
+    # 一度も計測していないセッションではRenderProfilerを作成しない
+    render_profiler = st.session_state.get("render_profiler")
+    if render_profiler is not None:
+        render_profiler.end_rerun()
+
+@contextmanager
+def measure_render(component: str):
+    """
+    withブロック内の処理時間を、コンポーネントの描画時間として計測します。計測が無効な場合は何もしません。
+    """
+    if not is_render_profiling_enabled():
+        yield
+        return
+    with get_render_profiler().measure(component):
+        yield
@@ -2,6 +2,8 @@ from langchain.schema import AgentAction, AgentFinish
 from langchain.callbacks.base import BaseCallbackHandler
 import pandas as pd
 
+from utils import log_payload
+
 class StreamlitCallbackHandler(BaseCallbackHandler):
     """
     CallbackHandlerを継承して、Streamlitでの表示を行うクラス
@@ -23,7 +25,11 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
             self.action_container = self.container.container()
             self.action_container.markdown(f"**Action:** {action.tool}\n**Action Input:** {action.tool_input}")
 
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs):
+        log_payload(f"tool_input ({serialized.get('name')})", input_str)
+
     def on_tool_end(self, output: str, **kwargs):
+        log_payload(f"tool_output ({kwargs.get('name')})", output)
         # ツール実行結果をDataFrameとして表示
         self.observation_container = self.container.container()
         try:
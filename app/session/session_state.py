@@ -1,13 +1,19 @@
+import os
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 from constants import (
     LLM_OPTIONS, 
     SAVE_DATA_OPTIONS,
     DEFAULT_ESTAT_DATA_LIMIT,
     DEFAULT_USD_JPY_RATE,
+    RENDER_PROFILE_WINDOW_SIZE,
+    RENDER_PROFILE_MAX_SNAPSHOTS,
+    RENDER_PROFILE_DIR,
     FetchDataType
 )
-from utils import GenerativeAIModel
+from utils import GenerativeAIModel, is_estat_data, invalidate_processed_data, CompactStatData, RenderProfiler
 
 def initialize_session_state():
     if "page" not in st.session_state:
@@ -48,6 +54,13 @@ def initialize_session_state():
         }
     if "serp_api_results" not in st.session_state:
         st.session_state.serp_api_results = []
+    if "last_trace" not in st.session_state:
+        st.session_state.last_trace = None
+    if "render_profiling" not in st.session_state:
+        st.session_state.render_profiling = {
+            "enabled": False,
+            "with_snapshot": False,
+        }
 
 def set_model_name(model_name):
     if model_name == LLM_OPTIONS[0]:
@@ -76,6 +89,16 @@ def get_user_name():
     if "user_data" not in st.session_state: return None
     return st.session_state.user_data.get("name")
 
+def is_admin():
+    """
+    ログイン中のユーザーが管理者（環境変数ADMIN_USERSにカンマ区切りで指定したユーザー）かどうかを返します。
+    """
+    user_name = get_user_name()
+    if user_name is None:
+        return False
+    admin_users = [name.strip() for name in os.getenv("ADMIN_USERS", "").split(",") if name.strip()]
+    return user_name in admin_users
+
 def get_user_email():
     return st.session_state.user_data.get("email")
 
@@ -116,10 +139,17 @@ def set_agent_message(
     with_btns=False,
     is_formatted=False,
     display_type=None,
+    with_filter_form=False,
 ):
     # 統計データでない場合
     if not is_stat_data:
-        if with_btns:
+        if with_filter_form:
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": content,
+                "with_filter_form": with_filter_form,
+            })
+        elif with_btns:
             st.session_state.messages.append({
                 "role": "assistant",
                 "content": content,
@@ -137,9 +167,15 @@ def set_agent_message(
         # 過去の統計データを削除する
         for message in st.session_state.messages:
             if message.get("is_stat_data"):
+                if is_estat_data(message["content"]):
+                    invalidate_processed_data(message["content"])
                 message["content"] = "この統計データは保存されていません。"
                 message["is_stat_data"] = False
     
+    # e-Statから取得した統計データは、メモリ使用量を抑えるため列形式に変換して保存する
+    if isinstance(content, dict) and is_estat_data(content):
+        content = CompactStatData.from_response(content)
+    
     st.session_state.messages.append({
         "role": "assistant",
         "content": content,
@@ -188,3 +224,37 @@ def set_serp_api_results(contents: list):
 
 def get_serp_api_results():
     return st.session_state.serp_api_results
+
+def set_last_trace(spans: list):
+    st.session_state.last_trace = spans
+
+def get_last_trace():
+    return st.session_state.get("last_trace")
+
+def get_render_profiling_settings():
+    return st.session_state.render_profiling
+
+def set_render_profiling_settings(enabled: bool, with_snapshot: bool):
+    st.session_state.render_profiling = {
+        "enabled": enabled,
+        "with_snapshot": with_snapshot,
+    }
+
+def get_render_profiler():
+    """
+    セッションごとの描画時間の計測結果を保持するRenderProfilerを返します。
+    """
+    if "render_profiler" not in st.session_state:
+        st.session_state.render_profiler = RenderProfiler(
+            window_size=RENDER_PROFILE_WINDOW_SIZE,
+            snapshot_dir=RENDER_PROFILE_DIR,
+            max_snapshots=RENDER_PROFILE_MAX_SNAPSHOTS,
+        )
+    return st.session_state.render_profiler
+
+def get_session_id():
+    """
+    Streamlitのセッションを識別するIDを返します。スクリプトの実行外で呼ばれた場合はNoneを返します。
+    """
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
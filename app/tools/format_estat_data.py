@@ -4,15 +4,15 @@ import pandas as pd
 import streamlit as st
 from langchain_core.tools import tool
 from pandasai import Agent
-from pandasai.llm import OpenAI
 from pandasai.helpers.openai_info import get_openai_callback
 
 from constants import PANDAS_AI_ERROR_MESSAGE, SAVE_DATA_OPTIONS, FORMAT_ESTAT_DATA_PROMPT
 from views import StatDataViewer
-from utils import is_estat_data, GenerativeAIModel
+from utils import is_estat_data, GenerativeAIModel, traced, get_pandasai_llm
 from session import set_agent_message, get_save_data_option, set_llm_input_cost, set_llm_output_cost, get_model_name
 
 @tool
+@traced("tool.format_estat_data")
 def format_estat_data(user_query: str) -> str:
     """
     e-Statの統計データを整形します。
@@ -47,10 +47,11 @@ def format_estat_data(user_query: str) -> str:
     if get_model_name() is not GenerativeAIModel.GPT_4O.value:
         st.info("データの整形にはGPT-4oを使用します。")
 
+    # viewer.dfは他のメッセージと共有しているキャッシュのため、コピーを渡す
     agent = Agent(
-        viewer.df,
+        viewer.df.copy(),
         config={
-            "llm": OpenAI(model_name="gpt-4o"),
+            "llm": get_pandasai_llm(),
             "custom_whitelisted_dependencies": ["plotly"],
         }
     )
@@ -1,11 +1,14 @@
 import logging
 
+import streamlit as st
 from langchain_core.tools import tool
 
-from api import fetch_estat_data
-from utils import delete_newlines, extract_statdisp_id
+from api import fetch_estat_data, plan_estat_fetch
+from utils import delete_newlines, extract_statdisp_id, traced
+from session import set_agent_message
 
 @tool
+@traced("tool.get_estat_data_by_id")
 def get_estat_data_by_id(statsDataId: str) -> str:
     """
     e-Statの統計データを取得します。
@@ -23,12 +26,12 @@ def get_estat_data_by_id(statsDataId: str) -> str:
     statsDataId = delete_newlines(statsDataId)
     
     try:
-        response = fetch_estat_data(statsDataId)
-        return response
+        return _fetch_with_plan(statsDataId)
     except Exception:
         return "指定された統計表IDから統計データを取得することに失敗しました。"
     
 @tool
+@traced("tool.get_estat_data_by_url")
 def get_estat_data_by_url(url: str) -> str:
     """
     e-Statの統計データを取得します。
@@ -50,7 +53,54 @@ def get_estat_data_by_url(url: str) -> str:
         return "指定されたe-statのURLから統計表IDを取得することに失敗しました。"
     
     try:
-        response = fetch_estat_data(statsDataId)
-        return response
+        return _fetch_with_plan(statsDataId)
     except Exception:
-        return "指定されたe-statのURLから統計データを取得することに失敗しました。"
\ No newline at end of file
+        return "指定されたe-statのURLから統計データを取得することに失敗しました。"
+
+def _fetch_with_plan(statsDataId: str):
+    """
+    取得計画を立ててから統計データを取得します。
+    データ件数が多く取得できない場合は、e-Stat側で絞り込んで取得するためのフォームを表示するメッセージを保存します。
+    """
+    try:
+        plan = plan_estat_fetch(statsDataId)
+    except Exception as e:
+        logging.csv_error(f"failed to plan fetch: {e}")
+        plan = None
+    
+    if plan is not None:
+        # 取得方法をユーザーに表示する
+        st.caption(f"{plan['strategy']}: {plan['reason']}")
+    
+    response = fetch_estat_data(statsDataId, progress_callback=_create_progress_callback(), plan=plan)
+    if isinstance(response, str):
+        set_agent_message(
+            content={
+                "statsDataId": statsDataId,
+                "message": response,
+                "plan": plan,
+            },
+            with_filter_form=True,
+        )
+        return "estat_filter_form"
+    return response
+
+def _create_progress_callback():
+    """
+    ページ分割してデータを取得する際の進捗をプログレスバーで表示するコールバックを生成します。
+    """
+    progress_bar = None
+    
+    def callback(fetched_count: int, total_count: int):
+        nonlocal progress_bar
+        if progress_bar is None:
+            progress_bar = st.progress(0.0)
+        progress_bar.progress(
+            min(fetched_count / total_count, 1.0),
+            text=f"データを取得中... {fetched_count:,} / {total_count:,}件",
+        )
+        # 取得が完了したらプログレスバーを消す
+        if fetched_count >= total_count:
+            progress_bar.empty()
+    
+    return callback
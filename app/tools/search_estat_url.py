@@ -7,9 +7,10 @@ from langchain_core.output_parsers import StrOutputParser
 from constants import FetchDataType, SerpApiQuery, SEARCH_ESTAT_URL_PROMPT
 from api import fetch_estat_urls
 from session import get_fetch_data_type, get_model_name, set_llm_input_cost, set_llm_output_cost
-from utils import set_llm
+from utils import set_llm, traced, start_span, get_llm_response_cache
 
 @tool
+@traced("tool.search_estat_url")
 def search_estat_url(user_query: str) -> Union[List[List[dict]], str]:
     """
     e-Statのサイト内検索を行い、検索結果上位のサイト20件から、
@@ -28,17 +29,24 @@ def search_estat_url(user_query: str) -> Union[List[List[dict]], str]:
     # 検索クエリの生成
     prompt = ChatPromptTemplate.from_template(SEARCH_ESTAT_URL_PROMPT)
     chain = prompt | set_llm(get_model_name()) | StrOutputParser()
-    search_query = chain.invoke({"user_query": user_query}).strip()
+    # 同じ質問に対する検索キーワードはキャッシュから返す
+    with start_span("llm.generate_search_query", model=get_model_name()):
+        search_query, cached = get_llm_response_cache().invoke(
+            chain, get_model_name(), SEARCH_ESTAT_URL_PROMPT, {"user_query": user_query}
+        )
+    search_query = search_query.strip()
     
-    from services import calc_input_cost_from_prompt, calc_output_cost_from_result
-    # 入力コストを計算
-    prompt_text = SEARCH_ESTAT_URL_PROMPT.format(user_query=user_query)
-    input_cost = calc_input_cost_from_prompt(prompt_text, get_model_name())
-    set_llm_input_cost(input_cost, get_model_name())
-    
-    # 出力コストを計算
-    output_cost = calc_output_cost_from_result(search_query, get_model_name())
-    set_llm_output_cost(output_cost, get_model_name())
+    # キャッシュから返した場合はLLMを呼び出していないため、コストを計算しない
+    if not cached:
+        from services import calc_input_cost_from_prompt, calc_output_cost_from_result
+        # 入力コストを計算
+        prompt_text = SEARCH_ESTAT_URL_PROMPT.format(user_query=user_query)
+        input_cost = calc_input_cost_from_prompt(prompt_text, get_model_name())
+        set_llm_input_cost(input_cost, get_model_name())
+        
+        # 出力コストを計算
+        output_cost = calc_output_cost_from_result(search_query, get_model_name())
+        set_llm_output_cost(output_cost, get_model_name())
     
     serp_api_query = _set_serp_api_query(get_fetch_data_type(), search_query)
   
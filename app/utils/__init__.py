@@ -1,5 +1,18 @@
 from .logger import *
+from .log_storage import *
+from .log_index import *
+from .log_export import *
 from .formatter import *
 from .file_processor import *
 from .generative_ai_model import *
-from .estat import *
\ No newline at end of file
+from .estat import *
+from .concurrency import *
+from .metrics import *
+from .tracing import *
+from .render_profiler import *
+
+from .disk_cache import *
+from .llm_response_cache import *
+from .processed_data_cache import *
+from .compact_stat_data import *
+from .payload_logger import *
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+from .estat import get_class_objs
+from .processed_data_cache import get_stat_data_key
+
+class CompactStatData:
+    """
+    e-Statの統計データを列形式でコンパクトに保持するクラス
+    セッションに保存する統計データのメモリ使用量を抑えるため、VALUE（セルごとの辞書の配列）を以下の形式で保持する
+    - 分類（@cat01, @area, @timeなど）: CLASSの並び順に対応する整数コードの配列
+    - 値（$）: float64の配列と、数値でない値（"-", "***"など）の位置と種類を表す配列
+    - VALUE以外のメタ情報（CLASS_INFなど）: レスポンスのまま保持
+    表示用のDataFrameへの変換は、表示する時に行う
+    """
+
+    def __init__(self, meta: dict, columns: list, dimensions: dict, values: np.ndarray, special_codes: np.ndarray, special_values: list, key: str):
+        self.meta = meta
+        self.columns = columns
+        self.dimensions = dimensions
+        self.values = values
+        self.special_codes = special_codes
+        self.special_values = special_values
+        self.key = key
+
+    @classmethod
+    def from_response(cls, response: dict):
+        """
+        e-Stat APIのレスポンス（JSON）から生成します。
+        """
+        get_stats_data = response['GET_STATS_DATA']
+        statistical_data = get_stats_data['STATISTICAL_DATA']
+        data_inf = statistical_data.get('DATA_INF', {})
+        raw_values = data_inf.get('VALUE', [])
+        # データが1件の場合、e-Statは配列ではなくオブジェクトで返却する
+        if isinstance(raw_values, dict):
+            raw_values = [raw_values]
+
+        # VALUE以外のメタ情報
+        meta = {
+            **response,
+            'GET_STATS_DATA': {
+                **get_stats_data,
+                'STATISTICAL_DATA': {
+                    **statistical_data,
+                    'DATA_INF': {key: value for key, value in data_inf.items() if key != 'VALUE'},
+                },
+            },
+        }
+
+        df = pd.DataFrame(raw_values)
+        class_codes = {
+            '@' + class_obj['@id']: [obj['@code'] for obj in class_obj['CLASS']]
+            for class_obj in get_class_objs(statistical_data.get('CLASS_INF', {}))
+        }
+
+        dimensions = {}
+        for column in df.columns:
+            if column == '$':
+                continue
+            dimensions[column] = cls._encode_column(df[column], class_codes.get(column, []))
+
+        if '$' in df.columns:
+            values, special_codes, special_values = cls._encode_values(df['$'])
+        else:
+            values = np.full(len(df), np.nan)
+            special_codes = np.full(len(df), -1, dtype=np.int8)
+            special_values = []
+
+        return cls(
+            meta=meta,
+            columns=list(df.columns),
+            dimensions=dimensions,
+            values=values,
+            special_codes=special_codes,
+            special_values=special_values,
+            key=get_stat_data_key(response),
+        )
+
+    @staticmethod
+    def _encode_column(column: pd.Series, class_codes: list):
+        """
+        分類の列を整数コードの配列に変換します。
+        カテゴリはCLASSの並び順とし、CLASSに存在しない値は末尾に追加します。
+        """
+        categorical = pd.Categorical(column)
+        categories = pd.Index(class_codes, dtype=object).drop_duplicates()
+        if len(categorical.categories) == 0:
+            return np.full(len(column), -1, dtype=_get_code_dtype(len(categories))), list(categories)
+
+        categories = categories.append(categorical.categories.difference(categories, sort=False))
+        category_positions = categories.get_indexer(categorical.categories)
+        codes = np.where(categorical.codes >= 0, category_positions[categorical.codes], -1)
+        return codes.astype(_get_code_dtype(len(categories))), list(categories)
+
+    @staticmethod
+    def _encode_values(column: pd.Series):
+        """
+        値の列をfloat64の配列に変換します。
+        数値でない値（"-", "***"など）はNaNとし、その種類を別の配列に保持します。
+        """
+        values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+        special_mask = np.isnan(values) & column.notna().to_numpy()
+        special_codes, special_values = pd.factorize(column[special_mask])
+        all_special_codes = np.full(len(column), -1, dtype=_get_code_dtype(len(special_values)))
+        all_special_codes[special_mask] = special_codes
+        return values, all_special_codes, list(special_values)
+
+    @property
+    def class_objs(self) -> list:
+        return get_class_objs(self.meta['GET_STATS_DATA']['STATISTICAL_DATA'].get('CLASS_INF', {}))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        値とコードの配列のメモリ使用量（バイト）を返します。
+        """
+        return (
+            self.values.nbytes
+            + self.special_codes.nbytes
+            + sum(codes.nbytes for codes, _ in self.dimensions.values())
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        VALUEと同じカラム名（@area, $など）のDataFrameに変換します。
+        分類の列はコードを値とするカテゴリ型、値の列は数値（数値でない値がある場合はその値を含むobject型）になります。
+        """
+        data = {}
+        for column in self.columns:
+            if column == '$':
+                data[column] = self._decode_values()
+            else:
+                codes, categories = self.dimensions[column]
+                data[column] = pd.Categorical.from_codes(codes, categories=categories)
+        return pd.DataFrame(data)
+
+    def _decode_values(self):
+        if len(self.special_values) == 0:
+            return self.values
+        decoded = self.values.astype(object)
+        special_mask = self.special_codes >= 0
+        decoded[special_mask] = np.asarray(self.special_values, dtype=object)[self.special_codes[special_mask]]
+        return decoded
+
+    def to_response(self) -> dict:
+        """
+        e-Stat APIのレスポンスと同じ形式の辞書に戻します。
+        """
+        df = self.to_dataframe()
+        values = []
+        for row in df.astype(object).where(df.notna(), None).to_dict(orient='records'):
+            value = {key: item for key, item in row.items() if item is not None}
+            if isinstance(value.get('$'), float):
+                value['$'] = _format_number(value['$'])
+            values.append(value)
+
+        get_stats_data = self.meta['GET_STATS_DATA']
+        statistical_data = get_stats_data['STATISTICAL_DATA']
+        return {
+            **self.meta,
+            'GET_STATS_DATA': {
+                **get_stats_data,
+                'STATISTICAL_DATA': {
+                    **statistical_data,
+                    'DATA_INF': {**statistical_data['DATA_INF'], 'VALUE': values},
+                },
+            },
+        }
+
+def _get_code_dtype(category_count: int):
+    # -1（欠損）を表現できる最小の整数型
+    if category_count < np.iinfo(np.int8).max:
+        return np.int8
+    if category_count < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
@@ -0,0 +1,71 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+def create_thread_pool(max_workers: int) -> ThreadPoolExecutor:
+    """
+    Streamlitのセッション情報を引き継いだスレッドプールを生成します。
+    ワーカースレッド内でもログのユーザー名などのセッションの値を参照できるようにします。
+    タスクは呼び出し元のcontextvars（実行中のスパンなど）を引き継いで実行します。
+
+    Args:
+        max_workers: 同時に実行するスレッド数
+
+    Returns:
+        ThreadPoolExecutor: スレッドプール
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return _ContextThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=_attach_script_run_ctx,
+        initargs=(ctx,),
+    )
+
+class _ContextThreadPoolExecutor(ThreadPoolExecutor):
+    def submit(self, fn, /, *args, **kwargs):
+        # 同じContextは複数のスレッドで同時に実行できないため、タスクごとにコピーする
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+def _attach_script_run_ctx(ctx):
+    # Streamlitの外（バッチ処理など）から呼ばれた場合はセッション情報がないため何もしない
+    if ctx is not None:
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中の場合は新たに実行せず、実行中の処理の完了を待って同じ結果を返す（リクエストの集約）
+    多くのセッションから同時に同じ外部APIを呼び出す場合に、呼び出しを1回にまとめるために使用する
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn) -> tuple:
+        """
+        fnを実行して結果を返します。同じキーのfnが実行中の場合は、その結果（例外の場合は同じ例外）を返します。
+
+        Returns:
+            (fnの結果, 実行中の処理の結果を共有した場合True)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+class DiskCache:
+    """
+    SQLiteを使用したディスクキャッシュ
+    値はJSONをzlibで圧縮して保存し、TTLを過ぎたものは無効とする
+    容量の上限を超えた場合は、最終参照日時の古いものから削除する（LRU）
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Streamlitは複数スレッドからアクセスするため、接続を共有してロックで排他制御する
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(namespace: str, params: dict) -> str:
+        """
+        名前空間とパラメータからキャッシュキーを生成します。
+        パラメータの順序や値の型（数値・文字列）の違いは同一とみなします。
+        """
+        normalized = sorted((str(key), str(value).strip()) for key, value in params.items() if value is not None)
+        raw_key = json.dumps([namespace, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, record_stats: bool = True):
+        """
+        キャッシュから値を取得します。存在しない場合や有効期限切れの場合はNoneを返します。
+        複数のキーを順に参照して1回の参照として集計する場合は、record_stats=Falseを指定してrecord_lookupで集計します。
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            if record_stats:
+                self._record_lookup(row is not None)
+
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def record_lookup(self, hit: bool):
+        """
+        キャッシュの参照結果（ヒット・ミス）を集計します。
+        """
+        with self._lock:
+            self._record_lookup(hit)
+
+    def _record_lookup(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def set(self, key: str, value):
+        """
+        値をキャッシュに保存します。容量の上限を超えた場合は古いものから削除します。
+        """
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        size = len(payload)
+        # 1件で上限を超えるものは保存しない
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, payload, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(payload), size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        # 有効期限切れのものを削除
+        self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        # 最終参照日時の古いものから削除
+        rows = self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total_size <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total_size -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """
+        キャッシュの利用状況を返します。
+        """
+        with self._lock:
+            entries, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        requests_count = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests_count if requests_count > 0 else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total_size,
+        }
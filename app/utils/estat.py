@@ -36,6 +36,48 @@ def is_estat_url(data) -> bool:
     
 def is_estat_data(data) -> bool:
     """
-    e-Statのデータかどうかを判断する
+    e-Statのデータ（APIのレスポンス、または列形式に変換したもの）かどうかを判断する
     """
-    return isinstance(data, dict) and 'GET_STATS_DATA' in data
\ No newline at end of file
+    from .compact_stat_data import CompactStatData
+    return (isinstance(data, dict) and 'GET_STATS_DATA' in data) or isinstance(data, CompactStatData)
+
+def get_class_objs(class_inf: dict) -> list:
+    """
+    CLASS_INFからCLASS_OBJの配列を返します。
+    e-Statは要素が1件の場合に配列ではなくオブジェクトで返却するため、CLASS_OBJとCLASSを常に配列に揃えます。
+
+    Args:
+        class_inf: 統計データまたはメタ情報のCLASS_INF
+
+    Returns:
+        list: CLASSを配列に揃えたCLASS_OBJの配列
+    """
+    class_objs = class_inf.get('CLASS_OBJ', [])
+    if isinstance(class_objs, dict):
+        class_objs = [class_objs]
+
+    normalized_class_objs = []
+    for class_obj in class_objs:
+        classes = class_obj.get('CLASS', [])
+        if isinstance(classes, dict):
+            classes = [classes]
+        normalized_class_objs.append({**class_obj, 'CLASS': classes})
+    return normalized_class_objs
+
+def build_narrowing_params(filters: dict) -> dict:
+    """
+    絞り込み条件から、統計データ取得APIの絞り込みパラメータ（cdCat01, cdArea, cdTimeなど）を生成します。
+
+    Args:
+        filters: CLASS_OBJの@idをキー、絞り込むコードの配列を値とする辞書（例: {"area": ["13000", "14000"]}）
+
+    Returns:
+        dict: APIのリクエストパラメータ（例: {"cdArea": "13000,14000"}）
+    """
+    params = {}
+    for class_id, codes in (filters or {}).items():
+        if not codes:
+            continue
+        param_name = 'cd' + class_id[0].upper() + class_id[1:]
+        params[param_name] = ','.join(str(code) for code in codes)
+    return params
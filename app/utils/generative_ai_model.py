@@ -1,28 +1,182 @@
 import os
+import threading
 from enum import Enum
+from functools import cached_property
+from typing import ClassVar
 
+import anthropic
+import httpx
+import openai
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_anthropic import ChatAnthropic
+from pandasai.llm import OpenAI
+
+from constants import LLM_PROVIDER_SETTINGS
+from .tracing import TracingCallbackHandler
+from .metrics import MetricsCallbackHandler
 
 class GenerativeAIModel(Enum):
     GPT_4O = "gpt-4o"
     GEMINI_PRO = "gemini-1.5-pro-latest"
     CLAUDE_SONNET = "claude-3-5-sonnet-20240620"
 
+# 生成AIのモデルを差し替える関数（負荷試験などで、APIを呼び出さない検証用のモデルを使用する場合に設定する）
+_llm_factory = None
+_pandasai_llm_factory = None
+# set_llm_factoryを呼び出すたびに増やす（チャットモデルを保持するエージェントなどの作り直しの判定に使用する）
+_llm_factory_version = 0
+
+# モデル名 -> チャットモデル（プロセス内で共有する）
+_llms = {}
+_llms_lock = threading.Lock()
+
+# (プロバイダー, クライアントのクラス) -> HTTPクライアント、プロバイダー -> 同時実行数のセマフォ
+_http_clients = {}
+_semaphores = {}
+_provider_lock = threading.Lock()
+
+def get_llm_provider_setting(provider: str, key: str):
+    """
+    プロバイダーの設定を返します。環境変数 LLM_<プロバイダー>_<設定名> が設定されている場合はその値を使用します。
+    """
+    default = LLM_PROVIDER_SETTINGS[provider][key]
+    value = os.getenv(f"LLM_{provider.upper()}_{key.upper()}")
+    return type(default)(value) if value else default
+
+def _get_semaphore(provider: str) -> threading.BoundedSemaphore:
+    with _provider_lock:
+        if provider not in _semaphores:
+            _semaphores[provider] = threading.BoundedSemaphore(get_llm_provider_setting(provider, "max_concurrency"))
+        return _semaphores[provider]
+
+def _get_http_client(provider: str, client_class):
+    """
+    プロバイダーごとに共有する、キープアライブの接続を再利用するHTTPクライアントを返します。
+    client_classには同期（httpx.Client）または非同期（httpx.AsyncClient）のクライアントのクラスを指定します。
+    """
+    key = (provider, client_class)
+    with _provider_lock:
+        if key not in _http_clients:
+            max_connections = get_llm_provider_setting(provider, "max_connections")
+            _http_clients[key] = client_class(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=get_llm_provider_setting(provider, "timeout"),
+            )
+        return _http_clients[key]
+
+class _ConcurrencyLimitMixin:
+    """
+    APIの呼び出し中にプロバイダーごとのセマフォを取得し、同時呼び出し数を制限するMixin
+    多くのセッションから同じチャットモデルを呼び出しても、上限を超えた分は空くまで待つ
+    """
+    provider: ClassVar[str]
+
+    def _generate(self, *args, **kwargs):
+        with _get_semaphore(self.provider):
+            return super()._generate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        # ストリーミングでは応答を受信し終わるまでAPIの呼び出しが続くため、意図的にジェネレーターの終了までセマフォを保持する
+        # 呼び出し側が途中で読み込みをやめた場合も、ジェネレーターのclose（GeneratorExit）でfinallyが実行され、セマフォを解放する
+        semaphore = _get_semaphore(self.provider)
+        semaphore.acquire()
+        try:
+            yield from super()._stream(*args, **kwargs)
+        finally:
+            semaphore.release()
+
+class _SharedChatOpenAI(_ConcurrencyLimitMixin, ChatOpenAI):
+    provider: ClassVar[str] = "openai"
+
+class _SharedChatGoogleGenerativeAI(_ConcurrencyLimitMixin, ChatGoogleGenerativeAI):
+    provider: ClassVar[str] = "google"
+
+class _SharedChatAnthropic(_ConcurrencyLimitMixin, ChatAnthropic):
+    provider: ClassVar[str] = "anthropic"
+
+    # ChatAnthropicにはHTTPクライアントを渡す引数がないため、クライアントを生成するcached_propertyを上書きする
+    # ChatAnthropicの_client, _async_client, _client_paramsが変更された場合は tests/test_generative_ai_model.py が失敗する
+    @cached_property
+    def _client(self) -> anthropic.Client:
+        return anthropic.Client(**self._client_params, http_client=_get_http_client(self.provider, anthropic.DefaultHttpxClient))
+
+    @cached_property
+    def _async_client(self) -> anthropic.AsyncClient:
+        return anthropic.AsyncClient(
+            **self._client_params, http_client=_get_http_client(self.provider, anthropic.DefaultAsyncHttpxClient)
+        )
+
+def set_llm_factory(factory):
+    """
+    set_llmで生成するチャットモデルを差し替えます。
+    factoryはモデル名を受け取ってチャットモデルを返す関数です。Noneを指定すると元に戻します。
+    """
+    global _llm_factory, _llm_factory_version
+    _llm_factory = factory
+    _llm_factory_version += 1
+
+def get_llm_factory_version() -> int:
+    """
+    set_llmで生成するチャットモデルの設定のバージョンを返します。
+    set_llm_factoryで差し替えるたびに値が変わるため、チャットモデルを保持している場合は値が変わったときに作り直してください。
+    """
+    return _llm_factory_version
+
+def set_pandasai_llm_factory(factory):
+    """
+    get_pandasai_llmで生成するPandasAIのLLMを差し替えます。
+    factoryは引数なしでLLMを返す関数です。Noneを指定すると元に戻します。
+    """
+    global _pandasai_llm_factory
+    _pandasai_llm_factory = factory
+
 def set_llm(llm_name):
+    """
+    チャットモデルを返します。
+    チャットモデルは呼び出しのたびに作成せず、モデルごとに1回だけ作成してプロセス内で共有します。
+    """
+    if _llm_factory is not None:
+        return _llm_factory(llm_name)
+
+    with _llms_lock:
+        llm = _llms.get(llm_name)
+        if llm is None:
+            llm = _create_llm(llm_name)
+            if llm is not None:
+                _llms[llm_name] = llm
+    return llm
+
+def _create_llm(llm_name):
     if llm_name == GenerativeAIModel.GPT_4O.value:
-        return ChatOpenAI(
+        return _SharedChatOpenAI(
             model=llm_name,
             temperature=0,
+            callbacks=[TracingCallbackHandler(llm_name), MetricsCallbackHandler(llm_name)],
+            request_timeout=get_llm_provider_setting("openai", "timeout"),
+            http_client=_get_http_client("openai", openai.DefaultHttpxClient),
+            http_async_client=_get_http_client("openai", openai.DefaultAsyncHttpxClient),
         )
     elif llm_name == GenerativeAIModel.GEMINI_PRO.value:
-        return ChatGoogleGenerativeAI(
+        # gRPCの接続はチャットモデルが保持するため、チャットモデルを共有することで再利用する
+        return _SharedChatGoogleGenerativeAI(
             model=llm_name,
             temperature=0,
+            callbacks=[TracingCallbackHandler(llm_name), MetricsCallbackHandler(llm_name)],
+            timeout=get_llm_provider_setting("google", "timeout"),
         )
     elif llm_name == GenerativeAIModel.CLAUDE_SONNET.value:
-        return ChatAnthropic(
+        return _SharedChatAnthropic(
             model=llm_name,
             temperature=0,
-        )
\ No newline at end of file
+            callbacks=[TracingCallbackHandler(llm_name), MetricsCallbackHandler(llm_name)],
+            default_request_timeout=get_llm_provider_setting("anthropic", "timeout"),
+        )
+
+def get_pandasai_llm():
+    """
+    PandasAIで使用するLLMを返します。
+    """
+    if _pandasai_llm_factory is not None:
+        return _pandasai_llm_factory()
+    return OpenAI(model_name="gpt-4o")
@@ -0,0 +1,166 @@
+import os
+import re
+import threading
+import unicodedata
+
+from constants import (
+    LLM_CACHE_PATH,
+    DEFAULT_LLM_CACHE_TTL_SECONDS,
+    DEFAULT_LLM_CACHE_MAX_MB,
+    DEFAULT_LLM_CACHE_NORMALIZED_MATCH,
+)
+from .disk_cache import DiskCache
+from .metrics import cache_requests_total
+from .tracing import set_span_attributes
+
+_llm_response_cache = None
+_llm_response_cache_lock = threading.Lock()
+
+def normalize_llm_input(value) -> str:
+    """
+    表記ゆれを吸収するために入力を正規化します（全角・半角の統一、小文字化、空白の統一、末尾の句読点の削除）。
+    """
+    text = unicodedata.normalize("NFKC", str(value)).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("。、.,!?　 ")
+
+class LLMResponseCache:
+    """
+    LLMの応答（文字列）のキャッシュ
+    モデル名・プロンプトのテンプレート・入力をキーとして、DiskCacheに保存してセッション間で共有する
+    - 完全一致: 入力が同じ場合
+    - 正規化（normalized_matchがTrueの場合）: 正規化した入力が同じ場合（全角・半角や空白、末尾の句読点の違いを無視する）
+    キャッシュから返した応答はLLMを呼び出していないため、呼び出し側で料金を計算しないこと
+    """
+
+    def __init__(self, cache: DiskCache, normalized_match: bool = True):
+        self.cache = cache
+        self.normalized_match = normalized_match
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _make_keys(model_name: str, template: str, inputs: dict) -> tuple:
+        params = {"model": model_name, "template": template}
+        exact_key = DiskCache.make_key("llm", {**params, **{f"input.{key}": value for key, value in inputs.items()}})
+        normalized_key = DiskCache.make_key(
+            "llm_normalized",
+            {**params, **{f"input.{key}": normalize_llm_input(value) for key, value in inputs.items()}},
+        )
+        return exact_key, normalized_key
+
+    def get(self, model_name: str, template: str, inputs: dict):
+        """
+        キャッシュから応答を取得します。存在しない場合はNoneを返します。
+        完全一致・正規化の2つのキーを参照しても、DiskCacheのヒット数・ミス数は1回の参照として集計します。
+        """
+        exact_key, normalized_key = self._make_keys(model_name, template, inputs)
+        result = "hit_exact"
+        response = self.cache.get(exact_key, record_stats=False)
+        if response is None and self.normalized_match:
+            result = "hit_normalized"
+            response = self.cache.get(normalized_key, record_stats=False)
+        if response is None:
+            result = "miss"
+        self.cache.record_lookup(response is not None)
+
+        with self._stats_lock:
+            if result == "hit_exact":
+                self.exact_hits += 1
+            elif result == "hit_normalized":
+                self.normalized_hits += 1
+            else:
+                self.misses += 1
+        cache_requests_total.inc(cache="llm", result=result)
+        return response
+
+    def set(self, model_name: str, template: str, inputs: dict, response: str):
+        exact_key, normalized_key = self._make_keys(model_name, template, inputs)
+        self.cache.set(exact_key, response)
+        if self.normalized_match:
+            self.cache.set(normalized_key, response)
+
+    def invoke(self, chain, model_name: str, template: str, inputs: dict) -> tuple:
+        """
+        キャッシュにない場合のみchainを実行し、応答とキャッシュから返したかどうかを返します。
+
+        Returns:
+            (応答, キャッシュから返した場合True)
+        """
+        response = self.get(model_name, template, inputs)
+        set_span_attributes(cache_hit=response is not None)
+        if response is not None:
+            return response, True
+
+        response = chain.invoke(inputs)
+        self.set(model_name, template, inputs, response)
+        return response, False
+
+    def batch(self, chain, model_name: str, template: str, inputs: list, config: dict = None) -> tuple:
+        """
+        キャッシュにない入力のみchain.batchでまとめて実行します。
+        失敗した入力は例外を結果として返し、キャッシュしません（chain.batchのreturn_exceptions=Trueと同じ）。
+
+        Returns:
+            (応答のリスト, キャッシュから返したかどうかのリスト)
+        """
+        responses = [self.get(model_name, template, item_input) for item_input in inputs]
+        cached = [response is not None for response in responses]
+        set_span_attributes(cache_hits=sum(cached))
+
+        missed_indexes = [i for i, is_cached in enumerate(cached) if not is_cached]
+        if missed_indexes:
+            results = chain.batch([inputs[i] for i in missed_indexes], config=config, return_exceptions=True)
+            for i, result in zip(missed_indexes, results):
+                responses[i] = result
+                if not isinstance(result, Exception):
+                    self.set(model_name, template, inputs[i], result)
+        return responses, cached
+
+    def get_stats(self) -> dict:
+        """
+        キャッシュの利用状況を返します。
+        """
+        disk_stats = self.cache.get_stats()
+        with self._stats_lock:
+            hits = self.exact_hits + self.normalized_hits
+            requests_count = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / requests_count if requests_count > 0 else 0.0,
+                "evictions": disk_stats["evictions"],
+                "entries": disk_stats["entries"],
+                "bytes": disk_stats["bytes"],
+            }
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """
+    LLMの応答のキャッシュを返します。
+    TTL・容量の上限・正規化した入力での一致は環境変数（LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_MB, LLM_CACHE_NORMALIZED_MATCH）で変更できます。
+    """
+    global _llm_response_cache
+    with _llm_response_cache_lock:
+        if _llm_response_cache is None:
+            normalized_match = os.getenv("LLM_CACHE_NORMALIZED_MATCH")
+            _llm_response_cache = LLMResponseCache(
+                DiskCache(
+                    path=LLM_CACHE_PATH,
+                    ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_LLM_CACHE_TTL_SECONDS)),
+                    max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_LLM_CACHE_MAX_MB)) * 1024 * 1024,
+                ),
+                normalized_match=(
+                    normalized_match.lower() in ("1", "true", "yes")
+                    if normalized_match is not None else DEFAULT_LLM_CACHE_NORMALIZED_MATCH
+                ),
+            )
+    return _llm_response_cache
+
+def get_llm_response_cache_stats() -> dict:
+    """
+    LLMの応答のキャッシュのヒット数・ミス数などを返します。
+    """
+    return get_llm_response_cache().get_stats()
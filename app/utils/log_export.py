@@ -0,0 +1,175 @@
+import csv
+import datetime
+import io
+import os
+import re
+import tempfile
+import time
+import zipfile
+
+from constants import LOG_DIR, LOG_EXPORT_CHUNK_SIZE, LOG_EXPORT_FILE_TTL_SECONDS
+from .logger import flush_logs, get_log_files, open_log_file
+
+# ログファイル名（{prefix}_{YYYY-MM-DD}_{index}.csv[.gz]）から日付を取得する
+LOG_FILE_DATE_PATTERN = re.compile(r"_(\d{4}-\d{2}-\d{2})_\d+\.csv(\.gz)?$")
+
+class _ZipStreamBuffer:
+    """
+    ZipFileの書き込み先として使用するバッファ
+    シークできないストリームとして扱わせ、書き込まれたバイト列を順次取り出す
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return b"".join(chunks)
+
+def iter_logs_zip(start_date: datetime.date = None, end_date: datetime.date = None, user_name: str = None):
+    """
+    ログファイルをZIP形式に圧縮しながら、バイト列を順次返すジェネレーターです。
+    ディスクにZIPファイルを作成せず、ファイルを少しずつ読み込んで圧縮します。
+
+    Args:
+        start_date: この日付以降のログファイルのみ含める
+        end_date: この日付以前のログファイルのみ含める
+        user_name: 指定した場合は、このユーザーのログのみ含める
+
+    Yields:
+        bytes: ZIPファイルのバイト列の一部
+    """
+    # 書き込み待ちのログも含める
+    flush_logs()
+
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as zipf:
+        for file_path in get_log_files():
+            if not _is_in_date_range(file_path, start_date, end_date):
+                continue
+            try:
+                if user_name is None:
+                    yield from _write_file(zipf, buffer, file_path)
+                else:
+                    yield from _write_filtered_file(zipf, buffer, file_path, user_name)
+            except FileNotFoundError:
+                # 圧縮中に削除・ローテーションされたファイルは含めない
+                continue
+    yield buffer.drain()
+
+# ダウンロード用に作成するログのZIPの一時ファイル名の接頭辞
+LOG_EXPORT_FILE_PREFIX = "panaestat_logs_"
+
+def write_logs_zip(start_date: datetime.date = None, end_date: datetime.date = None, user_name: str = None) -> str:
+    """
+    ログファイルのZIPを一時ファイルに書き込み、そのパスを返します。
+    ZIP全体をメモリに保持しないよう、ジェネレーターの出力を順次ファイルに書き込みます。
+    ダウンロード後やダウンロードされなかった場合はremove_logs_zipで削除してください。
+    """
+    _remove_expired_logs_zips()
+    with tempfile.NamedTemporaryFile(prefix=LOG_EXPORT_FILE_PREFIX, suffix=".zip", delete=False) as zip_file:
+        try:
+            for chunk in iter_logs_zip(start_date, end_date, user_name):
+                zip_file.write(chunk)
+        except BaseException:
+            zip_file.close()
+            remove_logs_zip(zip_file.name)
+            raise
+    return zip_file.name
+
+def remove_logs_zip(path: str):
+    """
+    write_logs_zipで作成したZIPの一時ファイルを削除します。
+    """
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _remove_expired_logs_zips():
+    # ダウンロードされないままセッションが終了した一時ファイルを削除する
+    temp_dir = tempfile.gettempdir()
+    expired_at = time.time() - LOG_EXPORT_FILE_TTL_SECONDS
+    for file_name in os.listdir(temp_dir):
+        if not (file_name.startswith(LOG_EXPORT_FILE_PREFIX) and file_name.endswith(".zip")):
+            continue
+        path = os.path.join(temp_dir, file_name)
+        try:
+            if os.path.getmtime(path) < expired_at:
+                os.remove(path)
+        except OSError:
+            continue
+
+def _is_in_date_range(file_path: str, start_date, end_date) -> bool:
+    match = LOG_FILE_DATE_PATTERN.search(os.path.basename(file_path))
+    if match is None:
+        # 日付を含まないファイルは、期間を指定していない場合のみ含める
+        return start_date is None and end_date is None
+    file_date = datetime.date.fromisoformat(match.group(1))
+    if start_date is not None and file_date < start_date:
+        return False
+    if end_date is not None and file_date > end_date:
+        return False
+    return True
+
+def _write_file(zipf: zipfile.ZipFile, buffer: _ZipStreamBuffer, file_path: str):
+    """
+    ログファイルをそのままZIPに追加します。
+    ローテーション時に圧縮済みのファイル（.csv.gz）は、再圧縮せずに格納します。
+    """
+    zip_info = zipfile.ZipInfo.from_file(file_path, os.path.relpath(file_path, LOG_DIR))
+    zip_info.compress_type = zipfile.ZIP_STORED if file_path.endswith(".gz") else zipfile.ZIP_DEFLATED
+
+    with open(file_path, 'rb') as src, zipf.open(zip_info, mode='w') as dst:
+        while True:
+            chunk = src.read(LOG_EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            yield buffer.drain()
+
+def _write_filtered_file(zipf: zipfile.ZipFile, buffer: _ZipStreamBuffer, file_path: str, user_name: str):
+    """
+    指定したユーザーのログのみをCSVとしてZIPに追加します。
+    """
+    arcname = os.path.relpath(file_path, LOG_DIR)
+    if arcname.endswith(".gz"):
+        arcname = arcname[:-len(".gz")]
+    zip_info = zipfile.ZipInfo(arcname, date_time=datetime.datetime.fromtimestamp(os.path.getmtime(file_path)).timetuple()[:6])
+    zip_info.compress_type = zipfile.ZIP_DEFLATED
+
+    with open_log_file(file_path) as src, zipf.open(zip_info, mode='w') as dst:
+        dst.write("\ufeff".encode("utf-8"))
+        text = io.StringIO()
+        writer = csv.writer(text)
+        is_target_user = False
+        for row in csv.reader(src):
+            if len(row) < 4:
+                continue
+            # 折り返した行（タイムスタンプが空）は直前のログと同じユーザーとして扱う
+            if row[0] != "":
+                is_target_user = row[2] == user_name
+            if not is_target_user:
+                continue
+            writer.writerow(row)
+            if text.tell() >= LOG_EXPORT_CHUNK_SIZE:
+                dst.write(text.getvalue().encode("utf-8"))
+                text.seek(0)
+                text.truncate()
+                yield buffer.drain()
+        dst.write(text.getvalue().encode("utf-8"))
+    yield buffer.drain()
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import threading
+
+class LogIndex:
+    """
+    CSVログを検索するためのSQLiteのインデックス
+    CSVログの書き込み時に同じ内容を登録し、タイムスタンプ・レベル・ユーザー名で絞り込めるようにする
+    ログファイルが削除された場合は、そのファイルのログも削除する
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 書き込みスレッドとStreamlitのスレッドからアクセスするため、接続を共有してロックで排他制御する
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS log_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                level TEXT NOT NULL,
+                user_name TEXT NOT NULL,
+                message TEXT NOT NULL,
+                file TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_log_entries_timestamp ON log_entries (timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_log_entries_level ON log_entries (level, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_log_entries_user_name ON log_entries (user_name, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_log_entries_file ON log_entries (file)")
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize_file(file: str) -> str:
+        # ローテーション時に圧縮（.csv.gz）しても同じファイルとして扱う
+        file = os.path.basename(file)
+        return file[:-len(".gz")] if file.endswith(".gz") else file
+
+    def add_entries(self, entries: list, file: str):
+        """
+        ログを登録します。
+
+        Args:
+            entries (list): [タイムスタンプ, レベル, ユーザー名, メッセージ] の配列
+            file (str): ログを書き込んだファイルのパス
+        """
+        file = self._normalize_file(file)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO log_entries (timestamp, level, user_name, message, file) VALUES (?, ?, ?, ?, ?)",
+                [(timestamp, level, user_name, message, file) for timestamp, level, user_name, message in entries],
+            )
+            self._conn.commit()
+
+    def remove_file(self, file: str):
+        """
+        ファイルのログを削除します。
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM log_entries WHERE file = ?", (self._normalize_file(file),))
+            self._conn.commit()
+
+    def get_indexed_files(self) -> set:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT file FROM log_entries").fetchall()
+        return {row[0] for row in rows}
+
+    def _build_conditions(self, level=None, user_name=None, start=None, end=None, keyword=None):
+        conditions = []
+        params = []
+        if level is not None:
+            conditions.append("level = ?")
+            params.append(level)
+        if user_name is not None:
+            conditions.append("user_name = ?")
+            params.append(user_name)
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(end)
+        if keyword:
+            conditions.append("message LIKE ? ESCAPE '\\'")
+            escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query(self, level=None, user_name=None, start=None, end=None, keyword=None, limit: int = 50, offset: int = 0) -> list:
+        """
+        条件に一致するログを新しい順に返します。
+        タイムスタンプ（start, end）はISO 8601形式の文字列で指定します。
+
+        Returns:
+            list: timestamp, level, user_name, message をキーとする辞書の配列
+        """
+        where, params = self._build_conditions(level, user_name, start, end, keyword)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT timestamp, level, user_name, message FROM log_entries {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [
+            {"timestamp": timestamp, "level": level, "user_name": user_name, "message": message}
+            for timestamp, level, user_name, message in rows
+        ]
+
+    def count(self, level=None, user_name=None, start=None, end=None, keyword=None) -> int:
+        """
+        条件に一致するログの件数を返します。
+        """
+        where, params = self._build_conditions(level, user_name, start, end, keyword)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM log_entries {where}", params).fetchone()[0]
+
+    def get_user_names(self) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT user_name FROM log_entries ORDER BY user_name").fetchall()
+        return [row[0] for row in rows]
+
+    def get_error_counts_by_user(self, start=None, end=None) -> list:
+        """
+        ユーザーごとのエラーの件数を、件数の多い順に返します。
+
+        Returns:
+            list: (ユーザー名, 件数) の配列
+        """
+        where, params = self._build_conditions(level="ERROR", start=start, end=end)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT user_name, COUNT(*) AS error_count FROM log_entries {where} GROUP BY user_name ORDER BY error_count DESC",
+                params,
+            ).fetchall()
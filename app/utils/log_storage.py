@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class LogStorage:
+    """
+    ログディレクトリ内のファイルと合計サイズを管理するクラス
+    ファイルごとのサイズを更新日時の古い順に保持し、書き込み・ローテーション・削除のたびに更新する
+    ディレクトリの走査は一定間隔での突き合わせ（reconcile）の時だけ行う
+    """
+
+    def __init__(self, log_dir: str, max_bytes: int, reconcile_interval_seconds: float, on_remove=None):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        # ファイルを削除した時に呼び出す関数（引数は削除したファイルのパス）
+        self.on_remove = on_remove
+        # パス -> サイズ（バイト）。先頭ほど更新日時が古い
+        self._files = OrderedDict()
+        self._total_bytes = 0
+        self._last_reconciled_at = 0.0
+        self._lock = threading.RLock()
+        self.reconcile()
+
+    def reconcile(self):
+        """
+        ディレクトリを走査して、保持しているファイルの一覧とサイズをディスクの状態に合わせます。
+        """
+        files = []
+        if os.path.isdir(self.log_dir):
+            for entry in os.scandir(self.log_dir):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        files.sort(key=lambda file: file[2])
+
+        with self._lock:
+            self._files = OrderedDict((path, size) for path, size, _ in files)
+            self._total_bytes = sum(self._files.values())
+            self._last_reconciled_at = time.monotonic()
+
+    def _maybe_reconcile(self):
+        if time.monotonic() - self._last_reconciled_at >= self.reconcile_interval_seconds:
+            self.reconcile()
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return path in self._files
+
+    def get_size(self, path: str) -> int:
+        with self._lock:
+            return self._files.get(path, 0)
+
+    def record_write(self, path: str, size: int):
+        """
+        ファイルへの書き込み（新規作成を含む）を記録します。
+
+        Args:
+            path (str): ファイルのパス
+            size (int): 書き込み後のファイルサイズ（バイト）
+        """
+        with self._lock:
+            self._total_bytes += size - self._files.get(path, 0)
+            self._files[path] = size
+            # 書き込んだファイルが最も新しい
+            self._files.move_to_end(path)
+
+    def remove(self, path: str, notify: bool = True):
+        """
+        ファイルを削除し、一覧から除外します。
+
+        Args:
+            path (str): ファイルのパス
+            notify (bool): on_removeを呼び出すかどうか
+        """
+        with self._lock:
+            size = self._files.pop(path, None)
+            if size is not None:
+                self._total_bytes -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        if notify and self.on_remove is not None:
+            self.on_remove(path)
+
+    def remove_all(self):
+        for path in self.get_files():
+            self.remove(path)
+
+    def enforce_budget(self):
+        """
+        合計サイズが上限を超えている場合、更新日時の古いファイルから削除します。
+        """
+        self._maybe_reconcile()
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._files:
+                    return
+                oldest_file = next(iter(self._files))
+            self.remove(oldest_file)
+
+    def get_total_size_mb(self) -> float:
+        self._maybe_reconcile()
+        with self._lock:
+            return self._total_bytes / (1024 * 1024)
+
+    def get_files(self) -> list:
+        """
+        ファイルのパスを更新日時の古い順に返します。
+        """
+        with self._lock:
+            return list(self._files.keys())
+
+    def get_oldest_file(self):
+        with self._lock:
+            return next(iter(self._files), None)
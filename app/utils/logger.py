@@ -1,10 +1,29 @@
 import logging
+import logging.handlers
+import atexit
 import csv
 import os
-import zipfile
+import queue
+import time
+import gzip
+import shutil
+import sqlite3
+import threading
 import datetime
 import textwrap
-from constants import LOG_DIR, LOGS_ZIP_PATH, MAX_LOGS_DIR_SIZE_MB
+from constants import (
+    LOG_DIR,
+    LOG_INDEX_PATH,
+    MAX_LOGS_DIR_SIZE_MB,
+    MAX_LOG_FILE_SIZE_MB,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_INTERVAL_SECONDS,
+    LOG_FLUSH_TIMEOUT_SECONDS,
+    LOG_STORAGE_RECONCILE_INTERVAL_SECONDS,
+)
+from .log_storage import LogStorage
+from .log_index import LogIndex
+from .process_state import get_process_state
 
 # ======== カスタムログレベル定義 ========
 CSV_INFO_LEVEL = 15
@@ -38,105 +57,183 @@ JST = datetime.timezone(datetime.timedelta(hours=9))
 
 os.makedirs(LOG_DIR, exist_ok=True)
 
+_log_index = None
+_log_index_lock = threading.Lock()
+
+def get_log_index() -> LogIndex:
+    """
+    ログを検索するためのインデックスを返します。
+    """
+    global _log_index
+    with _log_index_lock:
+        if _log_index is None:
+            _log_index = LogIndex(LOG_INDEX_PATH)
+    return _log_index
+
+def _add_to_log_index(entries: list, log_file: str):
+    # インデックスへの登録に失敗しても、CSVへのログの書き込みは継続する
+    try:
+        get_log_index().add_entries(entries, log_file)
+    except sqlite3.Error as e:
+        logging.warning(f"failed to index logs: {e}")
+
+def _remove_from_log_index(log_file: str):
+    try:
+        get_log_index().remove_file(log_file)
+    except sqlite3.Error as e:
+        logging.warning(f"failed to remove logs from index: {e}")
+
+def _backfill_log_index():
+    try:
+        indexed_files = get_log_index().get_indexed_files()
+    except sqlite3.Error as e:
+        logging.warning(f"failed to read log index: {e}")
+        return
+    for log_file in get_log_files():
+        if LogIndex._normalize_file(log_file) in indexed_files:
+            continue
+        try:
+            _add_to_log_index(read_log_entries(log_file, newest_first=False), log_file)
+        except (OSError, csv.Error) as e:
+            logging.warning(f"failed to read log file {log_file}: {e}")
+
+# ログディレクトリのファイルとサイズは走査せずにLogStorageで管理する
+log_storage = LogStorage(
+    log_dir=LOG_DIR,
+    max_bytes=MAX_LOGS_DIR_SIZE_MB * 1024 * 1024,
+    reconcile_interval_seconds=LOG_STORAGE_RECONCILE_INTERVAL_SECONDS,
+    on_remove=_remove_from_log_index,
+)
+
 def get_logs_dir_size():
-    total_size = sum(
-        os.path.getsize(os.path.join(LOG_DIR, file))
-        for file in os.listdir(LOG_DIR)
-        if os.path.isfile(os.path.join(LOG_DIR, file))
-    )
-    return total_size / (1024 * 1024)
+    return log_storage.get_total_size_mb()
 
 def _cleanup_old_logs():
-    total_size = get_logs_dir_size()
-    log_files = []
-
-    for root, _, files in os.walk(LOG_DIR):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if file != "logs.zip":
-                log_files.append((file_path, os.path.getmtime(file_path)))
-
-    while total_size > MAX_LOGS_DIR_SIZE_MB:
-        if not log_files:
-            break
-        log_files.sort(key=lambda x: x[1])
-        oldest_file, _ = log_files.pop(0)
-        total_size -= os.path.getsize(oldest_file) / (1024 * 1024)
-        os.remove(oldest_file)
+    log_storage.enforce_budget()
 
 def _get_log_file(prefix):
     base_name = f"{prefix}_{datetime.datetime.now(JST).strftime('%Y-%m-%d')}"
     index = 1
     while True:
         file_name = os.path.join(LOG_DIR, f"{base_name}_{index}.csv")
-        if not os.path.exists(file_name):
-            with open(file_name, "a", encoding="utf-8-sig"):
-                pass
+        # 圧縮済みのファイルはローテーション済みのため追記しない
+        if f"{file_name}.gz" in log_storage:
+            index += 1
+            continue
+        if file_name not in log_storage:
             return file_name
-        elif os.path.getsize(file_name) < 10 * 1024 * 1024:
+        elif log_storage.get_size(file_name) < MAX_LOG_FILE_SIZE_MB * 1024 * 1024:
             return file_name
         index += 1
 
-def zip_logs():
-    if not os.path.exists(LOG_DIR):
-        return None
-
-    _cleanup_old_logs()
-
-    if os.path.exists(LOGS_ZIP_PATH):
-        os.remove(LOGS_ZIP_PATH)
-
-    with zipfile.ZipFile(LOGS_ZIP_PATH, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(LOG_DIR):
-            for file in files:
-                if file == "logs.zip":
-                    continue
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, LOG_DIR)
-                zipf.write(file_path, arcname)
-
-    return LOGS_ZIP_PATH if os.path.exists(LOGS_ZIP_PATH) else None
+def _compress_rotated_logs(active_files: set):
+    """
+    書き込み対象でなくなった（ローテーションした）CSVログファイルをgzipで圧縮します。
+    ZIPでダウンロードする際に、圧縮済みのファイルをそのまま格納できるようにするため
+    """
+    for file_path in get_log_files():
+        if not file_path.endswith(".csv") or file_path in active_files:
+            continue
+        gz_path = f"{file_path}.gz"
+        with open(file_path, 'rb') as src, gzip.open(gz_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        log_storage.record_write(gz_path, os.path.getsize(gz_path))
+        # 圧縮前後で同じログのため、インデックスからは削除しない
+        log_storage.remove(file_path, notify=False)
 
 def get_log_files():
-    return [
-        os.path.join(LOG_DIR, file)
-        for file in os.listdir(LOG_DIR)
-        if os.path.isfile(os.path.join(LOG_DIR, file)) and file != "logs.zip"
-    ]
+    return log_storage.get_files()
 
 def get_oldest_log():
-    log_files = get_log_files()
-    if log_files:
-        log_files.sort(key=os.path.getmtime)
-        return log_files[0]
-    return None
+    return log_storage.get_oldest_file()
 
 def delete_oldest_log():
     oldest_file = get_oldest_log()
     if oldest_file:
-        os.remove(oldest_file)
+        log_storage.remove(oldest_file)
         return oldest_file
     return None
 
 def delete_all_logs():
-    for file in get_log_files():
-        os.remove(file)
-
-class DailyCSVLogger(logging.Handler):
-    """CSVログ用の汎用ハンドラー（INFO・ERRORどちらも処理）"""
-    def __init__(self):
-        super().__init__(level=min(CSV_INFO_LEVEL, CSV_ERROR_LEVEL))
+    log_storage.remove_all()
+
+class _UserNameFilter(logging.Filter):
+    """
+    ログを出力したスレッドのセッションからユーザー名を取得し、レコードに設定するフィルター
+    書き込みは別スレッドで行うため、キューに入れる前にユーザー名を確定させる
+    """
+    def filter(self, record):
+        from session import get_user_name
+        record.user_name = get_user_name() or "Unknown"
+        return True
+
+class DailyCSVLogger(logging.handlers.BufferingHandler):
+    """
+    CSVログ用の汎用ハンドラー（INFO・ERRORどちらも処理）
+    QueueListenerのスレッドで動作し、レコードをまとめてCSVファイルに追記する
+    """
+    def __init__(self, capacity=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL_SECONDS):
+        super().__init__(capacity)
+        self.setLevel(min(CSV_INFO_LEVEL, CSV_ERROR_LEVEL))
         self.addFilter(lambda record: record.levelno in (CSV_INFO_LEVEL, CSV_ERROR_LEVEL))
+        self.flush_interval = flush_interval
+        self._last_flush_time = time.monotonic()
+        self._active_files = set()
+        self._is_log_index_synced = False
+
+    def shouldFlush(self, record):
+        # 件数が上限に達したか、前回の書き込みから一定時間経過した場合に書き込む
+        return (
+            len(self.buffer) >= self.capacity
+            or time.monotonic() - self._last_flush_time >= self.flush_interval
+        )
+
+    def flush(self):
+        self.acquire()
+        try:
+            records, self.buffer = self.buffer, []
+            self._last_flush_time = time.monotonic()
+            if records:
+                try:
+                    self._write_records(records)
+                except Exception:
+                    # ディスクの空き容量不足や、ログの削除と同時に実行された場合のエラーで書き込みスレッドを停止させない
+                    # 書き込めなかったログは破棄し、エラーは1回分（先頭のレコード）のみ出力する
+                    self.handleError(records[0])
+        finally:
+            self.release()
+
+    def _write_records(self, records):
+        if not self._is_log_index_synced:
+            # 初回の書き込み時に、インデックスに登録されていない既存のログファイルを登録する
+            self._is_log_index_synced = True
+            _backfill_log_index()
 
-    def emit(self, record):
         _cleanup_old_logs()
 
         # 出力ファイルをログレベルで切り替え
-        if record.levelno == CSV_ERROR_LEVEL:
-            log_file = _get_log_file("error_logs")
-        else:
-            log_file = _get_log_file("logs")
-
+        entries_by_prefix = {}
+        for record in records:
+            prefix = "error_logs" if record.levelno == CSV_ERROR_LEVEL else "logs"
+            entries_by_prefix.setdefault(prefix, []).append(self._to_entry(record))
+
+        for prefix, entries in entries_by_prefix.items():
+            log_file = _get_log_file(prefix)
+            with open(log_file, mode='a', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                for entry in entries:
+                    writer.writerows(self._to_rows(entry))
+                f.flush()
+                log_storage.record_write(log_file, os.fstat(f.fileno()).st_size)
+            _add_to_log_index(entries, log_file)
+
+        # 日付の変更やサイズの上限で書き込み先が変わった場合は、以前のファイルを圧縮する
+        active_files = {_get_log_file(prefix) for prefix in ("logs", "error_logs")}
+        if active_files != self._active_files:
+            self._active_files = active_files
+            _compress_rotated_logs(active_files)
+
+    def _to_entry(self, record):
         # 通常ログレベル名（INFO/ERROR）として扱う
         if record.levelno == CSV_INFO_LEVEL:
             level_name = "INFO"
@@ -145,34 +242,108 @@ class DailyCSVLogger(logging.Handler):
         else:
             level_name = record.levelname
 
-        from session import get_user_name
-        user_name = get_user_name() or "Unknown"
+        user_name = getattr(record, "user_name", "Unknown")
+        timestamp = datetime.datetime.fromtimestamp(record.created, JST).isoformat()
 
         # ログメッセージ（CSV用には levelname を含めない）
         log_message = record.getMessage()
+        return [timestamp, level_name, user_name, log_message]
 
-        log_entry = [datetime.datetime.now(JST).isoformat(), level_name, user_name, log_message]
-
-        existing_logs = []
-        if os.path.exists(log_file):
-            with open(log_file, mode='r', encoding='utf-8-sig') as f:
-                reader = csv.reader(f)
-                existing_logs = list(reader)
+    def _to_rows(self, entry):
+        timestamp, level_name, user_name, log_message = entry
 
         max_line_length = 100
-        wrapped_message = textwrap.wrap(log_message, max_line_length)
+        wrapped_message = textwrap.wrap(log_message, max_line_length) or [""]
 
-        new_entries = [[log_entry[0], log_entry[1], log_entry[2], wrapped_message[0]]]
+        rows = [[timestamp, level_name, user_name, wrapped_message[0]]]
         for extra_line in wrapped_message[1:]:
-            new_entries.append(["", "", "", extra_line])
-
-        existing_logs = new_entries + existing_logs
-
-        with open(log_file, mode='w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerows(existing_logs)
-            f.flush()
-            os.fsync(f.fileno())
+            rows.append(["", "", "", extra_line])
+        return rows
+
+class _BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    キューにレコードが来ない間も、一定間隔でハンドラーに溜まったレコードを書き込むQueueListener
+    """
+    def __init__(self, queue, *handlers, flush_interval=LOG_FLUSH_INTERVAL_SECONDS, **kwargs):
+        super().__init__(queue, *handlers, **kwargs)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+    def handle(self, record):
+        # 例外が発生すると書き込みスレッドが停止し、task_doneも呼ばれずにflush_logsが待ち続けるため、ここで処理する
+        try:
+            super().handle(record)
+        except Exception:
+            for handler in self.handlers:
+                handler.handleError(record)
+
+    def is_running(self) -> bool:
+        """
+        書き込みスレッドが動作中かどうかを返します。
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        # 既に停止している場合（再読み込み時とプロセス終了時の二重呼び出し）は何もしない
+        if not self.is_running():
+            return
+        super().stop()
+        # 終了時にハンドラーに残っているレコードを書き込む
+        for handler in self.handlers:
+            handler.flush()
+
+def flush_logs():
+    """
+    書き込み待ちのログをCSVファイルに書き込みます。
+    """
+    # キューに残っているログが書き込みスレッドで処理されるのを待つ
+    # 書き込みスレッドが停止した場合に待ち続けないよう、動作中の間だけ、最大LOG_FLUSH_TIMEOUT_SECONDS秒待つ
+    deadline = time.monotonic() + LOG_FLUSH_TIMEOUT_SECONDS
+    with log_queue.all_tasks_done:
+        while log_queue.unfinished_tasks and csv_listener.is_running():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            log_queue.all_tasks_done.wait(min(remaining, 0.1))
+    csv_handler.flush()
+
+def open_log_file(log_file: str):
+    """
+    CSVログファイルをテキストとして開きます。圧縮済み（.csv.gz）のファイルにも対応します。
+    """
+    if log_file.endswith(".gz"):
+        return gzip.open(log_file, mode='rt', newline='', encoding='utf-8-sig')
+    return open(log_file, mode='r', newline='', encoding='utf-8-sig')
+
+def read_log_entries(log_file: str, newest_first: bool = True):
+    """
+    CSVログファイルを読み込み、折り返した行を1件のログにまとめて返します。
+    ログは追記で書き込んでいるため、新しい順で見る場合はここで並べ替えます。
+
+    Returns:
+        list: [タイムスタンプ, レベル, ユーザー名, メッセージ] の配列
+    """
+    entries = []
+    with open_log_file(log_file) as f:
+        for row in csv.reader(f):
+            if len(row) < 4:
+                continue
+            if row[0] == "" and entries:
+                # 折り返した行は直前のログのメッセージに連結する
+                entries[-1][3] += row[3]
+            else:
+                entries.append(row[:4])
+
+    # 以前のログファイルは先頭に追加する形式だったため、時刻で並べ替える
+    entries.sort(key=lambda entry: entry[0], reverse=newest_first)
+    return entries
 
 # ======== ログ設定 ========
 # CSVにはレベル名含めない
@@ -180,6 +351,23 @@ csv_formatter = logging.Formatter('%(message)s')
 csv_handler = DailyCSVLogger()
 csv_handler.setFormatter(csv_formatter)
 
+# CSVへの書き込みは別スレッドで行い、ログを出力したスレッドではキューに入れるだけにする
+log_queue = queue.Queue(-1)
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setLevel(min(CSV_INFO_LEVEL, CSV_ERROR_LEVEL))
+queue_handler.addFilter(lambda record: record.levelno in (CSV_INFO_LEVEL, CSV_ERROR_LEVEL))
+queue_handler.addFilter(_UserNameFilter())
+
+# モジュールが再読み込みされた場合は、以前の書き込みスレッドを停止する
+_process_state = get_process_state()
+_previous_listener = _process_state.get("csv_queue_listener")
+if _previous_listener is not None:
+    _previous_listener.stop()
+csv_listener = _BatchingQueueListener(log_queue, csv_handler, respect_handler_level=True)
+csv_listener.start()
+_process_state["csv_queue_listener"] = csv_listener
+atexit.register(csv_listener.stop)
+
 # ターミナル出力（全レベル表示）
 console_formatter = logging.Formatter('%(levelname)s - %(message)s')
 console_handler = logging.StreamHandler()
@@ -189,6 +377,6 @@ console_handler.setFormatter(console_formatter)
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
 logger.handlers.clear()
-logger.addHandler(csv_handler)
+logger.addHandler(queue_handler)
 logger.addHandler(console_handler)
-logger.propagate = False
\ No newline at end of file
+logger.propagate = False
@@ -0,0 +1,378 @@
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from constants import (
+    METRICS_LATENCY_BUCKETS,
+    METRICS_BYTES_BUCKETS,
+    METRICS_SESSION_TTL_SECONDS,
+    METRICS_SESSION_STATE_INTERVAL_SECONDS,
+)
+from .process_state import get_process_state
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: dict = None) -> str:
+    labels = list(zip(labelnames, labelvalues)) + list((extra or {}).items())
+    if not labels:
+        return ""
+    escaped = [
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            lines.extend(self._render_value(labelvalues, value))
+        return lines
+
+    def _render_value(self, labelvalues, value) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """
+    増加のみする値（リクエスト数、バイト数など）
+    """
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    """
+    増減する値（アクティブなセッション数など）
+    collectを指定した場合は、出力時に呼び出して値を取得する（{ラベルの値のタプル: 値} を返す関数）
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> list:
+        if self.collect is not None:
+            collected = self.collect()
+            with self._lock:
+                self._values = dict(collected)
+        return super().render()
+
+class Histogram(_Metric):
+    """
+    値の分布（レイテンシなど）をバケットごとの件数として集計する
+    """
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    state["buckets"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self) -> list:
+        # 出力中に値が更新されても崩れないよう、コピーしてから出力する
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = [(key, {**state, "buckets": list(state["buckets"])}) for key, state in self._values.items()]
+        for labelvalues, state in items:
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, {"le": _format_value(upper_bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+class MetricsRegistry:
+    """
+    メトリクスを登録し、Prometheusのテキスト形式で出力するクラス
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# ======== 外部API・LLMの呼び出し ========
+external_request_duration_seconds = registry.register(Histogram(
+    "panaestat_external_request_duration_seconds",
+    "外部API（e-Stat, SerpAPI, LLM）の呼び出しにかかった時間",
+    labelnames=("service", "operation", "status"),
+))
+external_requests_total = registry.register(Counter(
+    "panaestat_external_requests_total",
+    "外部API（e-Stat, SerpAPI, LLM）の呼び出し回数",
+    labelnames=("service", "operation", "status"),
+))
+external_response_bytes = registry.register(Histogram(
+    "panaestat_external_response_bytes",
+    "外部APIのレスポンスのサイズ（バイト）",
+    labelnames=("service", "operation"),
+    buckets=METRICS_BYTES_BUCKETS,
+))
+cache_requests_total = registry.register(Counter(
+    "panaestat_cache_requests_total",
+    "キャッシュの参照回数",
+    labelnames=("cache", "result"),
+))
+llm_tokens_total = registry.register(Counter(
+    "panaestat_llm_tokens_total",
+    "LLMのトークン数（料金の計算に使用したもの）",
+    labelnames=("model", "type"),
+))
+llm_cost_yen_total = registry.register(Counter(
+    "panaestat_llm_cost_yen_total",
+    "LLMの料金（円）",
+    labelnames=("model", "type"),
+))
+intent_routes_total = registry.register(Counter(
+    "panaestat_intent_routes_total",
+    "ユーザーの入力を処理した経路（エージェントを経由せずにツールを直接実行したか）",
+    labelnames=("route", "reason"),
+))
+span_duration_seconds = registry.register(Histogram(
+    "panaestat_span_duration_seconds",
+    "トレースのスパン（エージェント・ツールなど）の処理時間",
+    labelnames=("name", "status"),
+))
+
+def observe_external_request(service: str, operation: str, status, duration_seconds: float, response_bytes: int = None):
+    """
+    外部APIの呼び出しを記録します。
+    """
+    external_request_duration_seconds.observe(duration_seconds, service=service, operation=operation, status=status)
+    external_requests_total.inc(service=service, operation=operation, status=status)
+    if response_bytes is not None:
+        external_response_bytes.observe(response_bytes, service=service, operation=operation)
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChainのLLMの呼び出し時間と結果を記録するCallbackHandler
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._started_at = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def _start(self, run_id):
+        with self._lock:
+            self._started_at[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        # レスポンスのサイズは、生成されたテキスト（UTF-8）のバイト数とする
+        response_bytes = sum(
+            len(generation.text.encode("utf-8"))
+            for generations in response.generations
+            for generation in generations
+        )
+        self._end(run_id, "ok", response_bytes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error")
+
+    def _end(self, run_id, status: str, response_bytes: int = None):
+        with self._lock:
+            started_at = self._started_at.pop(run_id, None)
+        if started_at is not None:
+            observe_external_request("llm", self.model_name, status, time.perf_counter() - started_at, response_bytes)
+
+# ======== セッション ========
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def record_session_state(session_id: str, session_state):
+    """
+    セッションのst.session_stateのおおよそのサイズを記録します。
+    再実行のたびに計算すると重いため、セッションごとに一定間隔で計算します。
+    """
+    if session_id is None:
+        return
+    now = time.time()
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is not None and now - session["measured_at"] < METRICS_SESSION_STATE_INTERVAL_SECONDS:
+            session["seen_at"] = now
+            return
+
+    size = estimate_size({key: session_state[key] for key in list(session_state.keys())})
+    with _sessions_lock:
+        _sessions[session_id] = {"seen_at": now, "measured_at": now, "bytes": size}
+
+def _collect_active_sessions() -> dict:
+    return {(): len(_get_active_sessions())}
+
+def _collect_session_state_bytes() -> dict:
+    sessions = _get_active_sessions()
+    return {
+        ("sum",): sum(session["bytes"] for session in sessions),
+        ("max",): max((session["bytes"] for session in sessions), default=0),
+    }
+
+def _get_active_sessions() -> list:
+    # 一定時間再実行がないセッションは終了したものとみなす
+    threshold = time.time() - METRICS_SESSION_TTL_SECONDS
+    with _sessions_lock:
+        for session_id in [session_id for session_id, session in _sessions.items() if session["seen_at"] < threshold]:
+            del _sessions[session_id]
+        return list(_sessions.values())
+
+registry.register(Gauge(
+    "panaestat_active_sessions",
+    "アクティブなセッション数",
+    collect=_collect_active_sessions,
+))
+registry.register(Gauge(
+    "panaestat_session_state_bytes",
+    "st.session_stateのおおよそのサイズ（バイト、アクティブなセッションの合計と最大）",
+    labelnames=("aggregation",),
+    collect=_collect_session_state_bytes,
+))
+
+def estimate_size(obj, max_depth: int = 8) -> int:
+    """
+    オブジェクトのおおよそのメモリ使用量（バイト）を返します。
+    配列（numpy, pandas）はデータのサイズ、それ以外は要素をたどってsys.getsizeofを合計します。
+    """
+    seen = set()
+
+    def _estimate(value, depth: int) -> int:
+        if id(value) in seen or depth > max_depth:
+            return 0
+        seen.add(id(value))
+
+        # DataFrame, Series
+        if hasattr(value, "memory_usage") and callable(value.memory_usage):
+            try:
+                usage = value.memory_usage(index=True)
+                return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+            except TypeError:
+                pass
+        # numpyの配列、列形式の統計データ（CompactStatData）
+        if isinstance(getattr(value, "nbytes", None), int):
+            size = value.nbytes
+            if hasattr(value, "__dict__"):
+                size += sum(_estimate(item, depth + 1) for key, item in vars(value).items() if key != "values")
+            return size
+
+        size = sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(_estimate(key, depth + 1) + _estimate(item, depth + 1) for key, item in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(_estimate(item, depth + 1) for item in value)
+        elif hasattr(value, "__dict__") and not isinstance(value, type):
+            size += _estimate(vars(value), depth + 1)
+        return size
+
+    return _estimate(obj, 0)
+
+# ======== HTTPサーバー ========
+_metrics_server_lock = threading.Lock()
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+def start_metrics_server():
+    """
+    Prometheus形式でメトリクスを返すHTTPサーバー（/metrics）を別スレッドで起動します。
+    環境変数METRICS_PORTが設定されている場合のみ、プロセス内で1回だけ起動します。
+    """
+    port = os.getenv("METRICS_PORT")
+    if not port:
+        return
+    with _metrics_server_lock:
+        # Streamlitがソースの変更でモジュールを再読み込みしてもサーバーは動き続けるため、プロセス全体で共有する状態に保持する
+        process_state = get_process_state()
+        metrics_server = process_state.get("metrics_server")
+        if metrics_server is not None:
+            # 再読み込み後のレジストリを返すよう、リクエストハンドラーを差し替える
+            metrics_server.RequestHandlerClass = _MetricsRequestHandler
+            return
+        try:
+            metrics_server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsRequestHandler)
+        except OSError as e:
+            # ポートが使用中の場合などは、メトリクスなしでアプリを続行する
+            logging.csv_error(f"failed to start metrics server on port {port}: {e}")
+            return
+        metrics_server.daemon_threads = True
+        threading.Thread(target=metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        process_state["metrics_server"] = metrics_server
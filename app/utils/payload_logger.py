@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+import random
+
+from constants import DEFAULT_LOG_PAYLOAD_MAX_BYTES, DEFAULT_LOG_PAYLOAD_SAMPLE_RATE
+from .estat import is_estat_data
+from .processed_data_cache import get_stat_data_key
+
+def log_payload(label: str, payload):
+    """
+    エージェントやツールの入出力を、内容全体ではなく概要（型・サイズ・件数・ハッシュなど）としてログに記録します。
+    内容は上限（LOG_PAYLOAD_MAX_BYTES）まで切り詰め、記録する割合（LOG_PAYLOAD_SAMPLE_RATE）に応じて含めます。
+    LOG_PAYLOAD_DEBUGがtrueの場合のみ、内容全体を記録します。
+
+    Args:
+        label (str): ログの種類（response, tool_outputなど）
+        payload: 記録する入出力
+    """
+    summary = describe_payload(payload)
+
+    if _is_debug_enabled():
+        summary["content"] = _to_text(payload)
+    elif random.random() < _get_sample_rate() and not is_estat_data(payload):
+        summary["preview"] = _truncate(_to_text(_replace_stat_data(payload)), _get_max_bytes())
+
+    logging.csv_info(f"{label}: {json.dumps(summary, ensure_ascii=False, default=str)}")
+
+def describe_payload(payload, depth: int = 0) -> dict:
+    """
+    入出力の概要を返します。
+    統計データは件数とキーのみを参照し、文字列への変換は行いません。
+    """
+    if is_estat_data(payload):
+        return _describe_stat_data(payload)
+
+    if isinstance(payload, dict) and depth == 0:
+        # エージェントの出力（{"user_input": ..., "output": ...}）などは項目ごとに概要を記録する
+        return {
+            "type": "dict",
+            "fields": {str(key): describe_payload(value, depth + 1) for key, value in payload.items()},
+        }
+
+    text = _to_text(_replace_stat_data(payload))
+    encoded = text.encode("utf-8")
+    summary = {
+        "type": type(payload).__name__,
+        "size": len(encoded),
+        "hash": hashlib.sha256(encoded).hexdigest()[:16],
+    }
+    if isinstance(payload, (list, tuple)):
+        summary["rows"] = len(payload)
+    return summary
+
+def _describe_stat_data(payload) -> dict:
+    if isinstance(payload, dict):
+        get_stats_data = payload["GET_STATS_DATA"]
+        values = get_stats_data.get("STATISTICAL_DATA", {}).get("DATA_INF", {}).get("VALUE", [])
+        rows = 1 if isinstance(values, dict) else len(values)
+        size = None
+    else:
+        get_stats_data = payload.meta["GET_STATS_DATA"]
+        rows = len(payload)
+        size = payload.nbytes
+
+    result_inf = get_stats_data.get("STATISTICAL_DATA", {}).get("RESULT_INF", {})
+    summary = {
+        "type": "stat_data",
+        "statsDataId": get_stats_data.get("PARAMETER", {}).get("STATS_DATA_ID"),
+        "rows": rows,
+        "total_number": result_inf.get("TOTAL_NUMBER"),
+        "hash": get_stat_data_key(payload)[:16],
+    }
+    if size is not None:
+        summary["size"] = size
+    return summary
+
+def _replace_stat_data(payload):
+    """
+    入れ子になった統計データを概要に置き換えます。
+    統計データは内容を切り詰めても意味がなく、文字列への変換も重いため、概要のみ記録する
+    """
+    if is_estat_data(payload):
+        return _describe_stat_data(payload)
+    if isinstance(payload, dict):
+        return {key: _replace_stat_data(value) for key, value in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return [_replace_stat_data(item) for item in payload]
+    return payload
+
+def _to_text(payload) -> str:
+    if isinstance(payload, str):
+        return payload
+    if isinstance(payload, bytes):
+        return payload.decode("utf-8", errors="replace")
+    try:
+        return json.dumps(payload, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return repr(payload)
+
+def _truncate(text: str, max_bytes: int) -> str:
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    # マルチバイト文字の途中で切れた場合は、その文字を除く
+    return encoded[:max_bytes].decode("utf-8", errors="ignore") + "..."
+
+def _get_max_bytes() -> int:
+    return int(os.getenv("LOG_PAYLOAD_MAX_BYTES", DEFAULT_LOG_PAYLOAD_MAX_BYTES))
+
+def _get_sample_rate() -> float:
+    return float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", DEFAULT_LOG_PAYLOAD_SAMPLE_RATE))
+
+def _is_debug_enabled() -> bool:
+    return os.getenv("LOG_PAYLOAD_DEBUG", "false").lower() == "true"
@@ -0,0 +1,10 @@
+import streamlit as st
+
+@st.cache_resource
+def get_process_state() -> dict:
+    """
+    プロセス全体で共有する状態（ログの書き込みスレッド、メトリクスのHTTPサーバーなど）を保持する辞書を返します。
+    Streamlitはソースの変更時にモジュールを再読み込みするため、モジュールの変数に保持した値は失われますが、
+    st.cache_resourceの値は再読み込み後も同じものが返されるため、再読み込み前に起動したスレッドやサーバーを参照できます。
+    """
+    return {}
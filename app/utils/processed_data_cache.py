@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from constants import PROCESSED_DATA_CACHE_MAX_ENTRIES, PROCESSED_DATA_CACHE_MAX_MB
+
+class ProcessedDataCache:
+    """
+    統計データを表示用に変換した結果（DataFrameやカラム名のリスト）を保持するLRUキャッシュ
+    Streamlitの再実行のたびに過去のメッセージの統計データを変換し直さないように、プロセス内で共有する
+    保持しているDataFrameは複数のセッションから参照されるため、取得した側で変更しないこと
+    DataFrameのメモリ使用量の合計がmax_bytesを超えた場合と、件数がmax_entriesを超えた場合に、最後に参照されたのが古いものから削除する
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        # キー -> (値, メモリ使用量)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_size(cls, value) -> int:
+        """
+        値に含まれるDataFrameのメモリ使用量（バイト）を返します。
+        """
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(deep=True).sum())
+        if isinstance(value, dict):
+            return sum(cls.get_size(item) for item in value.values())
+        return 0
+
+    def get(self, key: str):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def set(self, key: str, value):
+        size = self.get_size(value)
+        with self._lock:
+            self._remove(key)
+            # 1件で上限を超えるものは保持しない
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            # 上限を超えた場合は最後に参照されたのが古いものから削除
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def invalidate(self, key: str = None):
+        """
+        キャッシュを削除します。キーを省略した場合はすべて削除します。
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            else:
+                self._remove(key)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+            }
+
+processed_data_cache = ProcessedDataCache(PROCESSED_DATA_CACHE_MAX_ENTRIES, PROCESSED_DATA_CACHE_MAX_MB * 1024 * 1024)
+
+def get_stat_data_key(response: dict) -> str:
+    """
+    統計データのレスポンスから、キャッシュ用の安定したキーを生成します。
+    VALUE全体をハッシュ化すると重いため、リクエスト条件（PARAMETER）と取得日時、件数の情報から生成します。
+    """
+    # 列形式に変換済みの統計データは生成時にキーを保持している
+    if not isinstance(response, dict):
+        return response.key
+
+    get_stats_data = response.get('GET_STATS_DATA', {})
+    statistical_data = get_stats_data.get('STATISTICAL_DATA', {})
+    key_source = {
+        "parameter": get_stats_data.get('PARAMETER'),
+        "date": get_stats_data.get('RESULT', {}).get('DATE'),
+        "result_inf": statistical_data.get('RESULT_INF'),
+    }
+    raw_key = json.dumps(key_source, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+def invalidate_processed_data(response: dict = None):
+    """
+    統計データの変換結果のキャッシュを削除します。レスポンスを省略した場合はすべて削除します。
+    """
+    processed_data_cache.invalidate(get_stat_data_key(response) if response is not None else None)
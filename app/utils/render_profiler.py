@@ -0,0 +1,127 @@
+import cProfile
+import datetime
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# cProfileは同時に1つしか有効にできないため、プロセス内で排他制御する
+_snapshot_lock = threading.Lock()
+
+class RenderProfiler:
+    """
+    Streamlitの再実行（rerun）ごとに、画面の各コンポーネントの描画時間を計測するクラス
+    直近の再実行の描画時間をコンポーネントごとに保持し、p50・p95を集計する
+    スナップショットを有効にした場合は、遅い再実行のcProfileの結果をファイルに保存する
+    """
+
+    def __init__(self, window_size: int, snapshot_dir: str, max_snapshots: int):
+        self.snapshot_dir = snapshot_dir
+        self.max_snapshots = max_snapshots
+        # コンポーネント名 -> 直近の再実行での描画時間（ms）
+        self._timings = {}
+        self._window_size = window_size
+        self._current = None
+        self._rerun_started_at = None
+        self._profile = None
+
+    def start_rerun(self, with_snapshot: bool = False):
+        """
+        再実行の計測を開始します。
+        """
+        self._current = {}
+        self._rerun_started_at = time.perf_counter()
+        self._profile = None
+        if with_snapshot and _snapshot_lock.acquire(blocking=False):
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # 他のプロファイラーが有効な場合はスナップショットを取得しない
+                self._profile = None
+                _snapshot_lock.release()
+
+    @contextmanager
+    def measure(self, component: str):
+        """
+        withブロック内の処理時間を、コンポーネントの描画時間として計測します。
+        1回の再実行で同じコンポーネントを複数回描画した場合は合計します。
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                elapsed_ms = (time.perf_counter() - started_at) * 1000
+                self._current[component] = self._current.get(component, 0.0) + elapsed_ms
+
+    def end_rerun(self):
+        """
+        再実行の計測を終了し、描画時間を記録します。
+        スナップショットを取得している場合は、直近の再実行の中で遅い場合のみ保存します。
+        """
+        if self._current is None:
+            return
+        total_ms = (time.perf_counter() - self._rerun_started_at) * 1000
+        is_slow = self._is_slow(total_ms)
+        self._current["rerun"] = total_ms
+        for component, elapsed_ms in self._current.items():
+            self._timings.setdefault(component, deque(maxlen=self._window_size)).append(elapsed_ms)
+        self._current = None
+
+        if self._profile is not None:
+            try:
+                self._profile.disable()
+                if is_slow:
+                    self._save_snapshot(self._profile, total_ms)
+            finally:
+                self._profile = None
+                _snapshot_lock.release()
+
+    def _is_slow(self, total_ms: float) -> bool:
+        timings = self._timings.get("rerun")
+        # 計測回数が少ないうちは比較できないため、すべて保存する
+        if timings is None or len(timings) < 5:
+            return True
+        return total_ms >= _percentile(list(timings), 95)
+
+    def _save_snapshot(self, profile: cProfile.Profile, total_ms: float):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        file_name = f"rerun_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{total_ms:.0f}ms.prof"
+        profile.dump_stats(os.path.join(self.snapshot_dir, file_name))
+
+        # 上限を超えた場合は古いスナップショットから削除する
+        snapshots = sorted(
+            (os.path.join(self.snapshot_dir, name) for name in os.listdir(self.snapshot_dir) if name.endswith(".prof")),
+            key=os.path.getmtime,
+        )
+        for snapshot in snapshots[:max(0, len(snapshots) - self.max_snapshots)]:
+            os.remove(snapshot)
+
+    def get_summary(self) -> list:
+        """
+        コンポーネントごとの描画時間の集計を返します。
+
+        Returns:
+            list: component, count, p50_ms, p95_ms, last_ms をキーとする辞書の配列（p95の大きい順）
+        """
+        summary = []
+        for component, timings in self._timings.items():
+            values = list(timings)
+            summary.append({
+                "component": component,
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 50), 1),
+                "p95_ms": round(_percentile(values, 95), 1),
+                "last_ms": round(values[-1], 1),
+            })
+        summary.sort(key=lambda item: item["p95_ms"], reverse=True)
+        return summary
+
+def _percentile(values: list, percent: float) -> float:
+    # 最近傍法で求める
+    sorted_values = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
@@ -0,0 +1,272 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .metrics import span_duration_seconds
+
+# 実行中のスパン（スレッドやLangChainの並列実行にもcontextvarsで引き継がれる）
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_export_lock = threading.Lock()
+
+class Span:
+    """
+    処理時間を計測する区間（スパン）
+    同じリクエスト（トレース）内のスパンは、ルートのスパンが持つ配列に終了順に追加される
+    """
+
+    def __init__(self, name: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.error = None
+        self.start_time = time.time()
+        self.end_time = None
+        self._start_counter = time.perf_counter()
+        self._duration = None
+        # トレース内の終了したスパン（ルートのスパンの配列を共有する）
+        self.finished_spans = parent.finished_spans if parent is not None else []
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict):
+        self.attributes.update(attributes)
+
+    def record_exception(self, exception: BaseException):
+        self.status = "ERROR"
+        self.error = f"{exception.__class__.__name__}: {exception}"
+
+    @property
+    def is_root(self) -> bool:
+        return self.parent is None
+
+    @property
+    def duration_ms(self) -> float:
+        if self._duration is None:
+            return (time.perf_counter() - self._start_counter) * 1000
+        return self._duration * 1000
+
+    def end(self):
+        if self.end_time is not None:
+            return
+        self._duration = time.perf_counter() - self._start_counter
+        self.end_time = self.start_time + self._duration
+        self.finished_spans.append(self)
+        _emit_span(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+def get_current_span():
+    """
+    実行中のスパンを返します。スパンの外で呼ばれた場合はNoneを返します。
+    """
+    return _current_span.get()
+
+def set_span_attributes(**attributes):
+    """
+    実行中のスパンに属性を追加します。スパンの外で呼ばれた場合は何もしません。
+    """
+    span = get_current_span()
+    if span is not None:
+        span.set_attributes(attributes)
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """
+    スパンを開始し、withブロックを抜けた時に終了します。
+    実行中のスパンがある場合はその子スパン、ない場合は新しいトレースのルートのスパンになります。
+
+    Example:
+        with start_span("estat.fetch", statsDataId=statsDataId) as span:
+            ...
+            span.set_attribute("rows", rows)
+    """
+    span = Span(name, parent=get_current_span(), attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+def traced(name: str = None, **attributes):
+    """
+    関数の実行をスパンとして計測するデコレーター
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChainのLLMの呼び出しをスパンとして計測するCallbackHandler
+    呼び出し元のスパン（エージェント・ツール・チェーンの実行）の子スパンになる
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def _start(self, run_id):
+        span = Span("llm.call", parent=get_current_span(), attributes={"model": self.model_name})
+        with self._lock:
+            self._spans[run_id] = span
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        span.set_attributes(_get_token_usage(response))
+        span.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        span.record_exception(error)
+        span.end()
+
+def _get_token_usage(response) -> dict:
+    # プロバイダーによって形式が異なるため、usage_metadataがあるものから集計する
+    input_tokens = 0
+    output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if input_tokens == 0 and output_tokens == 0:
+        return {}
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens}
+
+def _emit_span(span: Span):
+    """
+    終了したスパンをメトリクスに記録し、ルートのスパンの場合はトレースの概要をログに、トレース全体をファイルに出力します。
+    スパンごとのログはログの量が増えるため、環境変数TRACE_LOG_ALL_SPANSが設定されている場合のみ出力します。
+    """
+    span_duration_seconds.observe(span.duration_ms / 1000, name=span.name, status=span.status)
+    if os.getenv("TRACE_LOG_ALL_SPANS", "").lower() in ("1", "true", "yes"):
+        attributes = json.dumps(span.attributes, ensure_ascii=False, default=str)
+        status = span.status if span.error is None else f"{span.status} ({span.error})"
+        logging.csv_info(
+            f"span: {span.name} {span.duration_ms:.1f}ms {status} trace_id={span.trace_id} attributes={attributes}"
+        )
+    elif span.is_root:
+        logging.csv_info(_summarize_trace(span))
+
+    export_path = os.getenv("TRACE_EXPORT_PATH")
+    if span.is_root and export_path:
+        try:
+            _export_trace(span.finished_spans, export_path)
+        except OSError as e:
+            logging.csv_error(f"failed to export trace: {e}")
+
+def _summarize_trace(root: Span) -> str:
+    """
+    トレースの概要（ルートのスパンの処理時間、スパン数、エラー数、最も時間のかかった子スパン）を1行で返します。
+    """
+    children = [span for span in root.finished_spans if span is not root]
+    errors = [span for span in root.finished_spans if span.status == "ERROR"]
+    status = root.status if root.error is None else f"{root.status} ({root.error})"
+    summary = (
+        f"trace: {root.name} {root.duration_ms:.1f}ms {status} trace_id={root.trace_id}"
+        f" spans={len(root.finished_spans)} errors={len(errors)}"
+    )
+    if children:
+        slowest = max(children, key=lambda span: span.duration_ms)
+        summary += f" slowest={slowest.name}({slowest.duration_ms:.1f}ms)"
+    if errors and root.error is None:
+        summary += f" first_error={errors[0].name} ({errors[0].error})"
+    return summary
+
+def _export_trace(spans: list, export_path: str):
+    """
+    トレースをOTLP（OpenTelemetry Protocol）のJSON形式で、1行1トレースとしてファイルに追記します。
+    """
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_to_otlp_attribute("service.name", "panaestat")]},
+            "scopeSpans": [{
+                "scope": {"name": "panaestat"},
+                "spans": [_to_otlp_span(span) for span in spans],
+            }],
+        }],
+    }
+    os.makedirs(os.path.dirname(export_path) or ".", exist_ok=True)
+    with _export_lock:
+        with open(export_path, mode="a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+def _to_otlp_span(span: Span) -> dict:
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(int(span.start_time * 1e9)),
+        "endTimeUnixNano": str(int(span.end_time * 1e9)),
+        "attributes": [_to_otlp_attribute(key, value) for key, value in span.attributes.items()],
+        # 1: OK, 2: ERROR
+        "status": {"code": 2 if span.status == "ERROR" else 1},
+    }
+    if span.parent_id is not None:
+        otlp_span["parentSpanId"] = span.parent_id
+    if span.error is not None:
+        otlp_span["status"]["message"] = span.error
+    return otlp_span
+
+def _to_otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        otlp_value = {"boolValue": value}
+    elif isinstance(value, int):
+        otlp_value = {"intValue": str(value)}
+    elif isinstance(value, float):
+        otlp_value = {"doubleValue": value}
+    else:
+        otlp_value = {"stringValue": str(value)}
+    return {"key": key, "value": otlp_value}
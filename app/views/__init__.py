@@ -1,6 +1,8 @@
 from .stat_data_viewer import *
 from .pandas_data_viewer import *
 from .estat_url_btn import *
+from .estat_filter_form import *
+from .trace_waterfall import *
 from .side_bar import *
 from .messages import *
 from .prompt_input import *
@@ -4,13 +4,12 @@ import logging
 import streamlit as st
 import japanize_matplotlib
 from pandasai import Agent
-from pandasai.llm import OpenAI
 from pandasai.helpers.openai_info import get_openai_callback
 
 from constants import PANDAS_AI_IMG_OUTPUT_PATH, DISPLAY_OPTIONS, PANDAS_AI_ERROR_MESSAGE, GENERATE_CHART_PROMPT
-from utils import extract_data_extension, read_file, is_estat_url, is_estat_data, GenerativeAIModel
-from session import set_agent_message, get_model_name, set_llm_input_cost, set_llm_output_cost, set_serp_api_results
-from services import StreamlitCallbackHandler, calc_input_cost_from_prompt, calc_input_cost, calc_output_cost
+from utils import extract_data_extension, read_file, is_estat_url, is_estat_data, GenerativeAIModel, log_payload, start_span, get_pandasai_llm
+from session import set_agent_message, get_model_name, set_llm_input_cost, set_llm_output_cost, set_serp_api_results, is_admin, set_last_trace
+from services import StreamlitCallbackHandler, route_intent, calc_input_cost_from_prompt, calc_input_cost, calc_output_cost
 
 
 class AgentOutput:
@@ -37,16 +36,27 @@ class AgentOutput:
         Langchainを使用してユーザーの質問に対して適切な処理を実行する
         estatのダウンロードリンク取得やestatのデータの表示を行う
         """
-        callback_handler = StreamlitCallbackHandler(st.expander("思考過程"))
-        response = self.agent.invoke(
-            {'user_input': [self.prompt]},
-            config={'callbacks': [callback_handler]}
-        )
-        logging.csv_info(f"response: {response}")
+        thinking_expander = st.expander("思考過程")
+        callback_handler = StreamlitCallbackHandler(thinking_expander)
+        # 統計表IDやe-StatのURLだけの入力は、LLMでツールを選ばずに直接実行する
+        route = route_intent(self.prompt)
+        with start_span("agent.invoke", model=get_model_name(), route=route.route, route_reason=route.reason) as span:
+            if route.is_fast_path:
+                thinking_expander.markdown(f"**Action:** {route.route}\n**Action Input:** {route.tool_input}")
+                response = route.invoke(self.prompt, callbacks=[callback_handler])
+            else:
+                response = self.agent.invoke(
+                    {'user_input': [self.prompt]},
+                    config={'callbacks': [callback_handler]}
+                )
+        self._save_trace(span, thinking_expander)
+        # 統計データを含む場合は数十MBになるため、概要のみ記録する
+        log_payload("response", response)
         
-        # 入力コストを計算
-        input_cost = calc_input_cost_from_prompt(self.prompt, get_model_name())
-        set_llm_input_cost(input_cost, get_model_name())
+        # 入力コストを計算（ツールを直接実行した場合はLLMを呼び出していないため、計算しない）
+        if not route.is_fast_path:
+            input_cost = calc_input_cost_from_prompt(self.prompt, get_model_name())
+            set_llm_input_cost(input_cost, get_model_name())
         
         # agentで実行したtoolの出力コストは計算する方法がないため、計算しない
         # 各tool内でLLMを使用している場合は、それぞれのtool内で計算する
@@ -58,6 +68,9 @@ class AgentOutput:
 
         if output == "stat_data_viewer":
             self._display_formatted_estat_data()
+        elif output == "estat_filter_form":
+            # 絞り込みフォームのメッセージはツール内で保存済みのため、再描画のみ行う
+            st.rerun()
         elif is_estat_url(output):
             self._display_estat_url(output)
         elif is_estat_data(output):
@@ -65,6 +78,18 @@ class AgentOutput:
         else:
             self._display_markdown_text(output)
 
+    def _save_trace(self, span, thinking_expander):
+        """
+        応答のトレースを保存し、管理者の場合は思考過程にウォーターフォール図を表示する
+        """
+        if not is_admin():
+            return
+        spans = [finished_span.to_dict() for finished_span in span.finished_spans]
+        # 応答後に再描画されるため、メッセージの表示時にも表示できるようセッションに保存する
+        set_last_trace(spans)
+        from views import TraceWaterfall
+        TraceWaterfall(spans, key=span.trace_id).display(thinking_expander)
+
     def _output_with_file(self):
         """
         ファイルをアップロードした場合の処理
@@ -89,7 +114,7 @@ class AgentOutput:
             agent = Agent(
                 df,
                 config={
-                    "llm": OpenAI(model_name="gpt-4o"),
+                    "llm": get_pandasai_llm(),
                     "custom_whitelisted_dependencies": ["plotly"],
                 }
             )
@@ -1,43 +1,77 @@
+import logging
+
 import streamlit as st
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from api import get_estat_data_count
-from utils import extract_statdisp_id, set_llm
+from api import get_estat_data_counts
+from utils import extract_statdisp_id, set_llm, create_thread_pool, start_span, get_llm_response_cache
 from session import get_fetch_data_type, get_model_name, set_llm_input_cost, set_llm_output_cost
-from constants import FetchDataType, SUMMARIZE_ESTAT_DATA_URL_PROMPT
+from constants import FetchDataType, SUMMARIZE_ESTAT_DATA_URL_PROMPT, LLM_SUMMARY_MAX_CONCURRENCY
 
 class EstatDataSummary:
     def __init__(self, data, stat_data_index):
         self.summary = ""
-        for i, item in enumerate(data, stat_data_index):
+        is_estat_api = get_fetch_data_type() == FetchDataType.ESTAT_API.value
+        
+        with create_thread_pool(1) as executor:
+            # データ件数はLLMによる概要の生成と並行して、全件まとめて取得する
+            data_counts_future = None
+            if is_estat_api:
+                stats_data_ids = [extract_statdisp_id(item['link']) for item in data]
+                data_counts_future = executor.submit(get_estat_data_counts, stats_data_ids)
             
+            # 1件ずつ順番に呼び出さず、同時実行数を制限してまとめて概要を生成する
             prompt = ChatPromptTemplate.from_template(SUMMARIZE_ESTAT_DATA_URL_PROMPT)
             chain = prompt | set_llm(get_model_name()) | StrOutputParser()
-            outline = chain.invoke({"title": item['title'], "snippet": item['snippet']}).strip()
+            inputs = [{"title": item['title'], "snippet": item['snippet']} for item in data]
+            # 概要を生成済みの検索結果（「もっと見る」や他のユーザーが表示したもの）はキャッシュから返す
+            with start_span("llm.summarize_search_results", model=get_model_name(), items=len(inputs)):
+                results, cached = get_llm_response_cache().batch(
+                    chain,
+                    get_model_name(),
+                    SUMMARIZE_ESTAT_DATA_URL_PROMPT,
+                    inputs,
+                    config={"max_concurrency": LLM_SUMMARY_MAX_CONCURRENCY},
+                )
             
             from services import calc_input_cost_from_prompt, calc_output_cost_from_result
-            # 入力コストを計算
-            prompt_text = SUMMARIZE_ESTAT_DATA_URL_PROMPT.format(title=item['title'], snippet=item['snippet'])
-            input_cost = calc_input_cost_from_prompt(prompt_text, get_model_name())
-            set_llm_input_cost(input_cost, get_model_name())
-            
-            # 出力コストを計算
-            output_cost = calc_output_cost_from_result(prompt_text, get_model_name())
-            set_llm_output_cost(output_cost, get_model_name())
-            
+            outlines = []
+            for item_input, result, is_cached in zip(inputs, results, cached):
+                if isinstance(result, Exception):
+                    logging.csv_error(f"failed to summarize search result: {result}")
+                    outlines.append("概要の生成に失敗しました。")
+                    continue
+                outline = result.strip()
+                outlines.append(outline)
+                
+                # キャッシュから返した場合はLLMを呼び出していないため、コストを計算しない
+                if is_cached:
+                    continue
+                
+                # 入力コストを計算
+                prompt_text = SUMMARIZE_ESTAT_DATA_URL_PROMPT.format(**item_input)
+                input_cost = calc_input_cost_from_prompt(prompt_text, get_model_name())
+                set_llm_input_cost(input_cost, get_model_name())
+                
+                # 出力コストを計算
+                output_cost = calc_output_cost_from_result(outline, get_model_name())
+                set_llm_output_cost(output_cost, get_model_name())
             
+            data_counts = data_counts_future.result() if data_counts_future is not None else []
+        
+        for i, (item, outline) in enumerate(zip(data, outlines), stat_data_index):
             self.summary += f"**{i}. {item['title']}**  \n"
             self.summary += f"        **URL:** {item['link']}  \n"
             self.summary += f"        **概要:** {outline}  \n"
             
-            if get_fetch_data_type() == FetchDataType.ESTAT_API.value:
-                try:
-                    data_count = get_estat_data_count(extract_statdisp_id(item['link']))
-                    self.summary += f"        **データ件数:** {data_count:,}件  \n\n"
-                except Exception as e:
+            if is_estat_api:
+                data_count = data_counts[i - stat_data_index]
+                if isinstance(data_count, Exception) or data_count is None:
                     self.summary += f"        **データ件数:** 取得に失敗しました。  \n\n"
+                else:
+                    self.summary += f"        **データ件数:** {data_count:,}件  \n\n"
             else:
                 self.summary += "\n"
         
@@ -45,4 +79,4 @@ class EstatDataSummary:
         st.markdown(self.summary)
 
     def get_summary(self):
-        return self.summary
\ No newline at end of file
+        return self.summary
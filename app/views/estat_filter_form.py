@@ -0,0 +1,97 @@
+import logging
+
+import streamlit as st
+
+from constants import DISPLAY_OPTIONS
+from api import fetch_estat_data, get_estat_meta_info, plan_estat_fetch
+from utils import get_class_objs, is_estat_data
+from session import set_agent_message
+
+class EstatFilterForm:
+    """
+    e-Stat側で絞り込んで統計データを取得するためのフォームを表示するクラス
+    データ件数が多く全件を取得できない場合に、メタ情報の分類（CLASS_OBJ）から取得する項目を選択する
+    """
+
+    def __init__(self, content, index):
+        self.stats_data_id = content["statsDataId"]
+        self.message = content["message"]
+        self.plan = content.get("plan")
+        self.key = index + 1
+
+    def display_form(self):
+        st.markdown(self.message)
+        if self.plan is not None:
+            st.caption(
+                f"統計表全体: {self.plan['total_number']:,}件 / "
+                f"取得予定: 約{self.plan['estimated_number']:,}件 / "
+                f"推定メモリ使用量: 約{self.plan['estimated_bytes'] / (1024 * 1024):,.0f}MB"
+            )
+
+        try:
+            meta_info = get_estat_meta_info(self.stats_data_id)
+        except Exception as e:
+            logging.csv_error(f"failed to fetch meta info: {e}")
+            st.warning("絞り込み条件の取得に失敗しました。")
+            return
+
+        class_objs = get_class_objs(meta_info.get("CLASS_INF", {}))
+        if len(class_objs) == 0:
+            return
+
+        with st.expander("e-Stat側で絞り込んで取得する"):
+            with st.form(key=f"estat_filter_form_{self.key}"):
+                for class_obj in class_objs:
+                    code_to_name = {obj["@code"]: obj["@name"] for obj in class_obj["CLASS"]}
+                    st.multiselect(
+                        f"{class_obj['@name']}を選択してください",
+                        options=list(code_to_name.keys()),
+                        format_func=lambda code, code_to_name=code_to_name: code_to_name.get(code, code),
+                        key=self._filter_key(class_obj["@id"]),
+                    )
+                st.form_submit_button(
+                    "絞り込んで取得",
+                    on_click=self._on_submit,
+                    kwargs={"class_ids": [class_obj["@id"] for class_obj in class_objs]},
+                )
+
+    def _filter_key(self, class_id: str) -> str:
+        return f"estat_filter_{class_id}_{self.key}"
+
+    def _on_submit(self, class_ids):
+        """
+        フォームが送信されたときに関数を実行
+        選択された分類のコードでe-Stat側で絞り込んだデータを取得する
+        """
+        filters = {
+            class_id: st.session_state.get(self._filter_key(class_id), [])
+            for class_id in class_ids
+        }
+        filters = {class_id: codes for class_id, codes in filters.items() if codes}
+        if len(filters) == 0:
+            st.warning("絞り込み条件を選択してください。")
+            return
+
+        try:
+            plan = plan_estat_fetch(self.stats_data_id, filters)
+            response = fetch_estat_data(self.stats_data_id, filters=filters, plan=plan)
+        except Exception:
+            set_agent_message(content="絞り込み条件で統計データを取得することに失敗しました。")
+            return
+
+        if is_estat_data(response):
+            set_agent_message(
+                content=response,
+                display_type=DISPLAY_OPTIONS[0],
+                is_stat_data=True,
+            )
+        else:
+            # 絞り込んでもデータ件数が多い場合は、再度絞り込めるようにフォームを表示する
+            set_agent_message(
+                content={
+                    "statsDataId": self.stats_data_id,
+                    "message": response,
+                    "plan": plan,
+                },
+                with_filter_form=True,
+            )
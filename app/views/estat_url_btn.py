@@ -81,6 +81,9 @@ class EstatUrlBtn:
         """
         response = get_estat_data_by_url.invoke({"url": url})
         
+        if response == "estat_filter_form":
+            # 絞り込みフォームのメッセージはツール内で保存済み
+            return
         if is_estat_data(response):
             set_agent_message(
                 content=response,
@@ -1,7 +1,9 @@
 import streamlit as st
 import logging
 
-from views import StatDataViewer, PandasDataViewer, EstatUrlBtn
+from views import StatDataViewer, PandasDataViewer, EstatUrlBtn, EstatFilterForm, TraceWaterfall
+from session import is_admin, get_last_trace
+from services import measure_render
 
 def display_messages():
     for index, message in enumerate(st.session_state.messages):
@@ -10,9 +12,13 @@ def display_messages():
             with_file = message.get("with_file") # アップロードしたファイルに対する回答かどうか
             with_btns = message.get("with_btns") # ボタンの表示有無
             is_formatted = message.get("is_formatted") # PandasAIによって整形されたデータかどうか
+            with_filter_form = message.get("with_filter_form") # e-Stat側での絞り込みフォームの表示有無
 
             if not is_stat_data:
-                if with_btns:
+                if with_filter_form:
+                    # 絞り込んで取得するためのフォームの表示
+                    EstatFilterForm(message["content"], index).display_form()
+                elif with_btns:
                     # urlボタンの表示
                     urls = message["content"]["urls"]
                     next_data_index = message["content"]["next_data_index"]
@@ -47,6 +53,13 @@ def display_messages():
                 message["content"].display_data()
             else:
                 # estatから取得した未整形の統計データの表示
-                viewer = StatDataViewer(message["content"], index)
-                viewer.process_data()
-                viewer.display_data_with_session_state()
\ No newline at end of file
+                with measure_render("stat_data_viewer"):
+                    viewer = StatDataViewer(message["content"], index)
+                    viewer.process_data()
+                    viewer.display_data_with_session_state()
+
+    # 管理者には直前の応答のトレースを表示する
+    last_trace = get_last_trace()
+    if is_admin() and last_trace:
+        with st.expander("思考過程"):
+            TraceWaterfall(last_trace, key="last").display()
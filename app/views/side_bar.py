@@ -1,10 +1,16 @@
 import os
+import datetime
+import logging
 import streamlit as st
 import time
 
-from services import logout
+from services import logout, is_render_profiling_enabled
 from utils import (
-    zip_logs,
+    JST,
+    create_thread_pool,
+    write_logs_zip,
+    remove_logs_zip,
+    get_log_index,
     get_logs_dir_size,
     get_log_files,
     get_oldest_log,
@@ -16,9 +22,10 @@ from constants import (
     FETCH_DATA_TYPE,
     SAVE_DATA_OPTIONS,
     DEFAULT_ESTAT_DATA_LIMIT,
-    LOGS_ZIP_PATH,
+    MAX_ESTAT_DATA_LIMIT,
     LOG_DIR,
     MAX_LOGS_DIR_SIZE_MB,
+    LOG_SEARCH_PAGE_SIZE,
     DEFAULT_USD_JPY_RATE,
     GenerativeAIModel,
     FetchDataType,
@@ -31,6 +38,10 @@ from session import (
     set_estat_data_limit,
     get_llm_costs,
     set_usd_jpy_rate,
+    is_admin,
+    get_render_profiler,
+    get_render_profiling_settings,
+    set_render_profiling_settings,
 )
 
 def init_sidebar(file):
@@ -51,7 +62,7 @@ def init_sidebar(file):
             # データ取得オプションがe-Stat　APIの場合はe-Statのデータ取得上限を設定する
             if fetch_data_type == FetchDataType.ESTAT_API.value:
                 # e-Statのデータ取得上限
-                estat_data_limit = st.sidebar.number_input("e-Statのデータ取得上限", min_value=1, value=DEFAULT_ESTAT_DATA_LIMIT, max_value=100000, step=10000)
+                estat_data_limit = st.sidebar.number_input("e-Statのデータ取得上限", min_value=1, value=DEFAULT_ESTAT_DATA_LIMIT, max_value=MAX_ESTAT_DATA_LIMIT, step=10000)
                 set_estat_data_limit(estat_data_limit)
             
             # LLM 選択
@@ -71,6 +82,14 @@ def init_sidebar(file):
         # ログ情報の表示
         _display_log_info()
 
+        # ログ検索（管理者のみ）
+        if is_admin():
+            _display_log_search()
+
+        # 描画時間の計測（管理者のみ）
+        if is_admin():
+            _display_render_profile()
+
         # ログアウトボタン
         st.sidebar.button("ログアウト", on_click=logout)
 
@@ -122,20 +141,26 @@ def _display_log_info():
         # ZIP作成ボタン
         # ログファイルが存在する場合のみ圧縮オプションを表示
         if log_files:
+            today = datetime.datetime.now(JST).date()
+            date_range = st.date_input(
+                "期間",
+                value=(today - datetime.timedelta(days=7), today),
+                max_value=today,
+                key="log_export_date_range",
+            )
+            user_name = st.text_input("ユーザー名（空欄の場合はすべて）", key="log_export_user_name")
+            start_date, end_date = _get_date_range(date_range)
+            export_conditions = (start_date, end_date, user_name or None)
+            # 条件を変更した場合は、作成済みのZIPを削除する
+            if st.session_state.get("logs_zip_conditions") not in (None, export_conditions):
+                _discard_logs_zip()
             if st.button("ログを圧縮 (ZIP作成)"):
-                with st.spinner("ログを圧縮中..."):
-                    zip_logs()
-                st.toast("✅ ログのZIP作成が完了しました！")
-
-        # ZIPダウンロードボタン
-        if os.path.exists(LOGS_ZIP_PATH):
-            with open(LOGS_ZIP_PATH, "rb") as f:
-                st.download_button(
-                    label="ZIPをダウンロード",
-                    data=f,
-                    file_name="logs.zip",
-                    mime="application/zip"
-                )
+                _discard_logs_zip()
+                _start_logs_zip(export_conditions)
+
+        # ZIPの作成状況・ダウンロードボタン
+        if st.session_state.get("logs_zip_future") is not None:
+            _display_logs_zip_download()
 
         # ログファイルが存在する場合のみ削除オプションを表示
         if log_files:
@@ -151,6 +176,167 @@ def _display_log_info():
                 if st.button("すべてのログを削除"):
                     _confirm_delete_all_logs()
 
+def _start_logs_zip(conditions: tuple):
+    """
+    ログのZIPの作成を別スレッドで開始します。作成中も画面を操作できるよう、完了を待たずに戻ります。
+    """
+    executor = create_thread_pool(1)
+    st.session_state.logs_zip_future = executor.submit(write_logs_zip, *conditions)
+    st.session_state.logs_zip_conditions = conditions
+    # 作成中のタスクは実行を続けるため、完了を待たずにスレッドプールを終了する
+    executor.shutdown(wait=False)
+
+def _discard_logs_zip():
+    """
+    作成したログのZIPの一時ファイルを削除します。作成中の場合は、完了後に削除します。
+    """
+    future = st.session_state.pop("logs_zip_future", None)
+    st.session_state.pop("logs_zip_conditions", None)
+    if future is not None:
+        future.add_done_callback(_remove_logs_zip_result)
+
+def _remove_logs_zip_result(future):
+    if future.exception() is None:
+        remove_logs_zip(future.result())
+
+@st.fragment(run_every=1)
+def _wait_logs_zip():
+    # 作成が完了したら、ダウンロードボタンを表示するために再実行する
+    future = st.session_state.get("logs_zip_future")
+    if future is None or future.done():
+        st.rerun()
+    st.info("ログを圧縮中...")
+
+def _display_logs_zip_download():
+    future = st.session_state.logs_zip_future
+    if not future.done():
+        _wait_logs_zip()
+        return
+    if future.exception() is not None:
+        logging.csv_error(f"failed to create logs zip: {future.exception()}")
+        st.error("ログの圧縮に失敗しました。")
+        _discard_logs_zip()
+        return
+
+    try:
+        # ZIPのバイト列をセッションに保持せず、一時ファイルから読み込んで渡す
+        with open(future.result(), "rb") as zip_file:
+            st.download_button(
+                label="ZIPをダウンロード",
+                data=zip_file,
+                file_name="logs.zip",
+                mime="application/zip",
+                on_click=_discard_logs_zip,
+            )
+    except FileNotFoundError:
+        # 一定時間ダウンロードされずに削除された場合
+        _discard_logs_zip()
+        st.warning("ZIPの有効期限が切れました。もう一度作成してください。")
+
+def _display_log_search():
+    with st.sidebar.expander("ログ検索"):
+        # 折りたたまれていても実行されるため、検索ボタンを押した場合のみ検索する
+        with st.form("log_search_form"):
+            level = st.selectbox("レベル", options=["すべて", "INFO", "ERROR"], key="log_search_level")
+            user_name = st.text_input("ユーザー名（空欄の場合はすべて）", key="log_search_user_name")
+            keyword = st.text_input("キーワード", key="log_search_keyword")
+            today = datetime.datetime.now(JST).date()
+            date_range = st.date_input(
+                "期間",
+                value=(today - datetime.timedelta(days=7), today),
+                max_value=today,
+                key="log_search_date_range",
+            )
+            submitted = st.form_submit_button("検索")
+
+        log_index = get_log_index()
+        if submitted:
+            start_date, end_date = _get_date_range(date_range)
+            conditions = {
+                "level": None if level == "すべて" else level,
+                "user_name": user_name or None,
+                "start": _to_timestamp(start_date),
+                "end": _to_timestamp(end_date + datetime.timedelta(days=1)) if end_date is not None else None,
+                "keyword": keyword or None,
+            }
+            st.session_state.log_search_result = {
+                "conditions": conditions,
+                "total_count": log_index.count(**conditions),
+                "error_counts": log_index.get_error_counts_by_user(start=conditions["start"], end=conditions["end"]),
+                "page": None,
+                "entries": [],
+            }
+            st.session_state.log_search_page = 1
+
+        result = st.session_state.get("log_search_result")
+        if result is None:
+            return
+
+        page_count = max(1, -(-result["total_count"] // LOG_SEARCH_PAGE_SIZE))
+        # 条件を絞り込んで件数が減った場合は、最終ページに合わせる
+        if st.session_state.get("log_search_page", 1) > page_count:
+            st.session_state.log_search_page = page_count
+        page = st.number_input(f"ページ（全{page_count}ページ）", min_value=1, max_value=page_count, key="log_search_page")
+        st.write(f"{result['total_count']:,}件")
+        # ページを変更した場合のみ、そのページのログを取得する
+        if result["page"] != page:
+            result["entries"] = log_index.query(
+                **result["conditions"], limit=LOG_SEARCH_PAGE_SIZE, offset=(page - 1) * LOG_SEARCH_PAGE_SIZE
+            )
+            result["page"] = page
+        if result["entries"]:
+            st.dataframe(result["entries"], hide_index=True)
+
+        st.write("### ユーザーごとのエラー件数")
+        if result["error_counts"]:
+            st.dataframe(
+                [{"ユーザー名": name, "件数": count} for name, count in result["error_counts"]],
+                hide_index=True,
+            )
+        else:
+            st.write("エラーはありません。")
+
+def _display_render_profile():
+    with st.sidebar.expander("描画時間の計測"):
+        settings = get_render_profiling_settings()
+        enabled = st.toggle("描画時間を計測する", value=settings["enabled"], key="render_profiling_enabled")
+        with_snapshot = st.toggle(
+            "遅い再実行のプロファイルを保存する",
+            value=settings["with_snapshot"],
+            disabled=not enabled,
+            key="render_profiling_with_snapshot",
+        )
+        set_render_profiling_settings(enabled, with_snapshot and enabled)
+
+        if not is_render_profiling_enabled():
+            return
+        summary = get_render_profiler().get_summary()
+        if summary:
+            st.dataframe(summary, hide_index=True)
+        else:
+            st.write("計測結果はまだありません。")
+
+def _to_timestamp(date):
+    """
+    日付を、ログのタイムスタンプと比較できる日本時間のISO 8601形式の文字列に変換します。
+    """
+    if date is None:
+        return None
+    return datetime.datetime.combine(date, datetime.time.min, tzinfo=JST).isoformat()
+
+def _get_date_range(date_range):
+    """
+    st.date_inputの値から開始日と終了日を返します。
+    期間の終了日を選択中の場合は、開始日の1日のみとします。
+    """
+    if isinstance(date_range, (list, tuple)):
+        if len(date_range) == 0:
+            return None, None
+        if len(date_range) == 1:
+            return date_range[0], date_range[0]
+        return date_range[0], date_range[1]
+    return date_range, date_range
+
 @st.dialog("確認")
 def _confirm_delete_oldest_log(file_name: str):
     st.write(f"`{file_name}` を削除しますか？")
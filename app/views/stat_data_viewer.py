@@ -1,9 +1,11 @@
 import logging
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 from constants import DISPLAY_OPTIONS
+from utils import CompactStatData, processed_data_cache, get_stat_data_key
 
 
 class StatDataViewer:
@@ -24,21 +26,41 @@ class StatDataViewer:
         self.unit_types = ['なし']
 
     def process_data(self):
+        # 変換済みのデータがある場合は再利用する
+        cache_key = get_stat_data_key(self.response)
+        processed_data = processed_data_cache.get(cache_key)
+        if processed_data is not None:
+            self.df = processed_data["df"]
+            self.category_columns = processed_data["category_columns"]
+            self.continuous_values = processed_data["continuous_values"]
+            self.unit_types = processed_data["unit_types"]
+            return
+
+        self._convert_data()
+
+        processed_data_cache.set(cache_key, {
+            "df": self.df,
+            "category_columns": self.category_columns,
+            "continuous_values": self.continuous_values,
+            "unit_types": self.unit_types,
+        })
+
+    def _convert_data(self):
+        # セッションには列形式で保存しているが、未変換のレスポンスが渡された場合は列形式に変換する
+        stat_data = self.response
+        if not isinstance(stat_data, CompactStatData):
+            stat_data = CompactStatData.from_response(stat_data)
+
         # データ
-        values = self.response['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE']
-        self.df = pd.DataFrame(values)
+        self.df = stat_data.to_dataframe()
         # カラムの情報
-        meta_info = self.response['GET_STATS_DATA']['STATISTICAL_DATA']['CLASS_INF']['CLASS_OBJ']
+        meta_info = stat_data.class_objs
 
         for class_obj in meta_info:
             column_name = '@' + class_obj['@id']
-            id_to_name_dict = {}
-            if isinstance(class_obj['CLASS'], list):
-                for obj in class_obj['CLASS']:
-                    id_to_name_dict[obj['@code']] = obj['@name']
-            else:
-                id_to_name_dict[class_obj['CLASS']['@code']] = class_obj['CLASS']['@name']
-            self.df[column_name] = self.df[column_name].replace(id_to_name_dict)
+            if column_name not in self.df.columns or len(class_obj['CLASS']) == 0:
+                continue
+            self.df[column_name] = self._decode_codes(self.df[column_name], class_obj['CLASS'])
 
         col_replace_dict = {'$': '値', '@unit': '単位'}
         for class_obj in meta_info:
@@ -60,8 +82,42 @@ class StatDataViewer:
 
         # ユニークな単位のリストを取得
         if '単位' in self.df.columns:
-            self.df['単位'].fillna('なし', inplace=True)  # 単位がない場合にデフォルト値を設定
-            self.unit_types = self.df['単位'].unique()
+            # 単位がない場合にデフォルト値を設定
+            units = self.df['単位']
+            if 'なし' not in units.cat.categories:
+                units = units.cat.add_categories('なし')
+            self.df['単位'] = units.fillna('なし')
+            self.unit_types = list(self.df['単位'].unique())
+
+    @staticmethod
+    def _decode_codes(codes: pd.Series, classes: list) -> pd.Categorical:
+        """
+        分類のコードを名称に変換し、CLASSの並び順を保ったカテゴリ型にする
+        コードのカテゴリ（ユニークなコード）に対して名称を求め、各行はカテゴリの番号を置き換えるだけにする
+        名称が重複する分類もあるため、カテゴリは名称の重複を除いて作成する
+        CLASSに存在しないコードはコードのままカテゴリに追加する
+        """
+        codes = pd.Categorical(codes)
+        if len(codes.categories) == 0:
+            return codes
+
+        code_to_name = {obj['@code']: obj['@name'] for obj in classes}
+        categories = pd.Index(pd.unique(pd.Series(list(code_to_name.values()), dtype=object)))
+        # CLASS内のコードの位置 -> 名称のカテゴリ内の位置
+        name_positions = categories.get_indexer(list(code_to_name.values()))
+
+        # 元のカテゴリ（コード） -> 名称のカテゴリ内の位置
+        code_positions = pd.Index(list(code_to_name.keys())).get_indexer(codes.categories)
+        category_map = np.where(code_positions >= 0, name_positions[code_positions], -1)
+
+        unknown_mask = code_positions < 0
+        if unknown_mask.any():
+            unknown_codes = codes.categories[unknown_mask]
+            categories = categories.append(pd.Index(unknown_codes).difference(categories, sort=False))
+            category_map[unknown_mask] = categories.get_indexer(unknown_codes)
+
+        category_codes = np.where(codes.codes >= 0, category_map[codes.codes], -1)
+        return pd.Categorical.from_codes(category_codes, categories=categories)
 
     def display_data(self):
         self._display(display_type=self.display_type)
@@ -116,7 +172,7 @@ class StatDataViewer:
                 with st.form(key=f"filter_form_{self.key}"):
                     new_filters = {}
                     for column_name in filter_columns:
-                        unique_values = filtered_df_unit[column_name].dropna().unique()
+                        unique_values = list(filtered_df_unit[column_name].dropna().unique())
                         selected_values = st.multiselect(
                             f"{column_name}の値を選択してください",
                             options=unique_values,
@@ -207,13 +263,21 @@ class StatDataViewer:
             st.warning("x軸と色分けのカテゴリは異なる値を選択してください")
             return
         
-        # 合計を算出できるようにfloat型に変換
-        data['値'] = pd.to_numeric(data['値'], errors='coerce').fillna(0).astype(float)
-        # x軸および色分けによるグループ化した合計値を計算
-        grouped_data = data.groupby([selected_x_column, selected_color_column])['値'].sum().reset_index()
+        grouped_data = self._aggregate_bar_chart_data(data, selected_x_column, selected_color_column)
         # 棒グラフを作成
         fig = px.bar(grouped_data, x=selected_x_column, y=self.value_column, color=selected_color_column)
         st.plotly_chart(fig, key=f"bar_chart_{self.key}")
 
+    @staticmethod
+    def _aggregate_bar_chart_data(data: pd.DataFrame, x_column: str, color_column: str) -> pd.DataFrame:
+        """
+        x軸および色分けのカテゴリでグループ化した値の合計を返す
+        """
+        # 合計を算出できるようにfloat型に変換
+        # dataはキャッシュしているDataFrameの場合があるため、変更せずにコピーに対して変換する
+        data = data.assign(値=pd.to_numeric(data['値'], errors='coerce').fillna(0).astype(float))
+        # カテゴリ型の列は、データに存在しない組み合わせを含めないようにobserved=Trueでグループ化する
+        return data.groupby([x_column, color_column], observed=True)['値'].sum().reset_index()
+
     def set_df(self, df: pd.DataFrame):
         self.df = df
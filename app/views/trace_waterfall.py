@@ -0,0 +1,47 @@
+import json
+
+import streamlit as st
+import plotly.graph_objects as go
+
+class TraceWaterfall:
+    """
+    1回の応答（トレース）のスパンを、開始時刻と処理時間のウォーターフォール図で表示するクラス
+    管理者がどの処理に時間がかかっているかを確認するために使用する
+    """
+
+    def __init__(self, spans: list, key: str):
+        # スパンは終了順に記録されているため、開始順に並べ替える
+        self.spans = sorted(spans, key=lambda span: span["start_time"])
+        self.key = key
+
+    def display(self, container=st):
+        if len(self.spans) == 0:
+            return
+
+        trace_start = self.spans[0]["start_time"]
+        labels = [f"{'　' * span['depth']}{span['name']} ({index})" for index, span in enumerate(self.spans)]
+        offsets = [(span["start_time"] - trace_start) * 1000 for span in self.spans]
+        durations = [span["duration_ms"] for span in self.spans]
+        colors = ["#d62728" if span["status"] == "ERROR" else "#1f77b4" for span in self.spans]
+        hover_texts = [
+            f"{span['name']}<br>{span['duration_ms']:.1f}ms<br>{json.dumps(span['attributes'], ensure_ascii=False, default=str)}"
+            for span in self.spans
+        ]
+
+        fig = go.Figure(go.Bar(
+            x=durations,
+            base=offsets,
+            y=labels,
+            orientation="h",
+            marker_color=colors,
+            hovertext=hover_texts,
+            hoverinfo="text",
+        ))
+        fig.update_layout(
+            xaxis_title="経過時間（ms）",
+            yaxis={"autorange": "reversed"},
+            height=max(200, 28 * len(self.spans) + 80),
+            margin={"l": 10, "r": 10, "t": 10, "b": 10},
+        )
+        container.markdown(f"**トレース:** 合計 {max(o + d for o, d in zip(offsets, durations)):,.0f}ms / {len(self.spans)}スパン")
+        container.plotly_chart(fig, key=f"trace_waterfall_{self.key}")
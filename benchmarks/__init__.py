@@ -0,0 +1 @@
+from .stat_data_generator import *
\ No newline at end of file
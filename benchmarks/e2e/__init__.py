@@ -0,0 +1,2 @@
+from .fake_llm import *
+from .stub_server import *
\ No newline at end of file
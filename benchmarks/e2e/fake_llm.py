@@ -0,0 +1,92 @@
+import itertools
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pandasai.llm.fake import FakeLLM
+
+# 検証用のモデル名（料金の設定がないため、料金は0円として計算される）
+FAKE_MODEL_NAME = "fake-chat-model"
+
+# PandasAIの検証用のLLMが返すコード（先頭の100行をDataFrameとして返す）
+FAKE_PANDASAI_CODE = """result = {"type": "dataframe", "value": dfs[0].head(100)}"""
+
+_call_ids = itertools.count(1)
+
+class FakeChatModel(BaseChatModel):
+    """
+    APIを呼び出さずに、入力から決まった応答を返す検証用のチャットモデル
+    ツールが渡された場合は、ユーザーの入力から呼び出すツールを選ぶ
+    - e-StatのURL（statdisp_id=を含む）: get_estat_data_by_url
+    - 10桁の数字（統計表ID）: get_estat_data_by_id
+    - 「整形」を含む: format_estat_data
+    - それ以外: search_estat_url
+    ツールが渡されない場合（検索キーワードや概要の生成）は、固定の文章を返す
+    """
+
+    latency_seconds: float = 0.0
+    response_text: str = "人口 統計"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+
+        if tools:
+            message = self._choose_tool(messages, tools)
+        else:
+            message = AIMessage(content=self.response_text)
+        prompt_length = sum(len(str(m.content)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_length,
+            "output_tokens": len(str(message.content)),
+            "total_tokens": prompt_length + len(str(message.content)),
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _choose_tool(self, messages, tools) -> AIMessage:
+        user_input = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        tool_names = {tool["function"]["name"] for tool in tools}
+
+        url_match = re.search(r"https?://\S*statdisp_id=\d+", user_input)
+        id_match = re.search(r"(?<!\d)\d{10}(?!\d)", user_input)
+        if url_match:
+            name, argument = "get_estat_data_by_url", url_match.group(0)
+        elif id_match:
+            name, argument = "get_estat_data_by_id", id_match.group(0)
+        elif "整形" in user_input:
+            name, argument = "format_estat_data", user_input
+        else:
+            name, argument = "search_estat_url", user_input
+
+        if name not in tool_names:
+            return AIMessage(content=self.response_text)
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": {"__arg1": argument}, "id": f"call_{next(_call_ids)}"}],
+        )
+
+def create_fake_llm_factory(latency_seconds: float = 0.0):
+    """
+    set_llm_factoryに設定する、検証用のチャットモデルを生成する関数を返します。
+    """
+    def factory(llm_name):
+        return FakeChatModel(latency_seconds=latency_seconds)
+    return factory
+
+def create_fake_pandasai_llm_factory():
+    """
+    set_pandasai_llm_factoryに設定する、検証用のPandasAIのLLMを生成する関数を返します。
+    """
+    def factory():
+        return FakeLLM(output=FAKE_PANDASAI_CODE)
+    return factory
@@ -0,0 +1,236 @@
+"""
+外部APIを呼び出さない、エンドツーエンドの負荷試験
+
+e-Stat APIとSerpAPIの代わりにローカルのHTTPサーバー（StubServer）、生成AIの代わりに検証用のモデル（FakeChatModel, FakeLLM）を使用し、
+アプリと同じsetup_agentとAgentOutputの処理を、複数のユーザー（ユーザーごとに別のプロセス）で同時に実行して応答時間を計測します。
+
+シナリオ:
+- search: 統計データの検索（search_estat_url、検索結果の概要の生成）
+- fetch_by_id: 統計表IDを指定した統計データの取得（get_estat_data_by_id）
+- fetch_by_url: e-StatのURLを指定した統計データの取得（get_estat_data_by_url）
+- format: 取得済みの統計データの整形（format_estat_data）
+
+Usage:
+    python -m benchmarks.e2e.run_e2e --users 10 --iterations 5 --output e2e_output.json
+"""
+import argparse
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# アプリケーションのモジュールを読み込めるように、appディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "app"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from .fake_llm import FAKE_MODEL_NAME, create_fake_llm_factory, create_fake_pandasai_llm_factory  # noqa: E402
+from .stub_server import StubServer  # noqa: E402
+
+SCENARIO_APP_PATH = str(Path(__file__).resolve().parent / "scenario_app.py")
+
+# シナリオごとの入力（formatは、事前に統計データを取得してから整形する）
+SCENARIOS = {
+    "search": "都道府県別の人口の統計データを探しています",
+    "fetch_by_id": "0003410379のデータを表示してください",
+    "fetch_by_url": "https://www.e-stat.go.jp/stat-search/database?page=1&layout=datalist&statdisp_id=0003410380 のデータを表示してください",
+    "format": "地域ごとに整形してください",
+}
+SCENARIO_SETUP_PROMPTS = {
+    "format": SCENARIOS["fetch_by_id"],
+}
+
+def _percentile(values: list, percent: float) -> float:
+    # 最近傍法で求める
+    sorted_values = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def _run_prompt(app_test: AppTest, prompt: str, timeout: float):
+    app_test.session_state["e2e_prompt"] = prompt
+    app_test.run(timeout=timeout)
+    if len(app_test.exception) > 0:
+        raise Exception(app_test.exception[0].message)
+
+def _run_user(scenario: str, user_index: int, iterations: int, timeout: float, llm_latency: float, start_barrier, result_queue):
+    """
+    1人のユーザーとして、シナリオの入力をiterations回処理し、応答時間（ms）とエラーを結果のキューに入れます。
+    AppTestは実行中にプロセス全体で共有する状態（Runtime）を置き換えるため、ユーザーごとに別のプロセスで実行します。
+    """
+    latencies = []
+    errors = []
+    try:
+        # PandasAIのキャッシュ（DuckDB）は複数のプロセスから同時に開けないため、ユーザーごとに作業ディレクトリを分ける
+        user_dir = os.path.join(os.getcwd(), f"user_{user_index}")
+        os.makedirs(user_dir, exist_ok=True)
+        os.chdir(user_dir)
+
+        # views -> utilsの順に読み込む（循環importのため）
+        import views  # noqa: F401
+        from utils import set_llm_factory, set_pandasai_llm_factory
+        set_llm_factory(create_fake_llm_factory(llm_latency))
+        set_pandasai_llm_factory(create_fake_pandasai_llm_factory())
+
+        app_test = AppTest.from_file(SCENARIO_APP_PATH, default_timeout=timeout)
+        app_test.session_state["e2e_model_name"] = FAKE_MODEL_NAME
+        app_test.session_state["e2e_user_name"] = f"e2e-user-{user_index}"
+        app_test.run()
+
+        setup_prompt = SCENARIO_SETUP_PROMPTS.get(scenario)
+        if setup_prompt is not None:
+            _run_prompt(app_test, setup_prompt, timeout)
+
+        # 全ユーザーの準備が終わってから同時に開始する
+        start_barrier.wait()
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            try:
+                _run_prompt(app_test, SCENARIOS[scenario], timeout)
+                latencies.append((time.perf_counter() - started_at) * 1000)
+            except Exception as e:
+                errors.append(str(e))
+    except Exception as e:
+        # 準備に失敗した場合は、他のユーザーも開始せずに終了する
+        start_barrier.abort()
+        errors.append(f"{e.__class__.__name__}: {e}")
+    finally:
+        result_queue.put({"latencies": latencies, "errors": errors})
+
+def run_scenario(scenario: str, users: int, iterations: int, timeout: float, llm_latency: float) -> dict:
+    context = multiprocessing.get_context("spawn")
+    start_barrier = context.Barrier(users + 1)
+    result_queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_run_user,
+            args=(scenario, user_index, iterations, timeout, llm_latency, start_barrier, result_queue),
+        )
+        for user_index in range(users)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    started_at = time.perf_counter()
+    results = [result_queue.get() for _ in processes]
+    elapsed_seconds = time.perf_counter() - started_at
+    for process in processes:
+        process.join()
+
+    latencies = [latency for result in results for latency in result["latencies"]]
+    errors = [error for result in results for error in result["errors"]]
+    report = {
+        "scenario": scenario,
+        "users": users,
+        "iterations": iterations,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "elapsed_seconds": round(elapsed_seconds, 3),
+        "throughput_rps": round(len(latencies) / elapsed_seconds, 3) if elapsed_seconds > 0 else 0,
+    }
+    if latencies:
+        report.update({
+            "mean_ms": round(statistics.mean(latencies), 1),
+            "p50_ms": round(_percentile(latencies, 50), 1),
+            "p95_ms": round(_percentile(latencies, 95), 1),
+            "p99_ms": round(_percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1),
+        })
+    if errors:
+        report["error_samples"] = sorted(set(errors))[:5]
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="外部APIを呼び出さないエンドツーエンドの負荷試験")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS), help="実行するシナリオ")
+    parser.add_argument("--users", type=int, default=5, help="同時に実行するユーザー数")
+    parser.add_argument("--iterations", type=int, default=3, help="ユーザーごとの実行回数")
+    parser.add_argument("--cells", type=int, default=1000, help="統計データのセル数")
+    parser.add_argument("--estat-latency", type=float, default=0.1, help="e-Stat APIの応答までの待ち時間（秒）")
+    parser.add_argument("--serpapi-latency", type=float, default=0.5, help="SerpAPIの応答までの待ち時間（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="生成AIの応答までの待ち時間（秒）")
+    parser.add_argument("--fixtures-dir", help="記録済みのレスポンスのディレクトリ")
+    parser.add_argument("--estat-cache", action="store_true", help="e-Stat APIのレスポンスのキャッシュを使用する")
+    parser.add_argument("--serpapi-cache", action="store_true", help="SerpAPIの検索結果のキャッシュを使用する")
+    parser.add_argument("--llm-cache", action="store_true", help="LLMの応答（検索キーワード・概要）のキャッシュを使用する")
+    parser.add_argument("--timeout", type=float, default=120, help="1回の実行のタイムアウト（秒）")
+    parser.add_argument("--output", help="結果を出力するJSONファイル（省略した場合は標準出力）")
+    args = parser.parse_args(argv)
+
+    output_path = Path(args.output).resolve() if args.output else None
+    fixtures_dir = str(Path(args.fixtures_dir).resolve()) if args.fixtures_dir else None
+
+    # ログやキャッシュを作業ディレクトリに出力し、リポジトリやアプリのキャッシュを汚さないようにする
+    work_dir = tempfile.mkdtemp(prefix="panaestat_e2e_")
+    os.chdir(work_dir)
+    print(f"work dir: {work_dir}", file=sys.stderr)
+
+    stub_server = StubServer(
+        cells=args.cells,
+        latency={
+            "getStatsData": args.estat_latency,
+            "getMetaInfo": args.estat_latency,
+            "search": args.serpapi_latency,
+        },
+        fixtures_dir=fixtures_dir,
+    ).start()
+    os.environ["ESTAT_API_BASE_URL"] = stub_server.estat_api_base_url
+    os.environ["SERPAPI_BASE_URL"] = stub_server.base_url
+    os.environ.setdefault("APP_ID", "e2e")
+    os.environ.setdefault("SERPAPI_API_KEY", "e2e")
+    if not args.estat_cache:
+        os.environ["ESTAT_CACHE_TTL_SECONDS"] = "0"
+    if not args.serpapi_cache:
+        os.environ["SERPAPI_CACHE_TTL_SECONDS"] = "0"
+    if not args.llm_cache:
+        os.environ["LLM_CACHE_TTL_SECONDS"] = "0"
+
+    try:
+        results = []
+        for scenario in args.scenarios:
+            print(f"running {scenario} ({args.users} users x {args.iterations})...", file=sys.stderr)
+            result = run_scenario(scenario, args.users, args.iterations, args.timeout, args.llm_latency)
+            results.append(result)
+            print(
+                f"{scenario:<14}{result['throughput_rps']:>8.2f} req/s"
+                f"  p50 {result.get('p50_ms', 0):>8.1f}ms  p95 {result.get('p95_ms', 0):>8.1f}ms"
+                f"  p99 {result.get('p99_ms', 0):>8.1f}ms  errors {result['errors']}",
+                file=sys.stderr,
+            )
+    finally:
+        stub_server.stop()
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            "users": args.users,
+            "iterations": args.iterations,
+            "cells": args.cells,
+            "estat_latency": args.estat_latency,
+            "serpapi_latency": args.serpapi_latency,
+            "llm_latency": args.llm_latency,
+            "estat_cache": args.estat_cache,
+            "serpapi_cache": args.serpapi_cache,
+            "llm_cache": args.llm_cache,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if output_path is not None:
+        output_path.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    return 1 if any(result["errors"] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+負荷試験でAppTestから実行するStreamlitのスクリプト
+session_stateのe2e_promptに設定された入力を、アプリと同じくsetup_agentとAgentOutputで処理する
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "app"))
+
+import streamlit as st  # noqa: E402
+
+from session import initialize_session_state, set_user_data  # noqa: E402
+from views import AgentOutput  # noqa: E402
+from services import setup_agent  # noqa: E402
+
+initialize_session_state()
+
+model_name = st.session_state.get("e2e_model_name")
+if model_name is not None:
+    # 選択肢にない検証用のモデルを使用するため、直接設定する
+    st.session_state.model_name = model_name
+    # 料金の設定がないモデルの場合も料金を集計できるようにする
+    st.session_state.llm_costs.setdefault(model_name, {"input_cost": 0, "output_cost": 0})
+set_user_data(name=st.session_state.get("e2e_user_name"))
+
+# st.rerunによる再実行で同じ入力を処理しないよう、取り出して削除する
+prompt = st.session_state.pop("e2e_prompt", None)
+
+agent = setup_agent()
+AgentOutput(agent, prompt, None, None).handle_agent_output()
@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+from ..stat_data_generator import generate_stats_data
+
+# e-Stat APIのパス（ESTAT_API_BASE_URLに設定する）
+ESTAT_API_PATH = "/rest/3.0/app/json"
+
+# SerpAPIの検索結果として返す件数
+SEARCH_RESULT_COUNT = 20
+
+class StubServer:
+    """
+    e-Stat APIとSerpAPIの代わりに、ローカルで応答を返すHTTPサーバー
+    fixtures_dirに記録済みのレスポンス（getStatsData_<統計表ID>.json, getMetaInfo_<統計表ID>.json, search.json）がある場合はそれを返し、
+    ない場合は統計表IDごとに合成したデータを返す
+    """
+
+    def __init__(self, cells: int = 1000, latency: dict = None, fixtures_dir: str = None, host: str = "127.0.0.1", port: int = 0):
+        self.cells = cells
+        # エンドポイント（getStatsData, getMetaInfo, search）ごとの応答までの待ち時間（秒）
+        self.latency = latency or {}
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self._stats_data = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def estat_api_base_url(self) -> str:
+        return f"{self.base_url}{ESTAT_API_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+                handlers = {
+                    "getStatsData": stub._get_stats_data,
+                    "getMetaInfo": stub._get_meta_info,
+                    "search": stub._search,
+                }
+                if endpoint not in handlers:
+                    self.send_error(404)
+                    return
+
+                time.sleep(stub.latency.get(endpoint, 0))
+                body = json.dumps(handlers[endpoint](params), ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _load_fixture(self, name: str):
+        if self.fixtures_dir is None:
+            return None
+        path = self.fixtures_dir / f"{name}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _get_full_stats_data(self, stats_data_id: str) -> dict:
+        with self._lock:
+            if stats_data_id not in self._stats_data:
+                response = self._load_fixture(f"getStatsData_{stats_data_id}")
+                if response is None:
+                    response = generate_stats_data(self.cells, seed=int(stats_data_id) % (2 ** 32))
+                self._stats_data[stats_data_id] = response
+            return self._stats_data[stats_data_id]
+
+    def _get_stats_data(self, params: dict) -> dict:
+        """
+        統計データを、startPositionとlimitで指定されたページ分だけ返します。
+        """
+        response = self._get_full_stats_data(params.get("statsDataId", "0000000000"))
+        get_stats_data = response["GET_STATS_DATA"]
+        statistical_data = get_stats_data["STATISTICAL_DATA"]
+        values = statistical_data["DATA_INF"]["VALUE"]
+
+        start = int(params.get("startPosition", 1))
+        limit = int(params.get("limit", len(values)))
+        page = values[start - 1:start - 1 + limit]
+        result_inf = {
+            "TOTAL_NUMBER": len(values),
+            "FROM_NUMBER": start,
+            "TO_NUMBER": start + len(page) - 1,
+        }
+        if start - 1 + limit < len(values):
+            result_inf["NEXT_KEY"] = start + limit
+
+        return {
+            **response,
+            "GET_STATS_DATA": {
+                **get_stats_data,
+                "STATISTICAL_DATA": {
+                    **statistical_data,
+                    "RESULT_INF": result_inf,
+                    "DATA_INF": {**statistical_data["DATA_INF"], "VALUE": page},
+                },
+            },
+        }
+
+    def _get_meta_info(self, params: dict) -> dict:
+        stats_data_id = params.get("statsDataId", "0000000000")
+        response = self._load_fixture(f"getMetaInfo_{stats_data_id}")
+        if response is not None:
+            return response
+
+        statistical_data = self._get_full_stats_data(stats_data_id)["GET_STATS_DATA"]["STATISTICAL_DATA"]
+        return {
+            "GET_META_INFO": {
+                "RESULT": {"STATUS": 0, "ERROR_MSG": "正常に終了しました。"},
+                "PARAMETER": {"LANG": "J", "STATS_DATA_ID": stats_data_id},
+                "METADATA_INF": {
+                    "TABLE_INF": {
+                        **statistical_data["TABLE_INF"],
+                        "OVERALL_TOTAL_NUMBER": len(statistical_data["DATA_INF"]["VALUE"]),
+                    },
+                    "CLASS_INF": statistical_data["CLASS_INF"],
+                },
+            },
+        }
+
+    def _search(self, params: dict) -> dict:
+        response = self._load_fixture("search")
+        if response is not None:
+            return response
+
+        query = params.get("q", "")
+        return {
+            "search_parameters": {"q": query},
+            "organic_results": [
+                {
+                    "position": index + 1,
+                    "title": f"統計表{index + 1}（{query}）",
+                    "link": f"https://www.e-stat.go.jp/stat-search/database?page=1&layout=datalist&statdisp_id={index + 1:010d}",
+                    "snippet": f"{query}に関する統計表です。",
+                }
+                for index in range(SEARCH_RESULT_COUNT)
+            ],
+        }
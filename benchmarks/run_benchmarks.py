@@ -0,0 +1,182 @@
+"""
+e-Statの統計データの変換・表示処理のベンチマーク
+
+合成した統計データ（getStatsDataのレスポンス）に対して、以下の処理時間を計測します。
+- json_loads: レスポンスのJSONのパース
+- compact_from_response: 列形式（CompactStatData）への変換
+- process_data: StatDataViewer.process_data（表示用のDataFrameへの変換）
+- apply_filters: StatDataViewer._apply_filters（絞り込み）
+- bar_chart_groupby: 棒グラフ用のグループ化（StatDataViewer._aggregate_bar_chart_data）
+
+Usage:
+    python -m benchmarks.run_benchmarks --output bench_output.json
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 --baseline benchmarks/baseline.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# アプリケーションのモジュールを読み込めるように、appディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from views import StatDataViewer  # noqa: E402
+from utils import CompactStatData, processed_data_cache  # noqa: E402
+
+from .stat_data_generator import generate_stats_data  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# ベースラインと比較して遅くなったとみなす比率（中央値）
+DEFAULT_REGRESSION_THRESHOLD = 1.2
+
+def _measure(func, repeat: int, setup=None) -> list:
+    """
+    関数の処理時間（ms）を計測します。setupは計測の対象外として毎回の実行前に呼び出します。
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started_at = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return timings
+
+def run_benchmarks(sizes: list, repeat: int, generator_options: dict) -> list:
+    results = []
+    for cells in sizes:
+        print(f"generating {cells:,} cells...", file=sys.stderr)
+        response = generate_stats_data(cells, **generator_options)
+        raw_json = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        compact = CompactStatData.from_response(response)
+
+        viewer = StatDataViewer(compact, 0)
+        viewer.process_data()
+        df = viewer.df
+        area_column, time_column = viewer.category_columns[-2:]
+        x_column = viewer.category_columns[0]
+        areas = list(df[area_column].cat.categories)
+        times = list(df[time_column].cat.categories)
+        # 地域の半分と直近3期間に絞り込む
+        filters = {area_column: areas[:max(1, len(areas) // 2)], time_column: times[-3:]}
+
+        benchmarks = {
+            "json_loads": (lambda: json.loads(raw_json), None),
+            "compact_from_response": (lambda: CompactStatData.from_response(response), None),
+            "process_data": (lambda: StatDataViewer(compact, 0).process_data(), processed_data_cache.invalidate),
+            "apply_filters": (lambda: viewer._apply_filters(df, filters), None),
+            "bar_chart_groupby": (lambda: StatDataViewer._aggregate_bar_chart_data(df, x_column, area_column), None),
+        }
+        for name, (func, setup) in benchmarks.items():
+            timings = _measure(func, repeat, setup)
+            result = {
+                "benchmark": name,
+                "cells": cells,
+                "repeat": repeat,
+                "min_ms": round(min(timings), 3),
+                "median_ms": round(statistics.median(timings), 3),
+                "max_ms": round(max(timings), 3),
+            }
+            results.append(result)
+            print(f"{name:<24}{cells:>12,}{result['median_ms']:>14.1f}ms", file=sys.stderr)
+
+        processed_data_cache.invalidate()
+    return results
+
+def compare_with_baseline(results: list, baseline: dict, threshold: float) -> list:
+    """
+    ベースラインの結果と中央値を比較し、ベンチマークごとの比率を返します。
+    """
+    baseline_results = {(result["benchmark"], result["cells"]): result for result in baseline.get("results", [])}
+    comparisons = []
+    for result in results:
+        baseline_result = baseline_results.get((result["benchmark"], result["cells"]))
+        if baseline_result is None or baseline_result["median_ms"] == 0:
+            continue
+        ratio = result["median_ms"] / baseline_result["median_ms"]
+        comparisons.append({
+            "benchmark": result["benchmark"],
+            "cells": result["cells"],
+            "baseline_median_ms": baseline_result["median_ms"],
+            "median_ms": result["median_ms"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > threshold,
+        })
+    return comparisons
+
+def _get_environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="e-Statの統計データの変換・表示処理のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="計測するセル数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    parser.add_argument("--cat-count", type=int, default=2, help="分類事項（@cat）の数")
+    parser.add_argument("--area-count", type=int, default=47, help="地域（@area）の数")
+    parser.add_argument("--time-count", type=int, default=10, help="時間軸（@time）の数")
+    parser.add_argument("--unit-count", type=int, default=2, help="単位（@unit）の種類の数")
+    parser.add_argument("--special-ratio", type=float, default=0.01, help="数値でない値の割合")
+    parser.add_argument("--output", help="結果を出力するJSONファイル（省略した場合は標準出力）")
+    parser.add_argument("--baseline", help="比較するベースラインの結果のJSONファイル")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="遅くなったとみなす比率")
+    parser.add_argument("--fail-on-regression", action="store_true", help="遅くなったベンチマークがある場合に終了コード1を返す")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.sizes,
+        args.repeat,
+        {
+            "cat_count": args.cat_count,
+            "area_count": args.area_count,
+            "time_count": args.time_count,
+            "unit_count": args.unit_count,
+            "special_ratio": args.special_ratio,
+        },
+    )
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": _get_environment(),
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        baseline_path = Path(args.baseline)
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+            report["comparison"] = compare_with_baseline(results, baseline, args.threshold)
+            regressions = [comparison for comparison in report["comparison"] if comparison["regression"]]
+            for comparison in report["comparison"]:
+                mark = "  <- regression" if comparison["regression"] else ""
+                print(f"{comparison['benchmark']:<24}{comparison['cells']:>12,}{comparison['ratio']:>8.2f}x{mark}", file=sys.stderr)
+        else:
+            print(
+                f"baseline not found: {baseline_path} (skip comparison; create it with `make bench-baseline`)",
+                file=sys.stderr,
+            )
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.fail_on_regression and regressions:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+
+# 数値でない値（秘匿・該当なしなど）としてe-Statが返却する値
+SPECIAL_VALUES = ["-", "***", "X", "…"]
+
+UNITS = ["人", "世帯", "円", "%", "千人", "件"]
+
+def generate_stats_data(
+    rows: int,
+    cat_count: int = 2,
+    area_count: int = 47,
+    time_count: int = 10,
+    unit_count: int = 2,
+    special_ratio: float = 0.01,
+    seed: int = 0,
+) -> dict:
+    """
+    e-Statの統計データ取得API（getStatsData）と同じ形式のレスポンスを生成します。
+    分類（@cat01〜, @area, @time）の組み合わせを順に並べたVALUEを、指定した件数だけ生成します。
+    分類事項（@cat）の数は、地域・時間軸と合わせて件数以上の組み合わせになるように決めます。
+
+    Args:
+        rows: VALUEの件数（セル数）
+        cat_count: 分類事項（@cat01〜）の数
+        area_count: 地域（@area）の数
+        time_count: 時間軸（@time）の数
+        unit_count: 単位（@unit）の種類の数（0の場合は@unitを含めない）
+        special_ratio: 数値でない値（"-", "***"など）の割合
+        seed: 乱数のシード
+    """
+    rng = np.random.default_rng(seed)
+
+    # 分類事項ごとの数（組み合わせが件数以上になる最小の数）
+    cat_size = max(1, math.ceil((rows / (area_count * time_count)) ** (1 / cat_count))) if cat_count > 0 else 0
+    class_objs = []
+    for index in range(cat_count):
+        cat_id = f"cat{index + 1:02d}"
+        class_objs.append({
+            "@id": cat_id,
+            "@name": f"分類{index + 1}",
+            "CLASS": [
+                {"@code": f"{code:03d}", "@name": f"分類{index + 1}_{code:03d}", "@level": "1" if code == 0 else "2"}
+                for code in range(cat_size)
+            ],
+        })
+    class_objs.append({
+        "@id": "area",
+        "@name": "地域",
+        "CLASS": [
+            {"@code": f"{code:05d}", "@name": "全国" if code == 0 else f"地域{code:05d}", "@level": "1" if code == 0 else "2"}
+            for code in range(area_count)
+        ],
+    })
+    class_objs.append({
+        "@id": "time",
+        "@name": "時間軸（年次）",
+        "CLASS": [
+            {"@code": f"{2000 + code}000000", "@name": f"{2000 + code}年", "@level": "1"}
+            for code in range(time_count)
+        ],
+    })
+
+    # 各行の分類のコードの位置（時間軸が最も速く変わる）
+    shape = [len(class_obj["CLASS"]) for class_obj in class_objs]
+    positions = np.unravel_index(np.arange(rows) % math.prod(shape), shape)
+    units = UNITS[:unit_count]
+    special_mask = rng.random(rows) < special_ratio
+    special_indexes = rng.integers(0, len(SPECIAL_VALUES), rows)
+    numbers = rng.integers(0, 10_000_000, rows)
+
+    class_codes = [[obj["@code"] for obj in class_obj["CLASS"]] for class_obj in class_objs]
+    columns = ["@" + class_obj["@id"] for class_obj in class_objs]
+    values = []
+    for row in range(rows):
+        value = {column: codes[position[row]] for column, codes, position in zip(columns, class_codes, positions)}
+        if units:
+            # 単位は最初の分類事項ごとに決まる
+            value["@unit"] = units[positions[0][row] % len(units)]
+        value["$"] = SPECIAL_VALUES[special_indexes[row]] if special_mask[row] else str(numbers[row])
+        values.append(value)
+
+    return {
+        "GET_STATS_DATA": {
+            "RESULT": {
+                "STATUS": 0,
+                "ERROR_MSG": "正常に終了しました。",
+                "DATE": "2024-01-01T00:00:00.000+09:00",
+            },
+            "PARAMETER": {
+                "LANG": "J",
+                "STATS_DATA_ID": f"BENCH{rows:010d}",
+                "DATA_FORMAT": "J",
+                "START_POSITION": 1,
+                "METAGET_FLG": "Y",
+            },
+            "STATISTICAL_DATA": {
+                "RESULT_INF": {
+                    "TOTAL_NUMBER": rows,
+                    "FROM_NUMBER": 1,
+                    "TO_NUMBER": rows,
+                },
+                "TABLE_INF": {
+                    "@id": f"BENCH{rows:010d}",
+                    "STAT_NAME": {"@code": "00000000", "$": "ベンチマーク用統計"},
+                    "TITLE": {"@no": "001", "$": f"ベンチマーク用統計表（{rows}件）"},
+                },
+                "CLASS_INF": {"CLASS_OBJ": class_objs},
+                "DATA_INF": {
+                    "NOTE": [{"@char": char, "$": f"{char}の説明"} for char in SPECIAL_VALUES],
+                    "VALUE": values,
+                },
+            },
+        },
+    }
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app/ 配下のモジュールをアプリと同じ名前（utils, servicesなど）でimportする
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+# ログ・キャッシュ（相対パス）をリポジトリに作成しないように、一時ディレクトリで実行する
+os.chdir(tempfile.mkdtemp(prefix="panaestat_tests_"))
+
+# main.pyと同じ順序でimportする（services と views は相互にimportしているため）
+import session  # noqa: E402,F401
+import views  # noqa: E402,F401
+
+
+@pytest.fixture(scope="session", autouse=True)
+def flush_logs_at_end():
+    yield
+    # ログは相対パス（作業ディレクトリ）に書き込むため、pytestが作業ディレクトリを元に戻す前に書き込む
+    from utils import flush_logs
+    flush_logs()
@@ -0,0 +1,19 @@
+from services import agent
+from utils import set_llm_factory
+
+
+def test_setup_agent_recreates_agents_when_llm_factory_changes(monkeypatch):
+    created = []
+    monkeypatch.setattr(agent, "_agents", {})
+    monkeypatch.setattr(agent, "get_model_name", lambda: "test-model")
+    monkeypatch.setattr(agent, "_create_agent", lambda model_name: created.append(model_name) or object())
+
+    first = agent.setup_agent()
+    assert agent.setup_agent() is first
+
+    set_llm_factory(lambda model_name: None)
+    try:
+        assert agent.setup_agent() is not first
+    finally:
+        set_llm_factory(None)
+    assert created == ["test-model", "test-model"]
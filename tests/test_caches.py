@@ -0,0 +1,79 @@
+import pandas as pd
+
+from utils import DiskCache, ProcessedDataCache
+
+
+def _dataframe(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"value": range(rows)})
+
+
+def test_processed_data_cache_evicts_by_entries_lru():
+    cache = ProcessedDataCache(max_entries=2, max_bytes=1024 * 1024)
+    cache.set("a", {"df": _dataframe(1)})
+    cache.set("b", {"df": _dataframe(1)})
+    assert cache.get("a") is not None
+    cache.set("c", {"df": _dataframe(1)})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_processed_data_cache_evicts_by_bytes():
+    size = ProcessedDataCache.get_size({"df": _dataframe(1000), "columns": ["value"]})
+    assert size == int(_dataframe(1000).memory_usage(deep=True).sum())
+
+    cache = ProcessedDataCache(max_entries=10, max_bytes=size * 2)
+    for key in ("a", "b", "c"):
+        cache.set(key, {"df": _dataframe(1000)})
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == size * 2
+    assert cache.get("a") is None
+
+
+def test_processed_data_cache_skips_value_larger_than_max_bytes():
+    cache = ProcessedDataCache(max_entries=10, max_bytes=10)
+    cache.set("a", {"df": _dataframe(1000)})
+    assert cache.get("a") is None
+    assert cache.get_stats()["bytes"] == 0
+
+
+def test_processed_data_cache_replace_and_invalidate_update_bytes():
+    cache = ProcessedDataCache(max_entries=10, max_bytes=1024 * 1024)
+    cache.set("a", {"df": _dataframe(1000)})
+    cache.set("a", {"df": _dataframe(10)})
+    assert cache.get_stats()["bytes"] == ProcessedDataCache.get_size({"df": _dataframe(10)})
+
+    cache.invalidate("a")
+    assert cache.get_stats() == {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
+
+
+def test_disk_cache_evicts_least_recently_accessed(tmp_path):
+    value = "x" * 1000
+    probe = DiskCache(path=str(tmp_path / "probe.sqlite3"), ttl_seconds=60, max_bytes=1024 * 1024)
+    probe.set("probe", value)
+    size = probe.get_stats()["bytes"]
+
+    cache = DiskCache(path=str(tmp_path / "cache.sqlite3"), ttl_seconds=60, max_bytes=size * 2)
+    cache.set("a", value)
+    cache.set("b", value)
+    assert cache.get("a") == value
+    cache.set("c", value)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == value
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_disk_cache_expires_entries(tmp_path):
+    cache = DiskCache(path=str(tmp_path / "cache.sqlite3"), ttl_seconds=-1, max_bytes=1024 * 1024)
+    cache.set("a", "value")
+    assert cache.get("a") is None
+
+
+def test_disk_cache_make_key_ignores_order_and_value_types():
+    assert DiskCache.make_key("ns", {"a": 1, "b": "x"}) == DiskCache.make_key("ns", {"b": "x ", "a": "1"})
+    assert DiskCache.make_key("ns", {"a": 1}) != DiskCache.make_key("other", {"a": 1})
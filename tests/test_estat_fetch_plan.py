@@ -0,0 +1,63 @@
+import importlib
+
+import pytest
+
+from constants import EstatFetchStrategy
+
+estat_api = importlib.import_module("api.estat_api")
+
+CLASS_INF = {
+    "CLASS_OBJ": [
+        {"@id": "area", "CLASS": [{"@code": str(code)} for code in range(10)]},
+        {"@id": "time", "CLASS": {"@code": "2020"}},
+    ]
+}
+
+
+@pytest.fixture
+def meta_info(monkeypatch):
+    meta_info = {"TABLE_INF": {"OVERALL_TOTAL_NUMBER": 0}, "CLASS_INF": CLASS_INF}
+    monkeypatch.setattr(estat_api, "get_estat_meta_info", lambda statsDataId: meta_info)
+    monkeypatch.setattr(estat_api, "get_estat_data_limit", lambda: 1_000_000)
+    monkeypatch.delenv("ESTAT_MEMORY_BUDGET_MB", raising=False)
+    return meta_info
+
+
+def _plan(meta_info, total_number, filters=None):
+    meta_info["TABLE_INF"]["OVERALL_TOTAL_NUMBER"] = total_number
+    return estat_api.plan_estat_fetch("0000000001", filters)
+
+
+def test_single(meta_info):
+    plan = _plan(meta_info, 1000)
+    assert plan["strategy"] == EstatFetchStrategy.SINGLE.value
+    assert plan["page_count"] == 1
+
+
+def test_paginated(meta_info):
+    plan = _plan(meta_info, 120_000)
+    assert plan["strategy"] == EstatFetchStrategy.PAGINATED.value
+    assert plan["page_count"] == 3
+
+
+def test_filtered_estimates_selected_ratio(meta_info):
+    plan = _plan(meta_info, 120_000, filters={"area": ["0", "1"]})
+    assert plan["strategy"] == EstatFetchStrategy.FILTERED.value
+    assert plan["estimated_number"] == 24_000
+    assert plan["total_number"] == 120_000
+
+
+def test_refused_over_data_limit(meta_info):
+    plan = _plan(meta_info, 1_000_001)
+    assert plan["strategy"] == EstatFetchStrategy.REFUSED.value
+
+
+def test_refused_over_memory_budget(meta_info, monkeypatch):
+    monkeypatch.setenv("ESTAT_MEMORY_BUDGET_MB", "1")
+    plan = _plan(meta_info, 10_000)
+    assert plan["strategy"] == EstatFetchStrategy.REFUSED.value
+    assert "1MB" in plan["reason"]
+
+    # 絞り込んで上限を下回る場合は取得する
+    plan = _plan(meta_info, 10_000, filters={"area": ["0"]})
+    assert plan["strategy"] == EstatFetchStrategy.FILTERED.value
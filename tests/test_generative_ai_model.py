@@ -0,0 +1,60 @@
+import threading
+from functools import cached_property
+
+import anthropic
+import pytest
+from langchain_anthropic import ChatAnthropic
+
+from utils import generative_ai_model
+from utils.generative_ai_model import _ConcurrencyLimitMixin, _SharedChatAnthropic
+
+
+def test_chat_anthropic_client_attributes_exist():
+    # _SharedChatAnthropicが上書きしているChatAnthropicの非公開の属性が、アップグレードで変更されていないこと
+    assert isinstance(ChatAnthropic.__dict__.get("_client"), cached_property)
+    assert isinstance(ChatAnthropic.__dict__.get("_async_client"), cached_property)
+    assert isinstance(ChatAnthropic.__dict__.get("_client_params"), cached_property)
+
+
+def test_shared_chat_anthropic_uses_shared_http_clients(monkeypatch):
+    monkeypatch.setattr(generative_ai_model, "_http_clients", {})
+    llm1 = _SharedChatAnthropic(model="claude-3-5-sonnet-20240620", api_key="test")
+    llm2 = _SharedChatAnthropic(model="claude-3-5-sonnet-20240620", api_key="test")
+
+    assert isinstance(llm1._client, anthropic.Client)
+    assert isinstance(llm1._async_client, anthropic.AsyncClient)
+    assert llm1._client._client is llm2._client._client
+    assert llm1._async_client._client is llm2._async_client._client
+    assert llm1._client._client is generative_ai_model._http_clients[("anthropic", anthropic.DefaultHttpxClient)]
+
+
+class _FakeChatModel:
+    def _stream(self, *args, **kwargs):
+        yield "a"
+        yield "b"
+
+
+class _LimitedFakeChatModel(_ConcurrencyLimitMixin, _FakeChatModel):
+    provider = "test"
+
+
+@pytest.fixture
+def semaphore(monkeypatch):
+    semaphore = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(generative_ai_model, "_get_semaphore", lambda provider: semaphore)
+    return semaphore
+
+
+def test_stream_holds_semaphore_until_exhausted(semaphore):
+    stream = _LimitedFakeChatModel()._stream()
+    assert next(stream) == "a"
+    assert not semaphore.acquire(blocking=False)
+    assert list(stream) == ["b"]
+    assert semaphore.acquire(blocking=False)
+
+
+def test_stream_releases_semaphore_on_close(semaphore):
+    stream = _LimitedFakeChatModel()._stream()
+    next(stream)
+    stream.close()
+    assert semaphore.acquire(blocking=False)
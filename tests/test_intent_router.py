@@ -0,0 +1,61 @@
+import pytest
+
+from services import ROUTE_AGENT, ROUTE_ESTAT_URL, ROUTE_STATS_DATA_ID, route_intent
+from tools import get_estat_data_by_id, get_estat_data_by_url
+
+ESTAT_URL = "https://www.e-stat.go.jp/dbview?sid=0003448237"
+ESTAT_STATDISP_URL = "https://www.e-stat.go.jp/stat-search/database?statdisp_id=0003448237"
+
+
+@pytest.mark.parametrize("prompt", ["0003448237", "0003448237を表示して", "統計表ID：0003448237を表示してください。"])
+def test_stats_data_id_fast_path(prompt):
+    route = route_intent(prompt)
+    assert route.is_fast_path
+    assert (route.route, route.reason) == (ROUTE_STATS_DATA_ID, "matched")
+    assert route.tool is get_estat_data_by_id
+    assert route.tool_input == "0003448237"
+
+
+def test_estat_url_fast_path():
+    route = route_intent(f"{ESTAT_STATDISP_URL} を表示して")
+    assert (route.route, route.reason) == (ROUTE_ESTAT_URL, "matched")
+    assert route.tool is get_estat_data_by_url
+    assert route.tool_input == ESTAT_STATDISP_URL
+
+
+def test_same_table_by_id_and_url_is_single_target():
+    route = route_intent(f"{ESTAT_STATDISP_URL} 0003448237")
+    assert route.route == ROUTE_ESTAT_URL
+
+
+@pytest.mark.parametrize(
+    "prompt, reason",
+    [
+        ("人口の推移を教えて", "no_match"),
+        ("0003448237と0003448238を表示して", "multiple_targets"),
+        ("0003448237を都道府県別に絞り込んで", "extra_text"),
+        (ESTAT_URL, "other_url"),
+        ("https://example.com/?statdisp_id=0003448237", "other_url"),
+        ("https://e-stat.go.jp.example.com/?statdisp_id=0003448237", "other_url"),
+        ("https://www.e-stat.go.jp/stat-search/database?statdisp_id=abc", "invalid_statdisp_id"),
+        ("00034482370", "no_match"),
+    ],
+)
+def test_routes_to_agent(prompt, reason):
+    route = route_intent(prompt)
+    assert not route.is_fast_path
+    assert (route.route, route.reason) == (ROUTE_AGENT, reason)
+
+
+def test_non_string_prompt_routes_to_agent():
+    assert route_intent(None).route == ROUTE_AGENT
+
+
+def test_invoke_returns_agent_executor_result():
+    class _FakeTool:
+        def invoke(self, tool_input, config=None):
+            return f"output:{tool_input}"
+
+    route = route_intent("0003448237")
+    route.tool = _FakeTool()
+    assert route.invoke("0003448237") == {"user_input": ["0003448237"], "output": "output:0003448237"}
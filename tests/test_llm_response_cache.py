@@ -0,0 +1,76 @@
+import pytest
+
+from utils import DiskCache, LLMResponseCache, normalize_llm_input
+
+
+@pytest.fixture
+def llm_response_cache(tmp_path):
+    return LLMResponseCache(DiskCache(path=str(tmp_path / "llm.sqlite3"), ttl_seconds=60, max_bytes=1024 * 1024))
+
+
+def test_normalize_llm_input():
+    assert normalize_llm_input("  ＡＢＣ　 人口\n推移。") == "abc 人口 推移"
+    assert normalize_llm_input("人口推移?") == normalize_llm_input("人口推移")
+
+
+def test_get_hits_exact_then_normalized(llm_response_cache):
+    llm_response_cache.set("model", "template", {"q": "人口推移"}, "response")
+
+    assert llm_response_cache.get("model", "template", {"q": "人口推移"}) == "response"
+    assert llm_response_cache.get("model", "template", {"q": "人口推移。"}) == "response"
+    assert llm_response_cache.get("model", "template", {"q": "失業率"}) is None
+    assert llm_response_cache.get("other-model", "template", {"q": "人口推移"}) is None
+
+    stats = llm_response_cache.get_stats()
+    assert (stats["exact_hits"], stats["normalized_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_get_records_disk_cache_stats_once_per_lookup(llm_response_cache):
+    llm_response_cache.set("model", "template", {"q": "人口推移"}, "response")
+
+    llm_response_cache.get("model", "template", {"q": "人口推移。"})
+    llm_response_cache.get("model", "template", {"q": "失業率"})
+
+    disk_stats = llm_response_cache.cache.get_stats()
+    assert (disk_stats["hits"], disk_stats["misses"]) == (1, 1)
+
+
+def test_normalized_match_disabled(tmp_path):
+    cache = LLMResponseCache(
+        DiskCache(path=str(tmp_path / "llm.sqlite3"), ttl_seconds=60, max_bytes=1024 * 1024),
+        normalized_match=False,
+    )
+    cache.set("model", "template", {"q": "人口推移"}, "response")
+    assert cache.get("model", "template", {"q": "人口推移。"}) is None
+
+
+class _FakeChain:
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, inputs):
+        self.calls.append(inputs)
+        return f"response:{inputs['q']}"
+
+    def batch(self, inputs, config=None, return_exceptions=False):
+        self.calls.extend(inputs)
+        return [ValueError("failed") if item["q"] == "error" else f"response:{item['q']}" for item in inputs]
+
+
+def test_invoke_calls_chain_only_on_miss(llm_response_cache):
+    chain = _FakeChain()
+    assert llm_response_cache.invoke(chain, "model", "template", {"q": "a"}) == ("response:a", False)
+    assert llm_response_cache.invoke(chain, "model", "template", {"q": "a"}) == ("response:a", True)
+    assert chain.calls == [{"q": "a"}]
+
+
+def test_batch_does_not_cache_exceptions(llm_response_cache):
+    chain = _FakeChain()
+    llm_response_cache.set("model", "template", {"q": "a"}, "cached:a")
+
+    responses, cached = llm_response_cache.batch(chain, "model", "template", [{"q": "a"}, {"q": "b"}, {"q": "error"}])
+    assert responses[:2] == ["cached:a", "response:b"]
+    assert isinstance(responses[2], ValueError)
+    assert cached == [True, False, False]
+    assert chain.calls == [{"q": "b"}, {"q": "error"}]
+    assert llm_response_cache.get("model", "template", {"q": "error"}) is None
@@ -0,0 +1,111 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+logger_module = sys.modules["utils.logger"]
+_BatchingQueueListener = logger_module._BatchingQueueListener
+
+
+class _RecordingHandler(logging.handlers.BufferingHandler):
+    def __init__(self, fail=False):
+        super().__init__(capacity=1000)
+        self.flushed = []
+        self.errors = []
+        self.fail = fail
+
+    def emit(self, record):
+        if self.fail:
+            raise OSError("disk full")
+        super().emit(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.flushed.extend(record.getMessage() for record in self.buffer)
+            self.buffer = []
+        finally:
+            self.release()
+
+    def handleError(self, record):
+        self.errors.append(record.getMessage())
+
+
+def _record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 0, message, None, None)
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_listener_flushes_buffer_when_queue_is_idle():
+    log_queue = queue.Queue()
+    handler = _RecordingHandler()
+    listener = _BatchingQueueListener(log_queue, handler, flush_interval=0.05)
+    listener.start()
+    try:
+        log_queue.put(_record("a"))
+        assert _wait_until(lambda: handler.flushed == ["a"])
+    finally:
+        listener.stop()
+
+
+def test_listener_stop_flushes_remaining_records_and_is_idempotent():
+    log_queue = queue.Queue()
+    handler = _RecordingHandler()
+    listener = _BatchingQueueListener(log_queue, handler, flush_interval=60)
+    assert not listener.is_running()
+
+    listener.start()
+    assert listener.is_running()
+    log_queue.put(_record("a"))
+    log_queue.put(_record("b"))
+    listener.stop()
+
+    assert handler.flushed == ["a", "b"]
+    assert not listener.is_running()
+    listener.stop()
+
+
+def test_listener_keeps_running_when_handler_raises():
+    log_queue = queue.Queue()
+    handler = _RecordingHandler(fail=True)
+    listener = _BatchingQueueListener(log_queue, handler, flush_interval=60)
+    listener.start()
+    try:
+        log_queue.put(_record("a"))
+        log_queue.join()
+        assert handler.errors == ["a"]
+        assert listener.is_running()
+    finally:
+        listener.stop()
+
+
+def test_csv_logger_flush_reports_write_errors(monkeypatch):
+    handler = logger_module.DailyCSVLogger(capacity=10, flush_interval=60)
+    errors = []
+    monkeypatch.setattr(handler, "_write_records", lambda records: (_ for _ in ()).throw(OSError("disk full")))
+    monkeypatch.setattr(handler, "handleError", lambda record: errors.append(record.getMessage()))
+
+    handler.buffer = [_record("a"), _record("b")]
+    handler.flush()
+
+    assert errors == ["a"]
+    assert handler.buffer == []
+
+
+def test_flush_logs_does_not_wait_for_stopped_listener(monkeypatch):
+    log_queue = queue.Queue()
+    log_queue.put(_record("a"))
+    monkeypatch.setattr(logger_module, "log_queue", log_queue)
+    monkeypatch.setattr(logger_module, "csv_listener", _BatchingQueueListener(log_queue, _RecordingHandler()))
+    monkeypatch.setattr(logger_module, "csv_handler", _RecordingHandler())
+
+    started_at = time.monotonic()
+    logger_module.flush_logs()
+    assert time.monotonic() - started_at < 1
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from api import make_serp_api_cache_key, normalize_serp_api_query
+from utils import SingleFlight
+
+
+def test_normalize_serp_api_query():
+    assert normalize_serp_api_query("  site:e-stat.go.jp　 人口　推移 ") == "site:e-stat.go.jp 人口 推移"
+    assert normalize_serp_api_query("ＧＤＰ　１０年") == "GDP 10年"
+
+
+def test_normalize_serp_api_query_keeps_case():
+    # inurl:fileKind=0などの演算子の値は大文字・小文字を区別する
+    assert normalize_serp_api_query("inurl:fileKind=0 GDP") == "inurl:fileKind=0 GDP"
+
+
+def test_make_serp_api_cache_key():
+    assert make_serp_api_cache_key("人口 推移") == make_serp_api_cache_key(" 人口　　推移")
+    assert make_serp_api_cache_key("人口 推移") != make_serp_api_cache_key("人口推移")
+    assert make_serp_api_cache_key("GDP") != make_serp_api_cache_key("gdp")
+
+
+def test_single_flight_shares_result_of_running_call():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_search():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do("key", slow_search)))
+    leader.start()
+    started.wait(2)
+    follower = threading.Thread(target=lambda: results.append(single_flight.do("key", lambda: "unused")))
+    follower.start()
+    # followerが実行中の処理の完了を待ち始めてから、leaderの処理を完了させる
+    follower.join(0.2)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert calls == [1]
+    assert sorted(results, key=lambda result: result[1]) == [("result", False), ("result", True)]
+
+
+def test_single_flight_propagates_exception_and_forgets_key():
+    single_flight = SingleFlight()
+
+    def failing():
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", failing)
+    assert single_flight.do("key", lambda: "retry") == ("retry", False)
@@ -0,0 +1,104 @@
+import json
+import logging
+import sys
+
+import pytest
+
+from utils import get_current_span, set_span_attributes, start_span, traced
+
+tracing = sys.modules["utils.tracing"]
+
+
+@pytest.fixture
+def csv_info_messages(monkeypatch):
+    messages = []
+    monkeypatch.setattr(logging, "csv_info", messages.append)
+    monkeypatch.delenv("TRACE_LOG_ALL_SPANS", raising=False)
+    monkeypatch.delenv("TRACE_EXPORT_PATH", raising=False)
+    return messages
+
+
+def test_span_nesting(csv_info_messages):
+    with start_span("root", user="a") as root:
+        with start_span("child") as child:
+            assert get_current_span() is child
+            set_span_attributes(rows=10)
+        assert get_current_span() is root
+    assert get_current_span() is None
+
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert (root.depth, child.depth) == (0, 1)
+    assert child.attributes == {"rows": 10}
+    assert root.attributes == {"user": "a"}
+    assert root.finished_spans == [child, root]
+
+
+def test_span_records_exception(csv_info_messages):
+    @traced("failing")
+    def failing():
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        with start_span("root") as root:
+            failing()
+
+    failed = root.finished_spans[0]
+    assert (failed.name, failed.status, failed.error) == ("failing", "ERROR", "ValueError: x")
+    assert (root.status, root.error) == ("ERROR", "ValueError: x")
+
+
+def test_logs_one_summary_per_trace(csv_info_messages):
+    with start_span("root"):
+        with start_span("fast"):
+            pass
+        try:
+            with start_span("bad"):
+                raise ValueError("x")
+        except ValueError:
+            pass
+
+    assert len(csv_info_messages) == 1
+    summary = csv_info_messages[0]
+    assert summary.startswith("trace: root ")
+    assert "spans=3 errors=1" in summary
+    assert "first_error=bad (ValueError: x)" in summary
+
+
+def test_logs_every_span_when_enabled(csv_info_messages, monkeypatch):
+    monkeypatch.setenv("TRACE_LOG_ALL_SPANS", "true")
+    with start_span("root"):
+        with start_span("child"):
+            pass
+
+    assert [message.split()[1] for message in csv_info_messages] == ["child", "root"]
+
+
+def test_exports_trace_as_otlp_json(csv_info_messages, monkeypatch, tmp_path):
+    export_path = tmp_path / "traces" / "traces.jsonl"
+    monkeypatch.setenv("TRACE_EXPORT_PATH", str(export_path))
+    with start_span("root", cached=True, rows=3):
+        with start_span("child"):
+            pass
+
+    lines = export_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    child, root = spans
+    assert (child["name"], root["name"]) == ("child", "root")
+    assert child["parentSpanId"] == root["spanId"]
+    assert "parentSpanId" not in root
+    assert root["attributes"] == [
+        {"key": "cached", "value": {"boolValue": True}},
+        {"key": "rows", "value": {"intValue": "3"}},
+    ]
+
+
+def test_histogram_observes_every_span(csv_info_messages, monkeypatch):
+    observed = []
+    monkeypatch.setattr(tracing.span_duration_seconds, "observe", lambda value, **labels: observed.append(labels))
+    with start_span("root"):
+        with start_span("child"):
+            pass
+
+    assert observed == [{"name": "child", "status": "OK"}, {"name": "root", "status": "OK"}]